@@ -0,0 +1,61 @@
+"""Compare throughput of the single-row /predict path against /predict/batch.
+
+Run from the project root (the model is loaded from MODEL_PATH):
+    python -m Benchmarks.batch_throughput --rows 2000
+
+Benchmark rows are not recorded in the prediction store, and the monitoring
+logs are written to a temporary directory.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from fastapi.testclient import TestClient
+from Server.schemas import FEATURE_COLUMNS
+from Benchmarks.payloads import make_rows
+
+
+def bench_single(client, rows):
+    start = time.perf_counter()
+    for row in rows:
+        client.post("/predict", json=row).raise_for_status()
+    return time.perf_counter() - start
+
+
+def bench_batch(client, payload):
+    start = time.perf_counter()
+    client.post("/predict/batch", json=payload).raise_for_status()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000, help="rows scored by each path")
+    args = parser.parse_args()
+
+    # main_api reads its settings at import: keep the benchmark out of the real store and logs
+    log_dir = tempfile.mkdtemp(prefix="batch_throughput_logs_")
+    os.environ["PREDICTION_STORE_PATH"] = ""
+    os.environ["MONITOR_LOG_DIR"] = log_dir
+    from Server.main_api import app, model_manager
+
+    if model_manager.engine is None:
+        raise SystemExit("❌ Model is not loaded, set MODEL_PATH to an exported model.")
+
+    rows = make_rows(args.rows)
+    columnar = {name: [row[name] for row in rows] for name in FEATURE_COLUMNS}
+
+    # Entering the client runs the app lifespan (model reload thread, micro-batcher, log flush on exit)
+    try:
+        with TestClient(app) as client:
+            single_s = bench_single(client, rows)
+            array_s = bench_batch(client, rows)
+            columnar_s = bench_batch(client, columnar)
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+    print(f"{'path':<22}{'seconds':>10}{'rows/sec':>14}")
+    for name, seconds in [("single /predict", single_s), ("batch (JSON array)", array_s), ("batch (columnar)", columnar_s)]:
+        print(f"{name:<22}{seconds:>10.3f}{args.rows / seconds:>14,.0f}")
+    print(f"Speed-up (columnar vs single): {single_s / columnar_s:.1f}x")
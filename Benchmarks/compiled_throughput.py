@@ -0,0 +1,47 @@
+"""Multi-threaded CPU batch throughput of the ONNX engine against pyfunc and native.
+
+Run from the project root after exporting the model with Server/compiled_model.py:
+    python -m Benchmarks.compiled_throughput --rows 200000 --threads 1 2 4 8
+"""
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from Server.inference_engine import load_inference_engine
+from Server.schemas import FEATURE_COLUMNS
+from Benchmarks.payloads import make_rows
+
+MODEL_PATH = os.getenv("MODEL_PATH", "exported_model/model")
+COMPILED_MODEL_PATH = os.getenv("COMPILED_MODEL_PATH", "exported_model/model.onnx")
+
+
+def rows_per_second(engine, frame, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        engine.predict(frame)
+        best = min(best, time.perf_counter() - start)
+    return len(frame) / best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000, help="rows per batch")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()])
+    args = parser.parse_args()
+
+    frame = pd.DataFrame(make_rows(args.rows), columns=FEATURE_COLUMNS)
+    reference = load_inference_engine(MODEL_PATH, FEATURE_COLUMNS, engine="pyfunc")
+    native = load_inference_engine(MODEL_PATH, FEATURE_COLUMNS, engine="native")
+
+    print(f"{'engine':<10}{'threads':>8}{'rows/sec':>14}")
+    print(f"{'pyfunc':<10}{'default':>8}{rows_per_second(reference, frame):>14,.0f}")
+    print(f"{native.name:<10}{'default':>8}{rows_per_second(native, frame):>14,.0f}")
+    for threads in args.threads:
+        onnx = load_inference_engine(MODEL_PATH, FEATURE_COLUMNS, engine="onnx",
+                                     compiled_path=COMPILED_MODEL_PATH, threads=threads)
+        print(f"{onnx.name:<10}{threads:>8}{rows_per_second(onnx, frame):>14,.0f}")
+
+    diff = np.abs(reference.predict(frame) - onnx.predict(frame)).max()
+    print(f"Max abs difference (onnx vs pyfunc): {diff:.2e}")
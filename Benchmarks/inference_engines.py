@@ -0,0 +1,55 @@
+"""Single-row and batch latency of the pyfunc and native inference engines.
+
+Run from the project root (the model is loaded from MODEL_PATH):
+    python -m Benchmarks.inference_engines --repeat 2000
+"""
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from Server.inference_engine import load_inference_engine
+from Server.schemas import FEATURE_COLUMNS
+from Benchmarks.payloads import make_rows
+
+MODEL_PATH = os.getenv("MODEL_PATH", "exported_model/model")
+
+
+def time_single(engine, rows, repeat):
+    latencies = np.empty(repeat)
+    for i in range(repeat):
+        row = rows[i % len(rows)]
+        start = time.perf_counter()
+        engine.predict_input(engine.row_input(row))
+        latencies[i] = time.perf_counter() - start
+    return latencies * 1e6
+
+
+def time_batch(engine, frame, repeat=5):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        engine.predict(frame)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="single-row predictions per engine")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    engines = [load_inference_engine(MODEL_PATH, FEATURE_COLUMNS, engine=name) for name in ("pyfunc", "native")]
+    rows = make_rows(1000)
+    frame = pd.DataFrame(make_rows(max(args.batch_sizes)), columns=FEATURE_COLUMNS)
+
+    print(f"{'engine':<10}{'p50 µs':>10}{'p99 µs':>10}" + "".join(f"{f'{n:,} rows/s':>18}" for n in args.batch_sizes))
+    for engine in engines:
+        latencies = time_single(engine, rows, args.repeat)
+        throughput = [n / time_batch(engine, frame.iloc[:n]) for n in args.batch_sizes]
+        print(f"{engine.name:<10}{np.percentile(latencies, 50):>10.0f}{np.percentile(latencies, 99):>10.0f}"
+              + "".join(f"{t:>18,.0f}" for t in throughput))
+
+    reference, candidate = (engine.predict(frame) for engine in engines)
+    print(f"Max abs difference (native vs pyfunc): {np.abs(reference - candidate).max():.2e}")
@@ -0,0 +1,267 @@
+"""Load test of the prediction API: throughput, p50 / p95 / p99 latency and error rate under concurrency.
+
+The app is started in-process with uvicorn on a free local port, serving a small
+stand-in LightGBM model trained on synthetic rows (or the model at --model), and
+driven by an async httpx client over a pool of keep-alive connections:
+
+    python -m Benchmarks.load_test --scenarios predict batch --concurrency 32 --duration 20
+    python -m Benchmarks.load_test --rate 500 --duration 30        # open loop: 500 requests/s
+    python -m Benchmarks.load_test --url http://127.0.0.1:8000      # an already running server
+
+/predict cycles through 20,000 distinct rows; pass --no-cache to measure the
+model path without the prediction cache. The local server records nothing in
+the prediction store and writes its monitoring logs to a temporary directory.
+
+Without --rate every one of the --concurrency workers sends its next request as
+soon as the previous one returns (closed loop). With --rate requests start on a
+fixed schedule, and latency is measured from the scheduled start, so a server
+that falls behind is charged for the queueing it causes. Results (with the
+commit, settings and per-scenario numbers) are written as JSON for comparison
+across commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from Benchmarks.payloads import make_rows
+
+SCENARIOS = {
+    # name: (endpoint, rows per request)
+    "predict": ("/predict", 1),
+    "batch": ("/predict/batch", None),
+    "stream": ("/predict/stream", None),
+}
+DEFAULT_RESULTS_DIR = os.path.join("Benchmarks", "results")
+
+
+def build_stand_in_model(path, n_rows=5000, seed=42):
+    """Train a small LightGBM model on synthetic rows and save it as an MLflow model at path."""
+    import lightgbm as lgb
+    import mlflow.lightgbm
+    import pandas as pd
+    from Server.schemas import FEATURE_COLUMNS
+
+    frame = pd.DataFrame(make_rows(n_rows, seed=seed), columns=FEATURE_COLUMNS)
+    target = np.log1p(frame["unit_sales"] * (1 + frame["onpromotion"]))
+    model = lgb.LGBMRegressor(n_estimators=100, num_leaves=31, verbose=-1, random_state=seed)
+    model.fit(frame, target)
+    mlflow.lightgbm.save_model(model, path)
+    return path
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LocalServer:
+    """Server.main_api served by uvicorn in a background thread."""
+
+    def __init__(self, model_path, port=None, cache=True):
+        # main_api reads its settings at import: point it at the model before importing it.
+        # Benchmark traffic is kept out of the prediction store, and its monitoring logs go to a
+        # temporary directory, so synthetic rows never mix with the real ones in Logs/
+        os.environ["MODEL_PATH"] = model_path
+        os.environ.setdefault("MODEL_RELOAD_SECONDS", "0")
+        os.environ["PREDICTION_STORE_PATH"] = ""
+        self.log_dir = tempfile.mkdtemp(prefix="load_test_logs_")
+        os.environ["MONITOR_LOG_DIR"] = self.log_dir
+        if not cache:
+            os.environ["PREDICTION_CACHE_SIZE"] = "0"
+        import uvicorn
+        from Server.main_api import app
+
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning",
+                                                    access_log=False))
+        self.thread = threading.Thread(target=self.server.run, name="uvicorn", daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        deadline = time.monotonic() + 60
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(10)
+        shutil.rmtree(self.log_dir, ignore_errors=True)
+
+
+def request_bodies(scenario, batch_rows, n_bodies=64, seed=42):
+    """JSON bodies for a scenario, cycled through by the workers."""
+    from Server.schemas import FEATURE_COLUMNS
+
+    if scenario == "predict":
+        return make_rows(20_000, seed=seed)
+    bodies = []
+    for i in range(n_bodies):
+        rows = make_rows(batch_rows, seed=seed + i)
+        bodies.append({name: [row[name] for row in rows] for name in FEATURE_COLUMNS})
+    return bodies
+
+
+async def run_scenario(url, scenario, concurrency, duration, rate=None, batch_rows=1000, warmup=20,
+                       timeout=30.0):
+    """Drive one endpoint for `duration` seconds and summarize its throughput, latency and errors."""
+    import httpx
+
+    endpoint, rows_per_request = SCENARIOS[scenario]
+    bodies = request_bodies(scenario, batch_rows)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies, statuses = [], []
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        async def send(body):
+            try:
+                response = await client.post(endpoint, json=body)
+                await response.aread()
+                return response.status_code
+            except httpx.HTTPError as e:
+                return type(e).__name__
+
+        for i in range(warmup):
+            await send(bodies[i % len(bodies)])
+
+        start = time.perf_counter()
+        end = start + duration
+        counter = iter(range(1 << 62))
+
+        async def closed_loop_worker():
+            while time.perf_counter() < end:
+                i = next(counter)
+                sent = time.perf_counter()
+                status = await send(bodies[i % len(bodies)])
+                latencies.append(time.perf_counter() - sent)
+                statuses.append(status)
+
+        async def timed_request(i, scheduled, slots):
+            async with slots:
+                status = await send(bodies[i % len(bodies)])
+            latencies.append(time.perf_counter() - scheduled)
+            statuses.append(status)
+
+        if rate is None:
+            await asyncio.gather(*(closed_loop_worker() for _ in range(concurrency)))
+        else:
+            slots = asyncio.Semaphore(concurrency)
+            tasks = []
+            for i in range(int(duration * rate)):
+                scheduled = start + i / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(timed_request(i, scheduled, slots)))
+            await asyncio.gather(*tasks)
+        wall = time.perf_counter() - start
+
+    rows = rows_per_request or batch_rows
+    return summarize(scenario, endpoint, latencies, statuses, wall, rows)
+
+
+def summarize(scenario, endpoint, latencies, statuses, wall, rows_per_request):
+    latencies_ms = np.asarray(latencies) * 1000
+    ok = np.array([isinstance(status, int) and 200 <= status < 300 for status in statuses], dtype=bool)
+    n_requests = len(statuses)
+    errors = {}
+    for status in np.asarray(statuses, dtype=object)[~ok]:
+        errors[str(status)] = errors.get(str(status), 0) + 1
+    percentiles = np.percentile(latencies_ms, [50, 95, 99]) if n_requests else [np.nan] * 3
+    return {
+        "scenario": scenario,
+        "endpoint": endpoint,
+        "requests": n_requests,
+        "errors": int((~ok).sum()),
+        "error_rate": float((~ok).mean()) if n_requests else 0.0,
+        "error_statuses": errors,
+        "seconds": wall,
+        "requests_per_second": n_requests / wall,
+        "rows_per_second": int(ok.sum()) * rows_per_request / wall,
+        "latency_ms": {
+            "p50": float(percentiles[0]), "p95": float(percentiles[1]), "p99": float(percentiles[2]),
+            "mean": float(latencies_ms.mean()) if n_requests else np.nan,
+            "max": float(latencies_ms.max()) if n_requests else np.nan,
+        },
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_load_test(scenarios, concurrency, duration, rate=None, batch_rows=1000, url=None, model_path=None,
+                  cache=True):
+    """Run every scenario against url (or a local server) and return the results document."""
+    settings = {"scenarios": scenarios, "concurrency": concurrency, "duration": duration, "rate": rate,
+                "batch_rows": batch_rows, "url": url, "model": model_path or ("external" if url else "stand-in"),
+                "prediction_cache": cache}
+
+    def drive(target):
+        return [asyncio.run(run_scenario(target, name, concurrency, duration, rate, batch_rows))
+                for name in scenarios]
+
+    if url:
+        results = drive(url)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = model_path or build_stand_in_model(os.path.join(tmp, "model"))
+            with LocalServer(path, cache=cache) as server:
+                results = drive(server.url)
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "settings": settings,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=["predict", "batch"])
+    parser.add_argument("--concurrency", type=int, default=16, help="connections / requests in flight")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--rate", type=float, default=None, help="open-loop requests per second (default: closed loop)")
+    parser.add_argument("--batch-rows", type=int, default=1000, help="rows per batch / stream request")
+    parser.add_argument("--url", default=None, help="test a running server instead of starting one")
+    parser.add_argument("--model", default=None, help="MLflow model directory to serve (default: stand-in model)")
+    parser.add_argument("--no-cache", action="store_true", help="disable the prediction cache of the local server")
+    parser.add_argument("--out", default=None, help="results JSON (default: Benchmarks/results/load_test_<time>.json)")
+    args = parser.parse_args()
+
+    report = run_load_test(args.scenarios, args.concurrency, args.duration, args.rate, args.batch_rows,
+                           args.url, args.model, cache=not args.no_cache)
+
+    print(f"{'scenario':<10}{'requests':>10}{'req/s':>10}{'rows/s':>12}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'errors':>10}")
+    for result in report["results"]:
+        latency = result["latency_ms"]
+        print(f"{result['scenario']:<10}{result['requests']:>10,}{result['requests_per_second']:>10,.0f}"
+              f"{result['rows_per_second']:>12,.0f}{latency['p50']:>10.1f}{latency['p95']:>10.1f}"
+              f"{latency['p99']:>10.1f}{result['error_rate']:>10.2%}")
+
+    out = args.out or os.path.join(DEFAULT_RESULTS_DIR, f"load_test_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {out}")
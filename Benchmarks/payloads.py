@@ -0,0 +1,36 @@
+"""Sample /predict payloads shared by the benchmark scripts."""
+import numpy as np
+
+SAMPLE_ROW = {
+    "store_nbr": 1.0,
+    "item_nbr": 103665.0,
+    "unit_sales": 7.0,
+    "onpromotion": 0.0,
+    "day": 16,
+    "month": 8,
+    "dayofweek": 1,
+    "week": 33,
+    "family_encoded": 13,
+    "city_encoded": 5,
+    "state_encoded": 11,
+    "type_encoded": 0,
+    "is_outlier": 0,
+    "is_return": 0,
+    "holiday": 0,
+    "year": 2013,
+    "is_weekend": 0
+}
+
+
+def make_rows(n_rows, seed=42):
+    """Sample rows around SAMPLE_ROW so the model does not see one repeated input."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(n_rows):
+        row = dict(SAMPLE_ROW)
+        row["store_nbr"] = float(rng.integers(1, 55))
+        row["unit_sales"] = float(rng.uniform(0, 50))
+        row["onpromotion"] = float(rng.integers(0, 2))
+        row["day"] = int(rng.integers(1, 29))
+        rows.append(row)
+    return rows
@@ -1,71 +1,98 @@
+import os
+import sys
+import numpy as np
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Preprocessing.rollup import SalesRollup, totals, summary
+
+# Pre-aggregated rollup built by Preprocessing/rollup.py; built in memory from the processed data if missing
+ROLLUP_PATH = os.getenv("DASHBOARD_ROLLUP_PATH", "dashboard_rollup")
+
+# Display names of the processed columns
+DISPLAY_NAMES = {'store_nbr': 'store_id', 'item_nbr': 'item_id', 'family_encoded': 'item_category',
+                 'city_encoded': 'city', 'state_encoded': 'state', 'type_encoded': 'store_type',
+                 'holiday': 'is_holiday'}
+LABEL_COLUMNS = {'item_category': 'family', 'city': 'city', 'state': 'state', 'store_type': 'type'}
+FLAG_COLUMNS = ['onpromotion', 'is_return', 'is_holiday', 'is_weekend', 'is_outlier']
+# Filterable columns, in the order the sidebar shows them
+categorical_columns = ['onpromotion', 'item_category', 'city', 'state', 'store_type',
+                       'is_return', 'is_holiday', 'is_weekend', 'is_outlier']
+shown_columns = ['date', 'store_id', 'item_id', 'unit_sales', 'onpromotion', 'item_category', 'city', 'state',
+                 'store_type', 'is_return', 'is_holiday', 'is_weekend', 'is_outlier']
+
 st.set_page_config(page_title="EDA Dashboard", layout="wide")
 
-@st.cache_data  #to cache data for faster reload.
-def load_data():
-    # Load processed data
-    data = pd.read_csv('processed_data.csv')
-    data['date'] = pd.to_datetime(data['date'])
-    
+def decode(frame, label_maps):
+    """Readable labels for the encoded categories and the 0 / 1 flags, as pandas categoricals.
+
+    The integer codes become the categorical codes directly; labels exist once per category,
+    never once per row, and filters (isin) compare codes.
+    """
+    frame = frame.rename(columns=DISPLAY_NAMES)
+    for column, encoded_as in LABEL_COLUMNS.items():
+        codes, uniques = pd.factorize(frame[column], sort=True)
+        if encoded_as in label_maps:
+            # Codes missing from label_encodings.csv keep their number, as a label
+            categories = [label_maps[encoded_as].get(code, str(code)) for code in uniques]
+        else:
+            categories = uniques
+        frame[column] = pd.Categorical.from_codes(codes, categories=categories)
+    for column in FLAG_COLUMNS:
+        frame[column] = pd.Categorical.from_codes(frame[column].clip(0, 1).astype('int8'), ['No', 'Yes'])
+    return frame
+
+def object_bytes(frame):
+    """Memory of frame if its categoricals were object columns of Python strings (as pandas deep-counts them)."""
+    total = 0
+    for column in frame.columns:
+        values = frame[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            counts = np.bincount(values.cat.codes[values.cat.codes >= 0], minlength=len(values.cat.categories))
+            label_sizes = np.array([sys.getsizeof(str(label)) for label in values.cat.categories])
+            total += 8 * len(values) + int(counts @ label_sizes)
+        else:
+            total += int(values.memory_usage(deep=True, index=False))
+    return total
+
+@st.cache_resource  # loaded once per server, shared by all sessions without copying
+def load_rollup():
+    if os.path.isdir(ROLLUP_PATH):
+        rollup = SalesRollup.load(ROLLUP_PATH)
+    else:
+        st.info(f"ℹ️ {ROLLUP_PATH} not found, aggregating the processed data (build it with "
+                f"`python -m Preprocessing.rollup`).")
+        source = 'processed_data_parquet' if os.path.isdir('processed_data_parquet') else 'processed_data.csv'
+        rollup = SalesRollup.build(source)
+
     # Load label encodings to decode categorical variables
+    label_maps = {}
     try:
         encodings = pd.read_csv('label_encodings.csv')
-        
-        # Create reverse mapping dictionaries
-        family_map = dict(zip(encodings[encodings['column'] == 'family']['encoded_value'], 
-                             encodings[encodings['column'] == 'family']['original_value']))
-        city_map = dict(zip(encodings[encodings['column'] == 'city']['encoded_value'], 
-                           encodings[encodings['column'] == 'city']['original_value']))
-        state_map = dict(zip(encodings[encodings['column'] == 'state']['encoded_value'], 
-                            encodings[encodings['column'] == 'state']['original_value']))
-        type_map = dict(zip(encodings[encodings['column'] == 'type']['encoded_value'], 
-                           encodings[encodings['column'] == 'type']['original_value']))
-        
-        # Decode categorical variables back to readable labels
-        data['family'] = data['family_encoded'].map(family_map)
-        data['city'] = data['city_encoded'].map(city_map)
-        data['state'] = data['state_encoded'].map(state_map)
-        data['type'] = data['type_encoded'].map(type_map)
-        
+        for column in LABEL_COLUMNS.values():
+            rows = encodings[encodings['column'] == column]
+            label_maps[column] = dict(zip(rows['encoded_value'], rows['original_value']))
     except FileNotFoundError:
         st.warning("⚠️ label_encodings.csv not found. Using encoded values.")
-        # Use encoded values with readable names
-        data['family'] = data['family_encoded']
-        data['city'] = data['city_encoded']
-        data['state'] = data['state_encoded']
-        data['type'] = data['type_encoded']
-    
-    # Map binary columns to readable labels
-    data['onpromotion'] = data['onpromotion'].map({0: 'No', 1: 'Yes'})
-    data['holiday'] = data['holiday'].map({0: 'No', 1: 'Yes'})
-    data['is_return'] = data['is_return'].map({0: 'No', 1: 'Yes'})
-    data['is_weekend'] = data['is_weekend'].map({0: 'No', 1: 'Yes'})
-    data['is_outlier'] = data['is_outlier'].map({0: 'No', 1: 'Yes'})
-    
-    return data
 
-data = load_data()
+    rollup = SalesRollup(decode(rollup.cube, label_maps), decode(rollup.sample, label_maps))
+    frames = (rollup.cube, rollup.sample)
+    memory = {'compact': sum(int(f.memory_usage(deep=True).sum()) for f in frames),
+              'objects': sum(object_bytes(f) for f in frames)}
+    return rollup, memory
 
-# Select columns for display (using original and readable columns)
-data_shown = data[['date', 'store_nbr', 'item_nbr', 'unit_sales', 'onpromotion', 'family', 'city', 'state', 'type', 'is_return', 'holiday', 'is_weekend', 'is_outlier']]
-data_shown = data_shown.rename(columns={
-    'store_nbr': 'store_id', 
-    'item_nbr': 'item_id', 
-    'family': 'item_category', 
-    'type': 'store_type', 
-    'holiday': 'is_holiday'
-})
+rollup, memory = load_rollup()
 
 # Sidebar
 st.sidebar.header("🔍 Filters")
 
 # Date range filtering
 st.sidebar.markdown("### Filter by date range")
-min_date = data_shown['date'].min().date()
-max_date = data_shown['date'].max().date()
+min_day, max_day = rollup.date_range()
+min_date = pd.Timestamp(min_day).date()
+max_date = pd.Timestamp(max_day).date()
 start_date = st.sidebar.date_input("Start Date", value=min_date, min_value=min_date, max_value=max_date)
 end_date = st.sidebar.date_input("End Date", value=max_date, min_value=min_date, max_value=max_date)
 
@@ -73,25 +100,16 @@ end_date = st.sidebar.date_input("End Date", value=max_date, min_value=min_date,
 start_date = pd.to_datetime(start_date)
 end_date = pd.to_datetime(end_date)
 
-# Get categorical columns
-categorical_columns = data_shown.select_dtypes(include='object').columns.tolist()
-numerical_columns = data_shown.select_dtypes(include='number').columns.tolist()
-
-# Initialize filtered_data with all data
-filtered_data = data_shown.copy()
-
-# Apply date filtering
-filtered_data = filtered_data[(filtered_data['date'] >= start_date) & (filtered_data['date'] <= end_date)]
+# Cells of the selected date range (a slice of the date-sorted cube)
+date_cells = rollup.select(start_date, end_date)
 
 # Categorical filters
 st.sidebar.markdown("### Filter by categorical variables")
 filter_dict = {}
 
 for col in categorical_columns:
-    unique_values = filtered_data[col].unique().tolist()
-    if col == 'date':
-        continue  # Skip date column
-    elif col in ['onpromotion', 'is_return', 'is_holiday', 'is_weekend', 'is_outlier']:
+    unique_values = date_cells[col].unique().tolist()
+    if col in FLAG_COLUMNS:
         selected_value = st.sidebar.radio(f"{col.replace('_', ' ').title()}", unique_values, index=None, key=col)
         if selected_value:
             filter_dict[col] = [selected_value]
@@ -100,25 +118,31 @@ for col in categorical_columns:
         if selected_value:
             filter_dict[col] = selected_value
 
-# Apply all categorical filters
-if filter_dict:
-    for col, value in filter_dict.items():
-        filtered_data = filtered_data[filtered_data[col].isin(list(value))]
+# Apply all filters: every chart below aggregates these cube cells
+filtered_cells = rollup.select(start_date, end_date, **filter_dict)
+filtered_sample = rollup.select_sample(start_date, end_date, **filter_dict)
+overall = summary(filtered_cells)
 
 # Display filtered data count
-st.sidebar.markdown(f"**Filtered Records:** {len(filtered_data):,} / {len(data_shown):,}")
+st.sidebar.markdown(f"**Filtered Records:** {overall['count']:,} / {rollup.n_rows:,}")
+st.sidebar.markdown(f"**Memory:** {memory['compact'] / 1e6:,.1f} MB with categorical / int8 columns "
+                    f"({memory['objects'] / 1e6:,.1f} MB as object labels)")
 
 # Main section
 st.title("📊 Sales Forecasting - EDA Dashboard")
 
 # Data overview
 st.subheader("💾 Data Overview")
-st.markdown("#### First 5 rows of the filtered data")
-st.dataframe(filtered_data.head(), use_container_width=True)
+st.markdown("#### First 5 rows of the filtered data (sampled)")
+st.dataframe(filtered_sample[shown_columns].head(), use_container_width=True)
 
-# Summary statistics
+# Summary statistics: exact moments from the rollup, quartiles from the sampled rows
 st.subheader("📊 Summary Statistics")
-st.dataframe(filtered_data.describe(), use_container_width=True)
+quartiles = filtered_sample['unit_sales'].quantile([0.25, 0.5, 0.75])
+describe = pd.DataFrame({'unit_sales': [overall['count'], overall['mean'], overall['std'], overall['min'],
+                                        quartiles[0.25], quartiles[0.5], quartiles[0.75], overall['max']]},
+                        index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'])
+st.dataframe(describe, use_container_width=True)
 
 st.markdown("---")
 
@@ -127,7 +151,8 @@ col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("💰 Unit Sales Distribution")
-    fig = px.histogram(filtered_data, x='unit_sales', nbins=50, title='Distribution of Unit Sales')
+    fig = px.histogram(filtered_sample, x='unit_sales', nbins=50,
+                       title=f'Distribution of Unit Sales ({len(filtered_sample):,} sampled rows)')
     fig.update_layout(showlegend=False)
     st.plotly_chart(fig, use_container_width=True)
 
@@ -135,8 +160,7 @@ with col2:
     st.subheader("📊 Categorical Analysis")
     cat_col = st.selectbox("Select categorical column for analysis", categorical_columns)
     if cat_col != 'date':
-        cat_counts = filtered_data[cat_col].value_counts().reset_index()
-        cat_counts.columns = [cat_col, 'count']
+        cat_counts = totals(filtered_cells, cat_col)[[cat_col, 'count']].sort_values('count', ascending=False)
         fig2 = px.bar(cat_counts, x=cat_col, y='count', 
                      title=f"{cat_col.replace('_', ' ').title()} Distribution",
                      color='count', color_continuous_scale='viridis')
@@ -146,7 +170,7 @@ st.markdown("---")
 
 # Time series analysis
 st.subheader("📆 Sales Trend Over Time")
-daily_sales = filtered_data.groupby('date')['unit_sales'].sum().reset_index()
+daily_sales = totals(filtered_cells, 'date').sort_values('date')
 fig3 = px.line(daily_sales, x='date', y='unit_sales', 
                title="Daily Sales Trend",
                labels={'unit_sales': 'Total Unit Sales', 'date': 'Date'})
@@ -162,7 +186,7 @@ col5, col6 = st.columns(2)
 
 with col5:
     # Total sales by state
-    state_sales = filtered_data.groupby('state')['unit_sales'].sum().sort_values(ascending=False).reset_index()
+    state_sales = totals(filtered_cells, 'state').sort_values('unit_sales', ascending=False)
     fig6 = px.bar(state_sales, x='state', y='unit_sales',
                   title='Total Unit Sales by State',
                   labels={'state': 'State', 'unit_sales': 'Total Unit Sales'},
@@ -171,7 +195,7 @@ with col5:
 
 with col6:
     # Top 10 cities by sales
-    city_sales = filtered_data.groupby('city')['unit_sales'].sum().sort_values(ascending=False).head(10).reset_index()
+    city_sales = totals(filtered_cells, 'city').sort_values('unit_sales', ascending=False).head(10)
     fig7 = px.bar(city_sales, x='city', y='unit_sales',
                   title='Top 10 Cities by Total Unit Sales',
                   labels={'city': 'City', 'unit_sales': 'Total Unit Sales'},
@@ -182,7 +206,7 @@ col7, col8 = st.columns(2)
 
 with col7:
     # Sales by store type
-    type_sales = filtered_data.groupby('store_type')['unit_sales'].sum().sort_values(ascending=False).reset_index()
+    type_sales = totals(filtered_cells, 'store_type').sort_values('unit_sales', ascending=False)
     fig8 = px.bar(type_sales, x='store_type', y='unit_sales',
                   title='Total Unit Sales by Store Type',
                   labels={'store_type': 'Store Type', 'unit_sales': 'Total Unit Sales'},
@@ -191,7 +215,7 @@ with col7:
 
 with col8:
     # Top 10 product categories
-    category_sales = filtered_data.groupby('item_category')['unit_sales'].sum().sort_values(ascending=False).head(10).reset_index()
+    category_sales = totals(filtered_cells, 'item_category').sort_values('unit_sales', ascending=False).head(10)
     fig9 = px.bar(category_sales, x='item_category', y='unit_sales',
                   title='Top 10 Product Categories by Sales',
                   labels={'item_category': 'Product Category', 'unit_sales': 'Total Unit Sales'},
@@ -207,15 +231,16 @@ col3, col4 = st.columns(2)
 with col3:
     choice = st.selectbox("Select aggregation method", ['Total Sales', 'Average Sales'])
     
+    promo_totals = totals(filtered_cells, 'onpromotion')
     if choice == 'Average Sales':
-        promo_impact = filtered_data.groupby('onpromotion')['unit_sales'].mean().reset_index()
+        promo_impact = promo_totals[['onpromotion', 'mean']]
         promo_impact.columns = ['onpromotion', 'avg_unit_sales']
         fig4 = px.bar(promo_impact, x='onpromotion', y='avg_unit_sales',
                       title='Average Unit Sales: Promoted vs Non-Promoted',
                       labels={'onpromotion': 'On Promotion', 'avg_unit_sales': 'Average Unit Sales'},
                       color='onpromotion', color_discrete_map={'Yes': 'orange', 'No': 'lightblue'})
     else:
-        promo_impact = filtered_data.groupby('onpromotion')['unit_sales'].sum().reset_index()
+        promo_impact = promo_totals[['onpromotion', 'unit_sales']]
         promo_impact.columns = ['onpromotion', 'total_unit_sales']
         fig4 = px.bar(promo_impact, x='onpromotion', y='total_unit_sales',
                       title='Total Sales: Promoted vs Non-Promoted',
@@ -226,7 +251,7 @@ with col3:
 
 with col4:
     # Promotion distribution pie chart
-    promo_total = filtered_data.groupby('onpromotion')['unit_sales'].sum().reset_index()
+    promo_total = totals(filtered_cells, 'onpromotion')
     fig5 = px.pie(promo_total, values='unit_sales', names='onpromotion',
                   title='Sales Distribution: Promoted vs Non-Promoted',
                   color_discrete_map={'Yes': 'orange', 'No': 'lightblue'},
@@ -242,7 +267,7 @@ col9, col10, col11, col12 = st.columns(4)
 
 with col9:
     # Holiday impact
-    holiday_sales = filtered_data.groupby('is_holiday')['unit_sales'].sum().reset_index()
+    holiday_sales = totals(filtered_cells, 'is_holiday')
     fig10 = px.bar(holiday_sales, x='is_holiday', y='unit_sales',
                    title='Sales by Holiday Status',
                    color='is_holiday',
@@ -258,7 +283,7 @@ with col10:
 
 with col11:
     # Weekend impact
-    weekend_sales = filtered_data.groupby('is_weekend')['unit_sales'].sum().reset_index()
+    weekend_sales = totals(filtered_cells, 'is_weekend')
     fig12 = px.bar(weekend_sales, x='is_weekend', y='unit_sales',
                    title='Sales by Weekend Status',
                    color='is_weekend',
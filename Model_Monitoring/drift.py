@@ -0,0 +1,138 @@
+import threading
+import time
+import numpy as np
+
+EPSILON = 1e-4
+
+
+class StreamingDriftDetector:
+    """Sliding-window drift scores for every feature against the training profile.
+
+    The window is kept as `n_buckets` fixed-bin histograms (plus count / sum /
+    sum of squares) of `window_rows // n_buckets` rows each; when the newest
+    bucket fills up, the oldest one is cleared and reused, so memory does not
+    grow with traffic. Every `eval_every_rows` rows or `eval_every_seconds`
+    seconds the window is compared with the training histograms (PSI, KS
+    distance and mean shift in training standard deviations), all features at
+    once. A feature raises an alert only when it crosses the PSI or KS threshold,
+    not again while it stays above it.
+    """
+
+    def __init__(self, profile, features, window_rows=5000, n_buckets=10, eval_every_rows=1000,
+                 eval_every_seconds=60.0, psi_threshold=0.2, ks_threshold=0.1, min_rows=200):
+        self.features = [f for f in features if f in profile["features"]]
+        stats = [profile["features"][f] for f in self.features]
+        edges = [np.asarray(s["bin_edges"], dtype=np.float64) for s in stats]
+        if len({len(e) for e in edges}) != 1:
+            raise ValueError("All features in the training profile must use the same number of bins.")
+
+        self.n_features = len(self.features)
+        self.n_bins = len(edges[0]) - 1
+        # Interior edges only: values below / above the training range fall in the first / last bin
+        self._inner_edges = np.stack([e[1:-1] for e in edges])
+        train_counts = np.asarray([s["bin_counts"] for s in stats], dtype=np.float64)
+        self._train_probs = self._probabilities(train_counts)
+        self._train_cdf = np.cumsum(self._train_probs, axis=1)
+        self._train_mean = np.asarray([s["mean"] for s in stats])
+        self._train_std = np.asarray([s["std"] for s in stats])
+
+        self.bucket_rows = max(window_rows // n_buckets, 1)
+        self.eval_every_rows = eval_every_rows
+        self.eval_every_seconds = eval_every_seconds
+        self.psi_threshold = psi_threshold
+        self.ks_threshold = ks_threshold
+        self.min_rows = min_rows
+
+        self._hist = np.zeros((n_buckets, self.n_features, self.n_bins), dtype=np.int64)
+        self._count = np.zeros((n_buckets, self.n_features))
+        self._sum = np.zeros((n_buckets, self.n_features))
+        self._sumsq = np.zeros((n_buckets, self.n_features))
+        self._bucket_fill = np.zeros(n_buckets, dtype=np.int64)
+        self._current = 0
+        self._rows_since_eval = 0
+        self._last_eval = time.monotonic()
+        self._drifted = np.zeros(self.n_features, dtype=bool)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _probabilities(counts):
+        totals = counts.sum(axis=1, keepdims=True)
+        probs = np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+        return np.clip(probs, EPSILON, None)
+
+    def update(self, values):
+        """Add an (n_rows, n_features) array of feature values to the window.
+
+        Returns the evaluation result if this update triggered one, else None.
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1, self.n_features)
+        with self._lock:
+            start = 0
+            while start < len(values):
+                room = self.bucket_rows - self._bucket_fill[self._current]
+                if room == 0:
+                    self._rotate()
+                    continue
+                self._add(values[start:start + room])
+                start += room
+            self._rows_since_eval += len(values)
+
+            due = (self._rows_since_eval >= self.eval_every_rows
+                   or time.monotonic() - self._last_eval >= self.eval_every_seconds)
+            if due and self._bucket_fill.sum() >= self.min_rows:
+                return self._evaluate()
+        return None
+
+    def _rotate(self):
+        self._current = (self._current + 1) % len(self._bucket_fill)
+        self._hist[self._current] = 0
+        self._count[self._current] = 0
+        self._sum[self._current] = 0
+        self._sumsq[self._current] = 0
+        self._bucket_fill[self._current] = 0
+
+    def _add(self, values):
+        finite = np.isfinite(values)
+        bins = (values[:, :, None] >= self._inner_edges[None, :, :]).sum(axis=2)
+        # One bincount for all features: feature i owns slots [i * n_bins, (i + 1) * n_bins)
+        flat = np.where(finite, bins + np.arange(self.n_features) * self.n_bins, self.n_features * self.n_bins)
+        counts = np.bincount(flat.ravel(), minlength=self.n_features * self.n_bins + 1)
+        self._hist[self._current] += counts[:-1].reshape(self.n_features, self.n_bins)
+
+        filled = np.where(finite, values, 0.0)
+        self._count[self._current] += finite.sum(axis=0)
+        self._sum[self._current] += filled.sum(axis=0)
+        self._sumsq[self._current] += (filled ** 2).sum(axis=0)
+        self._bucket_fill[self._current] += len(values)
+
+    def _evaluate(self):
+        window_probs = self._probabilities(self._hist.sum(axis=0).astype(np.float64))
+        psi = ((window_probs - self._train_probs) * np.log(window_probs / self._train_probs)).sum(axis=1)
+        ks = np.abs(np.cumsum(window_probs, axis=1) - self._train_cdf).max(axis=1)
+
+        count = self._count.sum(axis=0)
+        window_mean = np.divide(self._sum.sum(axis=0), count, out=np.full(self.n_features, np.nan), where=count > 0)
+        std = np.where(self._train_std > 0, self._train_std, 1.0)
+        mean_shift = (window_mean - self._train_mean) / std
+
+        drifted = (psi > self.psi_threshold) | (ks > self.ks_threshold)
+        alerts = [
+            f"Drift in {self.features[i]}: PSI={psi[i]:.3f}, KS={ks[i]:.3f}, mean shift={mean_shift[i]:.2f} std"
+            for i in np.flatnonzero(drifted & ~self._drifted)
+        ]
+        recovered = [self.features[i] for i in np.flatnonzero(~drifted & self._drifted)]
+        self._drifted = drifted
+        self._rows_since_eval = 0
+        self._last_eval = time.monotonic()
+
+        scores = {
+            feature: {"psi": round(float(psi[i]), 4), "ks": round(float(ks[i]), 4),
+                      "mean_shift": round(float(mean_shift[i]), 4), "drifted": bool(drifted[i])}
+            for i, feature in enumerate(self.features)
+        }
+        return {
+            "window_rows": int(self._bucket_fill.sum()),
+            "scores": scores,
+            "alerts": alerts,
+            "recovered": recovered,
+        }
@@ -0,0 +1,181 @@
+"""Join arriving actual sales to the served predictions and monitor the aggregated error.
+
+    python -m Model_Monitoring.ground_truth --actuals sales_2014-11.csv --out Logs/ground_truth
+
+The actuals (CSV or Parquet with date, store_nbr, item_nbr and unit_sales, e.g.
+the newest rows of the raw sales data) are summed per (date, store_nbr, item_nbr).
+Only the predictions of the actuals' date range are read from the prediction
+store (Model_Monitoring/prediction_store.py), and both are joined on that key in
+one hash join. A key predicted several times (repeated requests, the prober)
+counts once per model, with its latest prediction; --all-predictions evaluates
+every served prediction.
+
+MAPE (over non-zero actuals), RMSE and bias (mean of predicted - actual) come
+from grouped sums, overall and per store, family and day (--levels adds model
+and endpoint). Every group is logged to Logs/error_metrics.csv. Alerts are raised on
+the aggregates: one for the overall MAPE and one per level listing the groups of
+at least ERROR_MIN_ROWS rows above ERROR_THRESHOLD_PERCENT, never one per row.
+"""
+import argparse
+import os
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from Model_Monitoring.monitor import (ERROR_METRICS_LOG, ERROR_MIN_ROWS, ERROR_THRESHOLD_PERCENT,
+                                      PREDICTION_STORE_PATH, alert, log_to_csv, monitor_prediction_error, shutdown_logging)
+from Model_Monitoring.prediction_store import read_predictions
+
+ACTUAL_KEYS = ["date", "store_nbr", "item_nbr"]
+DEFAULT_LEVELS = ["store_nbr", "family", "date"]
+LEVELS = DEFAULT_LEVELS + ["model", "endpoint"]
+# Groups named in a level alert
+ALERT_GROUPS = 5
+
+
+def key_dtypes(frame):
+    """Join keys in the prediction store's dtypes (dates at day resolution, int32 ids)."""
+    frame["date"] = pd.to_datetime(frame["date"]).dt.normalize().astype("datetime64[ns]")
+    frame["store_nbr"] = frame["store_nbr"].astype(np.int32)
+    frame["item_nbr"] = frame["item_nbr"].astype(np.int32)
+    return frame
+
+
+def read_actuals(path, chunksize=1_000_000):
+    """Actual unit_sales summed per (date, store_nbr, item_nbr), from a CSV or a Parquet file / dataset."""
+    columns = ACTUAL_KEYS + ["unit_sales"]
+    if str(path).endswith(".csv"):
+        parts = [key_dtypes(chunk).groupby(ACTUAL_KEYS, sort=False)["unit_sales"].sum()
+                 for chunk in pd.read_csv(path, usecols=columns, chunksize=chunksize)]
+        if not parts:
+            return pd.DataFrame(columns=columns)
+        summed = pd.concat(parts).groupby(level=ACTUAL_KEYS, sort=False).sum()
+    else:
+        summed = key_dtypes(pd.read_parquet(path, columns=columns)).groupby(ACTUAL_KEYS, sort=False)["unit_sales"].sum()
+    return summed.reset_index()
+
+
+def join_actuals(predictions, actuals, latest=True):
+    """Predictions with their actual unit_sales; with latest, only the last prediction per key and model."""
+    predictions = key_dtypes(predictions)
+    if latest:
+        predictions = (predictions.sort_values("timestamp", kind="stable")
+                       .drop_duplicates(ACTUAL_KEYS + ["model"], keep="last"))
+    return predictions.merge(actuals, on=ACTUAL_KEYS, how="inner", sort=False)
+
+
+def error_table(joined, by):
+    """rows, MAPE (%), RMSE, bias, actual and predicted sales per value of `by`, from grouped sums."""
+    actual = joined["unit_sales"].to_numpy(dtype=np.float64)
+    predicted = joined["predicted_sales"].to_numpy(dtype=np.float64)
+    error = predicted - actual
+    nonzero = actual != 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ape = np.where(nonzero, np.abs(error) / np.abs(actual), 0.0)
+    grouped = pd.DataFrame({
+        by: joined[by].to_numpy(), "error": error, "squared": error * error, "ape": ape, "nonzero": nonzero,
+        "actual": actual, "predicted": predicted,
+    }).groupby(by, sort=True).agg(
+        rows=("error", "size"), error=("error", "sum"), squared=("squared", "sum"), ape=("ape", "sum"),
+        nonzero=("nonzero", "sum"), actual=("actual", "sum"), predicted=("predicted", "sum"),
+    )
+    rows = grouped["rows"].to_numpy(dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mape = np.where(grouped["nonzero"] > 0, grouped["ape"] / grouped["nonzero"] * 100, np.nan)
+    return pd.DataFrame({
+        by: grouped.index,
+        "rows": grouped["rows"].to_numpy(),
+        "mape": mape,
+        "rmse": np.sqrt(grouped["squared"].to_numpy() / rows),
+        "bias": grouped["error"].to_numpy() / rows,
+        "actual_sales": grouped["actual"].to_numpy(),
+        "predicted_sales": grouped["predicted"].to_numpy(),
+    })
+
+
+def load_family_labels(path="label_encodings.csv"):
+    """family code -> name from the label encodings written by preprocessing, or {} without them."""
+    if not os.path.exists(path):
+        return {}
+    encodings = pd.read_csv(path)
+    rows = encodings[encodings["column"] == "family"]
+    return dict(zip(rows["encoded_value"], rows["original_value"]))
+
+
+def group_labels(level, values, family_labels):
+    if level == "date":
+        return pd.DatetimeIndex(values).strftime("%Y-%m-%d").tolist()
+    if level == "family":
+        return [family_labels.get(code, str(code)) for code in values]
+    return [str(value) for value in values]
+
+
+def report_errors(tables, family_labels=None, threshold=ERROR_THRESHOLD_PERCENT, min_rows=ERROR_MIN_ROWS):
+    """Log every group to the error log and raise one alert per level with groups above the MAPE threshold."""
+    family_labels = family_labels or {}
+    now = datetime.now()
+    for level, table in tables.items():
+        labels = group_labels(level, table[level], family_labels)
+        for label, rows, mape, rmse, bias in zip(labels, table["rows"].tolist(), table["mape"].tolist(),
+                                                 table["rmse"].tolist(), table["bias"].tolist()):
+            log_to_csv(ERROR_METRICS_LOG, [now, level, label, rows, mape, rmse, bias])
+
+        high = ((table["rows"] >= min_rows) & (table["mape"] > threshold)).to_numpy()
+        if high.any():
+            worst = np.argsort(-table["mape"].to_numpy()[high], kind="stable")[:ALERT_GROUPS]
+            high_labels = np.asarray(labels, dtype=object)[high]
+            high_mape = table["mape"].to_numpy()[high]
+            alert(f"High prediction error for {int(high.sum())} of {len(table)} {level} groups "
+                  f"(MAPE > {threshold:g}% over >= {min_rows} rows); worst: "
+                  + ", ".join(f"{high_labels[i]} {high_mape[i]:.1f}%" for i in worst))
+
+
+def run_ground_truth(actuals_path, store_path=PREDICTION_STORE_PATH, levels=DEFAULT_LEVELS, latest=True,
+                     encodings_path="label_encodings.csv", out_dir=None):
+    """Join actuals with the stored predictions, log and alert on the errors; returns (overall, tables)."""
+    actuals = read_actuals(actuals_path)
+    if actuals.empty:
+        return None, {}
+    predictions = read_predictions(store_path, actuals["date"].min(), actuals["date"].max(),
+                                   columns=["timestamp", "endpoint", "model", "date", "store_nbr", "item_nbr",
+                                            "family", "predicted_sales"])
+    joined = join_actuals(predictions, actuals, latest)
+    if joined.empty:
+        return None, {}
+
+    overall = monitor_prediction_error(joined["unit_sales"], joined["predicted_sales"])
+    tables = {level: error_table(joined, level) for level in levels}
+    family_labels = load_family_labels(encodings_path)
+    report_errors(tables, family_labels)
+
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+        for level, table in tables.items():
+            table.assign(**{level: group_labels(level, table[level], family_labels)}).to_csv(
+                os.path.join(out_dir, f"error_by_{level}.csv"), index=False)
+    overall.update(actual_rows=len(actuals), predictions=len(predictions))
+    return overall, tables
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--actuals", required=True, help="CSV or Parquet with date, store_nbr, item_nbr, unit_sales")
+    parser.add_argument("--predictions", default=PREDICTION_STORE_PATH, help="prediction store directory")
+    parser.add_argument("--levels", nargs="+", choices=LEVELS, default=DEFAULT_LEVELS, help="error breakdowns")
+    parser.add_argument("--all-predictions", action="store_true", help="evaluate every prediction of a key")
+    parser.add_argument("--encodings", default="label_encodings.csv", help="label encodings for family names")
+    parser.add_argument("--out", default=None, help="directory for error_by_<level>.csv reports")
+    args = parser.parse_args()
+
+    try:
+        overall, tables = run_ground_truth(args.actuals, args.predictions, args.levels, not args.all_predictions,
+                                           args.encodings, args.out)
+    finally:
+        shutdown_logging()
+    if overall is None:
+        print(f"⚠️ No stored predictions match the actuals in {args.actuals}")
+    else:
+        print(f"✅ {overall['rows']:,} predictions joined with {overall['actual_rows']:,} actuals: "
+              f"MAPE {overall['mape']:.2f}%, RMSE {overall['rmse']:.3f}, bias {overall['bias']:+.3f}")
+        for level, table in tables.items():
+            print(f"  {level}: {len(table)} groups, MAPE {np.nanmin(table['mape']):.1f}% to "
+                  f"{np.nanmax(table['mape']):.1f}%")
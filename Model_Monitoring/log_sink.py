@@ -0,0 +1,138 @@
+import atexit
+import csv
+import os
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class LogSink:
+    """Append rows to CSV logs from a background thread.
+
+    `write()` only puts the row on a bounded in-memory queue; a writer thread
+    groups queued rows per file and appends them once `flush_rows` rows are
+    pending or `flush_interval` seconds have passed. When the queue is full the
+    row is dropped ("drop" policy) or the caller waits up to `block_timeout`
+    seconds for room before dropping it ("block" policy). Dropped rows are counted.
+    """
+
+    def __init__(self, headers=None, max_queue=10000, flush_rows=500, flush_interval=1.0,
+                 policy="drop", block_timeout=0.1):
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unknown log sink policy: {policy}")
+        self.headers = headers or {}
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._initialized = set()
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def write(self, filename, row):
+        """Queue one row for `filename`; returns False if it was dropped."""
+        if self._thread is None:
+            self.start()
+        try:
+            if self.policy == "block":
+                self._queue.put((filename, row), timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait((filename, row))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far has been written, for at most `timeout` seconds."""
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(max(deadline - time.monotonic(), 0))
+
+    def close(self, timeout=5.0):
+        """Write all pending rows and stop the writer thread, waiting at most `timeout` seconds."""
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass  # The writer is stuck; it is a daemon thread and does not hold up the exit
+        self._thread.join(max(deadline - time.monotonic(), 0))
+        self._thread = None
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors,
+            "policy": self.policy,
+        }
+
+    def _run(self):
+        pending = {}
+        n_pending = 0
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._write_pending(pending)
+                return
+            if isinstance(item, threading.Event):
+                self._write_pending(pending)
+                pending, n_pending = {}, 0
+                item.set()
+                continue
+            if item is not None:
+                filename, row = item
+                pending.setdefault(filename, []).append(row)
+                n_pending += 1
+
+            if n_pending >= self.flush_rows or time.monotonic() >= deadline:
+                self._write_pending(pending)
+                pending, n_pending = {}, 0
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write_pending(self, pending):
+        for filename, rows in pending.items():
+            try:
+                self._append(filename, rows)
+                self.written += len(rows)
+            except OSError as e:
+                self.write_errors += len(rows)
+                print(f"Failed to write {len(rows)} rows to {filename}: {e}")
+
+    def _append(self, filename, rows):
+        if filename not in self._initialized:
+            directory = os.path.dirname(filename)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if filename in self.headers and (not os.path.exists(filename) or os.path.getsize(filename) == 0):
+                rows = [self.headers[filename]] + rows
+            self._initialized.add(filename)
+        with open(filename, 'a', newline='') as file:
+            csv.writer(file).writerows(rows)
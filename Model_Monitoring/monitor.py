@@ -1,73 +1,146 @@
 import requests
 import csv
 import time
-import pandas as pd
 import os
 from datetime import datetime
 import numpy as np
 import json
+from Model_Monitoring.log_sink import LogSink
+from Model_Monitoring.drift import StreamingDriftDetector
+from Model_Monitoring.prediction_store import PredictionStore
+from Server.schemas import FEATURE_COLUMNS
 
 API_URL = 'http://localhost:8000/predict'
 
-LATENCY_LOG = 'Logs/latency_log.csv'
-ERROR_LOG = 'Logs/error_log.csv'
-DRIFT_LOG = 'Logs/drift_log.csv'
-TRAINING_STATS_PATH = "processed_data.csv"
+# Directory of the monitoring logs below
+LOG_DIR = os.getenv("MONITOR_LOG_DIR", "Logs")
+LATENCY_LOG = os.path.join(LOG_DIR, 'latency_log.csv')
+# Aggregated prediction error per group (a new file: error_log.csv keeps the old per-row layout)
+ERROR_METRICS_LOG = os.path.join(LOG_DIR, 'error_metrics.csv')
+DRIFT_LOG = os.path.join(LOG_DIR, 'drift_log.csv')
+# Primary vs shadow model differences, written by Server/model_manager.py
+SHADOW_LOG = os.path.join(LOG_DIR, 'shadow_log.csv')
+# One row per probe of the continuous prober (Model_Monitoring/prober.py)
+PROBE_LOG = os.path.join(LOG_DIR, 'probe_log.csv')
+ALERT_LOG = os.path.join(LOG_DIR, 'alerts.log')
+# Precomputed profile of the training data, built by Model_Monitoring/training_stats.py
+TRAINING_STATS_PATH = os.getenv("TRAINING_STATS_PATH", "Model_Monitoring/training_stats.json")
+
+LOG_HEADERS = {
+    LATENCY_LOG: ['Date', 'Latency_ms', 'Status_Code'],
+    ERROR_METRICS_LOG: ['Date', 'Level', 'Key', 'Rows', 'MAPE', 'RMSE', 'Bias'],
+    DRIFT_LOG: ['Date', 'Drift_Results'],
+    SHADOW_LOG: ['Date', 'Endpoint', 'Rows', 'Model', 'Shadow_Model', 'Mean_Abs_Diff', 'Max_Abs_Diff',
+                 'Mean_Rel_Diff', 'Mean_Predicted', 'Mean_Shadow_Predicted'],
+    PROBE_LOG: ['Date', 'Probe', 'Endpoint', 'Latency_ms', 'Status', 'Good'],
+}
+
+SAMPLE_PAYLOAD = {
+    "store_nbr": 1.0,
+    "item_nbr": 103665.0,
+    "unit_sales": 7.0,
+    "onpromotion": 0.0,
+    "day": 16,
+    "month": 8,
+    "dayofweek": 1,
+    "week": 33,
+    "family_encoded": 13,
+    "city_encoded": 5,
+    "state_encoded": 11,
+    "type_encoded": 0,
+    "is_outlier": 0,
+    "is_return": 0,
+    "holiday": 0,
+    "year": 2013,
+    "is_weekend": 0
+}
+
+# Log rows are written by a background thread so callers never wait on disk I/O
+LOG_SINK = LogSink(
+    headers=LOG_HEADERS,
+    max_queue=int(os.getenv("MONITOR_LOG_QUEUE_SIZE", "10000")),
+    flush_rows=int(os.getenv("MONITOR_LOG_FLUSH_ROWS", "500")),
+    flush_interval=float(os.getenv("MONITOR_LOG_FLUSH_SECONDS", "1.0")),
+    policy=os.getenv("MONITOR_LOG_POLICY", "drop"),
+)
+
+# Served predictions with their request ID and key, joined with actual sales by Model_Monitoring/ground_truth.py
+# (an empty PREDICTION_STORE_PATH disables recording)
+PREDICTION_STORE_PATH = os.getenv("PREDICTION_STORE_PATH", os.path.join(LOG_DIR, "predictions"))
+PREDICTION_STORE = PredictionStore(
+    PREDICTION_STORE_PATH,
+    max_queue=int(os.getenv("PREDICTION_STORE_QUEUE_SIZE", "10000")),
+    flush_rows=int(os.getenv("PREDICTION_STORE_FLUSH_ROWS", "100000")),
+    flush_interval=float(os.getenv("PREDICTION_STORE_FLUSH_SECONDS", "10")),
+) if PREDICTION_STORE_PATH else None
 
 def initialize_log_files():
     # Create logs directory if it doesn't exist
-    os.makedirs('Logs', exist_ok=True)
+    os.makedirs(LOG_DIR, exist_ok=True)
     
-    for log_file in [LATENCY_LOG, ERROR_LOG, DRIFT_LOG]:
+    for log_file, header in LOG_HEADERS.items():
         # Check if file doesn't exist OR if it exists but is empty
         if not os.path.exists(log_file) or (os.path.exists(log_file) and os.path.getsize(log_file) == 0):
-            if log_file == LATENCY_LOG:
-                log_to_csv(log_file, ['Date', 'Latency_ms', 'Status_Code'])
-            elif log_file == ERROR_LOG:
-                log_to_csv(log_file, ['Date', 'Actual', 'Predicted', 'MAPE'])
-            else:  # DRIFT_LOG
-                log_to_csv(log_file, ['Date', 'Drift_Results'])
+            with open(log_file, 'w', newline='') as file:
+                csv.writer(file).writerow(header)
             print(f"Initialized {log_file}")
         else:
             print(f"{log_file} already exists and has data")
 def load_training_stats():
-    """Load training statistics only once."""
+    """Load the precomputed training profile (per-feature mean, std, quantiles, histogram)."""
     if not os.path.exists(TRAINING_STATS_PATH):
         print("Training stats file not found:", TRAINING_STATS_PATH)
+        print("Build it with: python -m Model_Monitoring.training_stats --data processed_data_parquet")
         return None
-    
-    df = pd.read_csv(TRAINING_STATS_PATH)
 
-    stats = {
-        "unit_sales_mean": df["unit_sales"].mean(),
-        "unit_sales_std": df["unit_sales"].std(),
-        "onpromotion_mean": df["onpromotion"].mean(),
-        "onpromotion_std": df["onpromotion"].std(),
-    }
-    return stats
+    with open(TRAINING_STATS_PATH) as f:
+        return json.load(f)
+
+_train_stats = None
+_train_stats_loaded = False
 
-TRAIN_STATS = load_training_stats()
+def get_training_stats():
+    """Load training statistics only once, on first use."""
+    global _train_stats, _train_stats_loaded
+    if not _train_stats_loaded:
+        _train_stats = load_training_stats()
+        _train_stats_loaded = True
+    return _train_stats
 
 LATENCY_THRESHOLD_MS = 1000
-ERROR_THRESHOLD_PERCENT = 5   # example: MAPE > 5% triggers alert
-DRIFT_THRESHOLD = 0.5       # mean difference tolerance
+ERROR_THRESHOLD_PERCENT = float(os.getenv("ERROR_THRESHOLD_PERCENT", "5"))   # aggregated MAPE > 5% triggers alert
+ERROR_MIN_ROWS = int(os.getenv("ERROR_MIN_ROWS", "30"))   # fewer joined rows never alert
+DRIFT_PSI_THRESHOLD = float(os.getenv("DRIFT_PSI_THRESHOLD", "0.2"))   # PSI > 0.2: significant shift
+DRIFT_KS_THRESHOLD = float(os.getenv("DRIFT_KS_THRESHOLD", "0.1"))
+DRIFT_WINDOW_ROWS = int(os.getenv("DRIFT_WINDOW_ROWS", "5000"))         # sliding window of recent rows
+DRIFT_EVAL_EVERY_ROWS = int(os.getenv("DRIFT_EVAL_EVERY_ROWS", "1000"))
+DRIFT_EVAL_EVERY_SECONDS = float(os.getenv("DRIFT_EVAL_EVERY_SECONDS", "60"))
 
 def log_to_csv(filename, row):
-    initialize_log_files()
-    with open(filename, 'a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(row)
+    LOG_SINK.write(filename, row)
+
+def shutdown_logging():
+    """Flush queued log rows and predictions to disk and stop the writer threads."""
+    if PREDICTION_STORE is not None:
+        PREDICTION_STORE.close()
+    LOG_SINK.close()
 
 def alert(msg):
     print(f"[Alert] {msg}")
-    log_to_csv("Logs/alerts.log", [datetime.now(), msg])
+    log_to_csv(ALERT_LOG, [datetime.now(), msg])
 
 
 # API health check
+_session = None
+
 def check_api_health(payload):
+    """One /predict request over a reused keep-alive session; see prober.py for continuous probing."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
     start = time.time()
     try:
-        response = requests.post(API_URL, json=payload, timeout=10)
+        response = _session.post(API_URL, json=payload, timeout=10)
         latency_ms = (time.time() - start) * 1000
 
         log_to_csv(LATENCY_LOG, [datetime.now(), latency_ms, response.status_code])
@@ -81,95 +154,96 @@ def check_api_health(payload):
         return None, None
     
 # Prediction Error Monitoring
-def monitor_prediction_error(actual, predicted):
-    if actual == 0:
-        return 0
-    # calculate MAPE (mean absolute percentage error)
-    mape = abs((actual - predicted) / actual) * 100
-    log_to_csv(ERROR_LOG, [datetime.now(), actual, predicted, mape])
+def monitor_prediction_error(actual, predicted, level="overall", key="all"):
+    """MAPE, RMSE and bias of a batch of predictions against their actual sales, logged as one row.
+
+    MAPE skips zero actuals. One alert is raised when the aggregated MAPE of at
+    least ERROR_MIN_ROWS rows exceeds ERROR_THRESHOLD_PERCENT; the breakdown per
+    store, family and day comes from Model_Monitoring/ground_truth.py.
+    """
+    actual = np.asarray(actual, dtype=np.float64)
+    predicted = np.asarray(predicted, dtype=np.float64)
+    if not len(actual):
+        return None
+    error = predicted - actual
+    nonzero = actual != 0
+    mape = float(np.mean(np.abs(error[nonzero]) / np.abs(actual[nonzero])) * 100) if nonzero.any() else np.nan
+    rmse = float(np.sqrt(np.mean(error ** 2)))
+    bias = float(error.mean())
+    log_to_csv(ERROR_METRICS_LOG, [datetime.now(), level, key, len(actual), mape, rmse, bias])
 
-    if mape > ERROR_THRESHOLD_PERCENT:
-        print(f"[ALERT] High MAPE detected: {mape:.2f}%")
-        alert(f"High prediction error detected: MAPE = {mape:.2f}%")
+    if len(actual) >= ERROR_MIN_ROWS and mape > ERROR_THRESHOLD_PERCENT:
+        alert(f"High prediction error detected: MAPE = {mape:.2f}% over {len(actual):,} predictions "
+              f"({level} {key}, bias {bias:+.2f})")
 
-    return mape
+    return {"rows": len(actual), "mape": mape, "rmse": rmse, "bias": bias}
 
 # Data drift Monitoring
-def detect_data_drift(input_row):
-    """Check input features drift using training stats."""
-    drift_results = {}
-    drift_alerts = []
-
-    for feature in ["unit_sales", "onpromotion"]:
-        if feature not in TRAIN_STATS:
-            continue
-        
-        train_mean = TRAIN_STATS[f"{feature}_mean"]
-        new_value = input_row.get(feature)
-
-        if new_value is None:
-            continue
-
-        diff = abs(new_value - train_mean)
-        drift_results[feature] = diff
+_drift_detector = None
+
+def get_drift_detector():
+    """Create the streaming drift detector once the training profile is available."""
+    global _drift_detector
+    if _drift_detector is None:
+        train_stats = get_training_stats()
+        if train_stats is not None:
+            _drift_detector = StreamingDriftDetector(
+                train_stats,
+                FEATURE_COLUMNS,
+                window_rows=DRIFT_WINDOW_ROWS,
+                eval_every_rows=DRIFT_EVAL_EVERY_ROWS,
+                eval_every_seconds=DRIFT_EVAL_EVERY_SECONDS,
+                psi_threshold=DRIFT_PSI_THRESHOLD,
+                ks_threshold=DRIFT_KS_THRESHOLD,
+            )
+    return _drift_detector
+
+def detect_data_drift(input_rows):
+    """Feed request rows (one dict or a DataFrame) to the sliding-window drift detector.
+
+    Drift scores are logged once per evaluation window and alerts are raised only
+    when a feature crosses a threshold; returns the alerts of this call, if any.
+    """
+    detector = get_drift_detector()
+    if detector is None:
+        return []
+
+    if isinstance(input_rows, dict):
+        values = np.array([[input_rows.get(f, np.nan) for f in detector.features]], dtype=np.float64)
+    else:
+        values = input_rows.reindex(columns=detector.features).to_numpy(dtype=np.float64)
 
-        if diff > DRIFT_THRESHOLD:
-            drift_alerts.append(f"Drift in {feature}: diff={diff:.3f}")
-            alert(f"Drift detected in {feature} — diff: {diff:.3f}")
+    result = detector.update(values)
+    if result is None:
+        return []
 
-    log_to_csv(DRIFT_LOG, [datetime.now(), json.dumps(drift_results)])
+    log_to_csv(DRIFT_LOG, [datetime.now(), json.dumps(result["scores"])])
+    for msg in result["alerts"]:
+        alert(f"Drift detected — {msg}")
+    for feature in result["recovered"]:
+        print(f"Drift in {feature} back within thresholds")
 
-    return drift_alerts
+    return result["alerts"]
 
 
 if __name__ == "__main__":
 
     initialize_log_files()
 
-    sample_payload = {
-        "store_nbr": 1.0,
-        "item_nbr": 103665.0,
-        "unit_sales": 7.0,
-        "onpromotion": 0.0,
-        "day": 16,
-        "month": 8,
-        "dayofweek": 1,
-        "week": 33,
-        "family_encoded": 13,
-        "city_encoded": 5,
-        "state_encoded": 11,
-        "type_encoded": 0,
-        "is_outlier": 0,
-        "is_return": 0,
-        "holiday": 0,
-        "year": 2013,
-        "is_weekend": 0
-    }
-
-    result, latency = check_api_health(sample_payload)
+    result, latency = check_api_health(SAMPLE_PAYLOAD)
 
     if result:
         print(f"API OK — Latency {latency:.2f} ms")
         print(f"Prediction: {result}")
 
-        predicted_value = result.get("predicted_sales", None)
-
-        actual_value = None  # Replace with real values when available
-
-        if actual_value is not None:
-            mape = monitor_prediction_error(actual_value, predicted_value)
-            print("MAPE:", mape)
-        
-        new_data_stats = {
-            "unit_sales_log": np.random.uniform(2, 4),  
-            "onpromotion": np.random.uniform(0, 1)
-        }
-
-        drift_detected, drift_details = detect_data_drift(new_data_stats)
-        print("Drift:", drift_details)
+        # Prediction errors are computed once actual sales arrive: python -m Model_Monitoring.ground_truth
+        # The detector only reports once its evaluation window has filled; one row rarely triggers it
+        drift_alerts = detect_data_drift(SAMPLE_PAYLOAD)
+        print("Drift alerts:", drift_alerts or "none")
 
     else:
         print("API not reachable. Check backend service.")
 
 
-    print("✔ Monitoring cycle complete.")
+    shutdown_logging()
+    print("✔ Monitoring cycle complete. For continuous probing run: python -m Model_Monitoring.prober")
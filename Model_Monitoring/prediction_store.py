@@ -0,0 +1,278 @@
+"""Append-only store of served predictions, joined later with the actual sales.
+
+Every prediction the API serves is recorded with its request ID, its position
+in the request (`row`), the endpoint, the model and its key (date, store_nbr,
+item_nbr, family code). `record()` only puts the request's key columns on a
+bounded in-memory queue; a writer thread turns queued requests into one Arrow
+table and writes it as a new Parquet segment once `flush_rows` rows are pending
+or `flush_interval` seconds have passed:
+
+    <path>/part-20241017-153000-1234-000042.parquet
+
+Segments are never modified, so several API workers can write to the same
+directory and readers always see complete files (they are written under a
+temporary name and renamed). Keys are stored in compact dtypes (date32, int32,
+int16, float32) and sorted by date, so the ground-truth job
+(Model_Monitoring/ground_truth.py) can skip row groups outside the dates it
+evaluates. `compact()` merges the segments of each past day into one file:
+
+    python -m Model_Monitoring.prediction_store --path Logs/predictions
+"""
+import argparse
+import atexit
+import glob
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+_STOP = object()
+
+# Key and metadata columns of the stored predictions
+KEY_COLUMNS = ["date", "store_nbr", "item_nbr", "family"]
+STORE_COLUMNS = ["request_id", "row", "timestamp", "endpoint", "model"] + KEY_COLUMNS + ["predicted_sales"]
+
+
+def feature_keys(features):
+    """Key columns of model input rows (a DataFrame or one row dict with the API feature names).
+
+    The date is built from year / month / day by the writer thread; rows whose
+    values are not a valid date get a null date and never match an actual.
+    """
+    names = {"store_nbr": "store_nbr", "item_nbr": "item_nbr", "family": "family_encoded",
+             "year": "year", "month": "month", "day": "day"}
+    if isinstance(features, dict):
+        return {key: [features[name]] for key, name in names.items()}
+    return {key: features[name].to_numpy() for key, name in names.items()}
+
+
+def _int_column(values, dtype):
+    """Integer column of ids that may arrive as floats; missing values become -1."""
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isfinite(values), np.round(values), -1).astype(dtype)
+
+
+def build_table(items):
+    """Arrow table (STORE_COLUMNS, sorted by date) of the items queued by PredictionStore.record.
+
+    The key arrays of all items are concatenated first, so ids are cast and dates
+    parsed once per flush, not once per request.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    counts = np.array([len(item[-1]) for item in items], dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    total = int(counts.sum())
+
+    def repeated(values, dtype=object):
+        return np.repeat(np.array(values, dtype=dtype), counts)
+
+    def concatenated(name, selected=None):
+        return np.concatenate([np.asarray(item[5][name]).ravel() for item in (selected or items)])
+
+    # Keys come with a date (raw rows, forecasts) or with year / month / day (feature rows)
+    has_date = np.array(["date" in item[5] for item in items], dtype=bool)
+    dates = np.full(total, np.datetime64("NaT"), dtype="datetime64[D]")
+    with_date = [item for item in items if "date" in item[5]]
+    if with_date:
+        dates[np.repeat(has_date, counts)] = pd.to_datetime(
+            pd.Series(concatenated("date", with_date)), errors="coerce").to_numpy(dtype="datetime64[D]")
+    with_parts = [item for item in items if "date" not in item[5]]
+    if with_parts:
+        parts = pd.DataFrame({part: concatenated(part, with_parts).astype(np.float64)
+                              for part in ("year", "month", "day")})
+        dates[np.repeat(~has_date, counts)] = pd.to_datetime(parts, errors="coerce").to_numpy(dtype="datetime64[D]")
+
+    table = pa.table({
+        "request_id": pa.array(repeated([item[0] for item in items]), pa.string()),
+        "row": (np.arange(total) - np.repeat(starts - np.array([item[4] for item in items]), counts)).astype(np.int32),
+        "timestamp": repeated([item[3] for item in items], "datetime64[ms]"),
+        "endpoint": pa.array(repeated([item[1] for item in items]), pa.string()),
+        "model": pa.array(repeated([item[2] for item in items]), pa.string()),
+        "date": pa.array(dates, pa.date32()),
+        "store_nbr": _int_column(concatenated("store_nbr"), np.int32),
+        "item_nbr": _int_column(concatenated("item_nbr"), np.int32),
+        "family": _int_column(concatenated("family"), np.int16),
+        "predicted_sales": np.concatenate([np.asarray(item[6], dtype=np.float32).ravel() for item in items]),
+    })
+    return table.take(pc.sort_indices(table, [("date", "ascending")]))
+
+
+def write_table(table, path):
+    """Write a Parquet file under a temporary name and rename it, so readers never see a partial file."""
+    import pyarrow.parquet as pq
+
+    partial = f"{path}.{os.getpid()}.partial"
+    pq.write_table(table, partial, compression="zstd")
+    os.replace(partial, path)
+
+
+class PredictionStore:
+    """Record served predictions as Parquet segments from a background thread; see the module docstring.
+
+    When the queue is full the request's rows are dropped and counted, so
+    recording never slows down the response.
+    """
+
+    def __init__(self, path, max_queue=10000, flush_rows=100_000, flush_interval=10.0):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._segment = 0
+        self.recorded = 0
+        self.dropped = 0
+        self.write_errors = 0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="prediction-store", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def record(self, request_id, endpoint, keys, predictions, model=None, first_row=0):
+        """Queue the predictions of one request (or of its rows from first_row on) with their key columns.
+
+        keys has store_nbr, item_nbr and family (code) plus date, or year / month / day.
+        Returns False if the predictions were dropped.
+        """
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait((request_id, endpoint, model, datetime.now(), first_row, keys, predictions))
+            return True
+        except queue.Full:
+            self.dropped += len(predictions)
+            return False
+
+    def flush(self, timeout=10.0):
+        """Block until everything queued so far has been written, for at most `timeout` seconds."""
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(max(deadline - time.monotonic(), 0))
+
+    def close(self, timeout=10.0):
+        """Write all pending predictions and stop the writer thread, waiting at most `timeout` seconds."""
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass  # The writer is stuck; it is a daemon thread and does not hold up the exit
+        self._thread.join(max(deadline - time.monotonic(), 0))
+        self._thread = None
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors,
+            "path": self.path,
+        }
+
+    def _run(self):
+        pending, n_pending = [], 0
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._write(pending)
+                return
+            if isinstance(item, threading.Event):
+                self._write(pending)
+                pending, n_pending = [], 0
+                item.set()
+                continue
+            if item is not None:
+                pending.append(item)
+                n_pending += len(item[-1])
+
+            if n_pending >= self.flush_rows or time.monotonic() >= deadline:
+                self._write(pending)
+                pending, n_pending = [], 0
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write(self, pending):
+        if not pending:
+            return
+        n_rows = sum(len(item[-1]) for item in pending)
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            self._segment += 1
+            name = f"part-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{self._segment:06d}.parquet"
+            write_table(build_table(pending), os.path.join(self.path, name))
+            self.recorded += n_rows
+        except Exception as e:
+            self.write_errors += n_rows
+            print(f"Failed to write {n_rows} predictions to {self.path}: {e}")
+
+
+def read_predictions(path, start=None, end=None, columns=None):
+    """Stored predictions with a key date between start and end (inclusive) as a DataFrame."""
+    import pyarrow.dataset as ds
+
+    files = sorted(glob.glob(os.path.join(path, "*.parquet")))
+    if not files:
+        return pd.DataFrame(columns=columns or STORE_COLUMNS)
+    dataset = ds.dataset(files, format="parquet")
+    condition = None
+    for bound, compare in ((start, lambda field, value: field >= value), (end, lambda field, value: field <= value)):
+        if bound is not None:
+            term = compare(ds.field("date"), pd.Timestamp(bound).date())
+            condition = term if condition is None else condition & term
+    return dataset.to_table(columns=columns, filter=condition).to_pandas(date_as_object=False)
+
+
+def compact(path, before=None):
+    """Merge the segments of every day before `before` (default: today) into one `day-YYYYMMDD.parquet`."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    before = (before or datetime.now()).strftime("%Y%m%d")
+    days = {}
+    for segment in glob.glob(os.path.join(path, "part-*.parquet")):
+        day = os.path.basename(segment).split("-")[1]
+        if day < before:
+            days.setdefault(day, []).append(segment)
+
+    merged = 0
+    for day, segments in sorted(days.items()):
+        target = os.path.join(path, f"day-{day}.parquet")
+        # A day compacted earlier is merged again with its late segments
+        sources = ([target] if os.path.exists(target) else []) + sorted(segments)
+        table = pa.concat_tables([pq.read_table(source) for source in sources], promote_options="default")
+        table = table.take(pc.sort_indices(table, [("date", "ascending")]))
+        write_table(table, target)
+        for segment in segments:
+            os.remove(segment)
+        merged += len(segments)
+    return {"days": len(days), "segments": merged}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="Logs/predictions", help="prediction store directory")
+    args = parser.parse_args()
+
+    result = compact(args.path)
+    print(f"✅ {result['segments']} segments merged into {result['days']} day files in {args.path}")
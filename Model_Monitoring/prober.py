@@ -0,0 +1,291 @@
+"""Continuous synthetic monitoring of the prediction API with SLO burn-rate alerts.
+
+    python -m Model_Monitoring.prober --url http://localhost:8000 --interval 10
+
+Every `--interval` seconds the health route, /predict and /predict/batch are
+probed concurrently over one pool of keep-alive connections (httpx.AsyncClient),
+so a probe measures the API and not a new TCP handshake. A probe is good when
+it answers 2xx with `"status": "success"` (the health route: any 2xx) within
+LATENCY_THRESHOLD_MS. Probes carry an `X-Probe: 1` header: the API prefixes
+their request ID with "probe-" and keeps them out of the prediction store and
+the drift detector, so they never count in the ground-truth error or set off
+drift alerts. Every probe is logged to
+Logs/probe_log.csv, and the last PROBE_PERCENTILE_WINDOW_SECONDS of latencies
+per probe are kept in memory for the p50 / p95 / p99 printed every
+PROBE_REPORT_SECONDS.
+
+Alerts follow the error budget of the SLO (PROBE_SLO_TARGET good probes, default
+99%) instead of firing on every slow sample. The burn rate of a window is its
+share of bad probes divided by the budget (1 - target): 1 spends the budget
+exactly over the SLO period. An alert fires when both its long and its short
+window burn faster than its factor (the short window makes it resolve soon after
+the API recovers):
+
+    page:   1 h and 5 min above 14.4  (2% of a 30-day budget in an hour)
+    ticket: 6 h and 30 min above 6    (5% of a 30-day budget in six hours)
+
+Each alert is raised once when it starts firing and reported again when it resolves.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import signal
+import time
+from collections import deque
+from datetime import datetime
+import numpy as np
+from Model_Monitoring.monitor import (LATENCY_THRESHOLD_MS, PROBE_LOG, SAMPLE_PAYLOAD, alert, log_to_csv,
+                                      shutdown_logging)
+
+# Base URL of the API
+PROBE_URL = os.getenv("PROBE_URL", "http://localhost:8000")
+# Seconds between probe rounds, and the timeout of one probe
+PROBE_INTERVAL_SECONDS = float(os.getenv("PROBE_INTERVAL_SECONDS", "10"))
+PROBE_TIMEOUT_SECONDS = float(os.getenv("PROBE_TIMEOUT_SECONDS", "5"))
+# Rows per /predict/batch probe
+PROBE_BATCH_ROWS = int(os.getenv("PROBE_BATCH_ROWS", "100"))
+# Share of probes that must be good (answered successfully within LATENCY_THRESHOLD_MS)
+PROBE_SLO_TARGET = float(os.getenv("PROBE_SLO_TARGET", "0.99"))
+# Latency percentiles are computed over this many recent seconds and printed this often
+PROBE_PERCENTILE_WINDOW_SECONDS = float(os.getenv("PROBE_PERCENTILE_WINDOW_SECONDS", "900"))
+PROBE_REPORT_SECONDS = float(os.getenv("PROBE_REPORT_SECONDS", "60"))
+# A burn-rate alert needs at least this many probes in its short window
+PROBE_MIN_SAMPLES = int(os.getenv("PROBE_MIN_SAMPLES", "10"))
+
+# name: (method, path); bodies come from probe_body
+PROBES = {
+    "health": ("GET", "/"),
+    "predict": ("POST", "/predict"),
+    "batch": ("POST", "/predict/batch"),
+}
+# (name, long window seconds, short window seconds, burn-rate factor)
+BURN_RATE_ALERTS = [
+    ("page", 3600, 300, 14.4),
+    ("ticket", 6 * 3600, 1800, 6.0),
+]
+
+
+def probe_body(name, rng, batch_rows=PROBE_BATCH_ROWS):
+    """Request body of one probe; unit_sales varies so /predict probes miss the prediction cache."""
+    if name == "predict":
+        return dict(SAMPLE_PAYLOAD, unit_sales=float(rng.uniform(0, 50)))
+    if name == "batch":
+        body = {column: [value] * batch_rows for column, value in SAMPLE_PAYLOAD.items()}
+        body["unit_sales"] = rng.uniform(0, 50, batch_rows).tolist()
+        return body
+    return None
+
+
+class ProbeWindow:
+    """Recent (time, latency ms, good) samples of one probe, dropped once older than max_age seconds."""
+
+    def __init__(self, max_age):
+        self.max_age = max_age
+        self.times = deque()
+        self.latencies = deque()
+        self.good = deque()
+        self.total = 0
+        self.bad = 0
+
+    def add(self, now, latency_ms, good):
+        self.times.append(now)
+        self.latencies.append(latency_ms)
+        self.good.append(good)
+        self.total += 1
+        self.bad += not good
+        while self.times and self.times[0] < now - self.max_age:
+            self.times.popleft()
+            self.latencies.popleft()
+            self.good.popleft()
+
+    def _start(self, now, seconds):
+        """Index of the first sample within the last `seconds`."""
+        times = np.fromiter(self.times, dtype=np.float64, count=len(self.times))
+        return int(np.searchsorted(times, now - seconds, "left"))
+
+    def percentiles(self, now, seconds, q=(50, 95, 99)):
+        """Latency percentiles (ms) of the probes of the last `seconds`; NaN without probes."""
+        start = self._start(now, seconds)
+        latencies = np.fromiter(self.latencies, dtype=np.float64, count=len(self.latencies))[start:]
+        latencies = latencies[np.isfinite(latencies)]
+        if not len(latencies):
+            return [np.nan] * len(q)
+        return np.percentile(latencies, q).tolist()
+
+    def bad_ratio(self, now, seconds):
+        """(share of bad probes, number of probes) over the last `seconds`."""
+        start = self._start(now, seconds)
+        good = np.fromiter(self.good, dtype=bool, count=len(self.good))[start:]
+        if not len(good):
+            return 0.0, 0
+        return float(1.0 - good.mean()), len(good)
+
+
+class Prober:
+    """Probe the API on a schedule and alert on the burn rate of its SLO; see the module docstring."""
+
+    def __init__(self, url=PROBE_URL, probes=tuple(PROBES), interval=PROBE_INTERVAL_SECONDS,
+                 timeout=PROBE_TIMEOUT_SECONDS, slo_target=PROBE_SLO_TARGET, latency_ms=LATENCY_THRESHOLD_MS,
+                 alerts=BURN_RATE_ALERTS, percentile_window=PROBE_PERCENTILE_WINDOW_SECONDS,
+                 report_every=PROBE_REPORT_SECONDS, min_samples=PROBE_MIN_SAMPLES, batch_rows=PROBE_BATCH_ROWS,
+                 seed=42):
+        if not 0 < slo_target < 1:
+            raise ValueError(f"SLO target must be between 0 and 1, got {slo_target}")
+        self.url = url
+        self.probes = list(probes)
+        self.interval = interval
+        self.timeout = timeout
+        self.slo_target = slo_target
+        self.latency_ms = latency_ms
+        self.alerts = list(alerts)
+        self.percentile_window = percentile_window
+        self.report_every = report_every
+        self.min_samples = min_samples
+        self.batch_rows = batch_rows
+        self.rng = np.random.default_rng(seed)
+        max_age = max([percentile_window] + [long for _, long, _, _ in self.alerts])
+        self.windows = {name: ProbeWindow(max_age) for name in self.probes}
+        # (probe, alert name) pairs currently firing
+        self.firing = set()
+        self.rounds = 0
+        # Created by run(), inside the event loop it belongs to
+        self._stop = None
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    async def probe(self, client, name):
+        """Send one probe; returns (latency ms, status code or exception name, good)."""
+        import httpx
+
+        method, path = PROBES[name]
+        body = probe_body(name, self.rng, self.batch_rows)
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body)
+            content = response.json() if response.content else {}
+        except (httpx.HTTPError, ValueError) as e:
+            return (time.perf_counter() - start) * 1000, type(e).__name__, False
+        latency_ms = (time.perf_counter() - start) * 1000
+        ok = response.is_success and (name == "health" or content.get("status") == "success")
+        return latency_ms, response.status_code, ok and latency_ms <= self.latency_ms
+
+    async def run_round(self, client):
+        """Probe every endpoint concurrently and record the results."""
+        results = await asyncio.gather(*(self.probe(client, name) for name in self.probes))
+        now = time.monotonic()
+        for name, (latency_ms, status, good) in zip(self.probes, results):
+            # Probes that got no answer count against the SLO but not in the latency percentiles
+            answered = isinstance(status, int)
+            self.windows[name].add(now, latency_ms if answered else np.nan, good)
+            log_to_csv(PROBE_LOG, [datetime.now(), name, PROBES[name][1], round(latency_ms, 3), status, int(good)])
+        self.rounds += 1
+        self.evaluate(now)
+
+    def burn_rate(self, name, now, seconds):
+        """(burn rate, probes) of one probe over the last `seconds`."""
+        bad_ratio, n = self.windows[name].bad_ratio(now, seconds)
+        return bad_ratio / (1.0 - self.slo_target), n
+
+    def evaluate(self, now):
+        """Raise burn-rate alerts that started firing and report the ones that resolved."""
+        for name in self.probes:
+            for alert_name, long_window, short_window, factor in self.alerts:
+                long_burn, _ = self.burn_rate(name, now, long_window)
+                short_burn, n_short = self.burn_rate(name, now, short_window)
+                key = (name, alert_name)
+                if n_short >= self.min_samples and long_burn > factor and short_burn > factor:
+                    if key not in self.firing:
+                        self.firing.add(key)
+                        alert(f"SLO burn rate {alert_name} — {PROBES[name][1]}: {long_burn:.1f}x over "
+                              f"{long_window / 60:g} min and {short_burn:.1f}x over {short_window / 60:g} min "
+                              f"(factor {factor:g}, target {self.slo_target:.2%} within {self.latency_ms:g} ms)")
+                elif key in self.firing and short_burn <= factor:
+                    self.firing.discard(key)
+                    print(f"SLO burn rate {alert_name} for {PROBES[name][1]} resolved ({short_burn:.1f}x over "
+                          f"{short_window / 60:g} min)")
+
+    def stats(self):
+        now = time.monotonic()
+        report = {}
+        for name in self.probes:
+            window = self.windows[name]
+            p50, p95, p99 = window.percentiles(now, self.percentile_window)
+            report[name] = {
+                "endpoint": PROBES[name][1],
+                "probes": window.total,
+                "bad": window.bad,
+                "latency_ms": {"p50": p50, "p95": p95, "p99": p99},
+                "burn_rate": {alert_name: self.burn_rate(name, now, long_window)[0]
+                              for alert_name, long_window, _, _ in self.alerts},
+                "firing": sorted(alert_name for probe, alert_name in self.firing if probe == name),
+            }
+        return report
+
+    def print_report(self):
+        for name, result in self.stats().items():
+            latency = result["latency_ms"]
+            burns = ", ".join(f"{alert_name} {burn:.1f}x" for alert_name, burn in result["burn_rate"].items())
+            print(f"{result['endpoint']:<16} p50 {latency['p50']:8.1f} ms  p95 {latency['p95']:8.1f} ms  "
+                  f"p99 {latency['p99']:8.1f} ms  bad {result['bad']}/{result['probes']}  burn {burns}")
+
+    async def run(self, rounds=None):
+        """Probe every `interval` seconds until stop() (or for `rounds` rounds); rounds never overlap."""
+        import httpx
+
+        self._stop = asyncio.Event()
+        n = len(self.probes)
+        limits = httpx.Limits(max_connections=n, max_keepalive_connections=n)
+        # X-Probe marks the traffic as synthetic, so the API does not record its predictions
+        async with httpx.AsyncClient(base_url=self.url, limits=limits, timeout=self.timeout,
+                                     headers={"X-Probe": "1"}) as client:
+            start = next_report = time.monotonic()
+            for i in itertools.count(1):
+                await self.run_round(client)
+                now = time.monotonic()
+                if now >= next_report:
+                    self.print_report()
+                    next_report = now + self.report_every
+                if self._stop.is_set() or (rounds is not None and i >= rounds):
+                    break
+                # On schedule from the start; rounds missed by a slow round are skipped, not bunched up
+                wait = self.interval - (now - start) % self.interval
+                try:
+                    await asyncio.wait_for(self._stop.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                if self._stop.is_set():
+                    break
+        return self.stats()
+
+
+async def main(prober, rounds=None):
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, prober.stop)
+        except (NotImplementedError, RuntimeError):
+            pass  # e.g. Windows: Ctrl+C still interrupts
+    return await prober.run(rounds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=PROBE_URL, help="base URL of the API")
+    parser.add_argument("--probes", nargs="+", choices=list(PROBES), default=list(PROBES))
+    parser.add_argument("--interval", type=float, default=PROBE_INTERVAL_SECONDS, help="seconds between rounds")
+    parser.add_argument("--timeout", type=float, default=PROBE_TIMEOUT_SECONDS, help="seconds per probe")
+    parser.add_argument("--slo-target", type=float, default=PROBE_SLO_TARGET, help="share of good probes")
+    parser.add_argument("--rounds", type=int, default=None, help="stop after this many rounds (default: run forever)")
+    args = parser.parse_args()
+
+    prober = Prober(args.url, args.probes, args.interval, args.timeout, args.slo_target)
+    print(f"Probing {args.url} ({', '.join(PROBES[name][1] for name in args.probes)}) every {args.interval:g}s, "
+          f"SLO {args.slo_target:.2%} within {LATENCY_THRESHOLD_MS} ms")
+    try:
+        asyncio.run(main(prober, args.rounds))
+    finally:
+        prober.print_report()
+        shutdown_logging()
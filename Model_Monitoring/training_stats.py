@@ -0,0 +1,139 @@
+"""Build the training-statistics profile used by the monitoring code.
+
+Reads the processed training data in chunks (two passes, constant memory) and
+writes a small JSON profile with count, mean, std, min/max, quantiles and a
+fixed-bin histogram for every PredictionInput feature. --data is the Parquet
+dataset written by Preprocessing/columnar.py (only the feature columns are
+read) or processed_data.csv:
+
+    python -m Model_Monitoring.training_stats --data processed_data_parquet
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from Server.schemas import FEATURE_COLUMNS
+from Preprocessing.columnar import DEFAULT_PATH, open_dataset
+
+DEFAULT_OUTPUT = "Model_Monitoring/training_stats.json"
+QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+# API feature name -> column name in the processed data when they differ
+PROCESSED_ALIASES = {"dayofweek": "day_of_week"}
+
+
+def read_chunks(path, columns, chunksize):
+    if is_csv(path):
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+        return
+    for batch in open_dataset(path).to_batches(columns=columns, batch_size=chunksize):
+        yield batch.to_pandas()
+
+
+def read_header(path):
+    if is_csv(path):
+        return pd.read_csv(path, nrows=0).columns
+    return open_dataset(path).schema.names
+
+
+def is_csv(path):
+    return str(path).endswith(".csv")
+
+
+def histogram_quantiles(edges, counts, quantiles):
+    """Approximate quantiles by linear interpolation inside the histogram bins."""
+    total = counts.sum()
+    if total == 0:
+        return [None] * len(quantiles)
+    cdf = np.concatenate([[0.0], np.cumsum(counts) / total])
+    return [float(np.interp(q, cdf, edges)) for q in quantiles]
+
+
+def build_profile(path, bins=20, chunksize=500_000):
+    header = read_header(path)
+    sources = {feature: PROCESSED_ALIASES.get(feature, feature) for feature in FEATURE_COLUMNS}
+    missing = [feature for feature, column in sources.items() if column not in header]
+    if missing:
+        print("Features not found in training data, skipped:", missing)
+    sources = {feature: column for feature, column in sources.items() if column in header}
+    columns = list(sources.values())
+
+    # Pass 1: counts, moments (merged per chunk for numerical stability), min/max
+    n_features = len(columns)
+    count = np.zeros(n_features)
+    mean = np.zeros(n_features)
+    m2 = np.zeros(n_features)
+    minimum = np.full(n_features, np.inf)
+    maximum = np.full(n_features, -np.inf)
+    rows = 0
+    for chunk in read_chunks(path, columns, chunksize):
+        values = chunk[columns].to_numpy(dtype=np.float64)
+        rows += len(values)
+        valid = np.isfinite(values)
+        n = valid.sum(axis=0)
+        filled = np.where(valid, values, 0.0)
+        chunk_mean = np.divide(filled.sum(axis=0), n, out=np.zeros(n_features), where=n > 0)
+        chunk_m2 = (np.where(valid, values - chunk_mean, 0.0) ** 2).sum(axis=0)
+        total = count + n
+        delta = chunk_mean - mean
+        safe_total = np.where(total > 0, total, 1)
+        mean = mean + delta * n / safe_total
+        m2 = m2 + chunk_m2 + delta ** 2 * count * n / safe_total
+        count = total
+        minimum = np.minimum(minimum, np.where(valid, values, np.inf).min(axis=0, initial=np.inf))
+        maximum = np.maximum(maximum, np.where(valid, values, -np.inf).max(axis=0, initial=-np.inf))
+
+    edges = []
+    for lo, hi in zip(minimum, maximum):
+        if not np.isfinite(lo):
+            lo, hi = 0.0, 0.0
+        if hi <= lo:
+            lo, hi = lo - 0.5, hi + 0.5
+        edges.append(np.linspace(lo, hi, bins + 1))
+
+    # Pass 2: fixed-bin histograms over the pass-1 range
+    counts = np.zeros((n_features, bins), dtype=np.int64)
+    for chunk in read_chunks(path, columns, chunksize):
+        for i, column in enumerate(columns):
+            values = chunk[column].to_numpy(dtype=np.float64)
+            counts[i] += np.histogram(values[np.isfinite(values)], bins=edges[i])[0]
+
+    features = {}
+    for i, feature in enumerate(sources):
+        std = float(np.sqrt(m2[i] / (count[i] - 1))) if count[i] > 1 else 0.0
+        features[feature] = {
+            "source_column": sources[feature],
+            "count": int(count[i]),
+            "mean": float(mean[i]),
+            "std": std,
+            "min": float(minimum[i]) if count[i] else None,
+            "max": float(maximum[i]) if count[i] else None,
+            "quantiles": dict(zip(map(str, QUANTILES), histogram_quantiles(edges[i], counts[i], QUANTILES))),
+            "bin_edges": edges[i].tolist(),
+            "bin_counts": counts[i].tolist(),
+        }
+
+    return {
+        "source": path,
+        "created": datetime.now().isoformat(),
+        "rows": rows,
+        "bins": bins,
+        "features": features,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DEFAULT_PATH, help="processed training data (Parquet dataset or CSV)")
+    parser.add_argument("--out", default=DEFAULT_OUTPUT, help="where to write the JSON profile")
+    parser.add_argument("--bins", type=int, default=20, help="histogram bins per feature")
+    parser.add_argument("--chunksize", type=int, default=500_000, help="rows read per chunk")
+    args = parser.parse_args()
+
+    profile = build_profile(args.data, bins=args.bins, chunksize=args.chunksize)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(profile, f, indent=1)
+    print(f"✅ Training profile for {len(profile['features'])} features ({profile['rows']:,} rows) written to {args.out}")
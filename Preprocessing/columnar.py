@@ -0,0 +1,159 @@
+"""Columnar copy of the preprocessing output: Parquet partitioned by year/month.
+
+`processed_data.csv` is converted chunk by chunk (constant memory) into a Hive
+partitioned Parquet dataset with compact dtypes: int8 flags, int16 categorical
+codes, float32 sales and scaled features, date32 dates.
+
+    python -m Preprocessing.columnar --csv processed_data.csv --out processed_data_parquet
+
+Readers load only the columns and months they need with `load_processed`:
+
+    from Preprocessing.columnar import load_processed
+    df = load_processed(columns=["date", "store_nbr", "unit_sales"], start="2017-01-01")
+"""
+import argparse
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as fs
+
+DEFAULT_PATH = "processed_data_parquet"
+
+# Partition keys, derived from `date` (the processed year / month columns are MinMax scaled)
+PARTITION_COLUMNS = ["date_year", "date_month"]
+PARTITIONING = ds.partitioning(pa.schema([("date_year", pa.int16()), ("date_month", pa.int8())]), flavor="hive")
+
+FLAG_COLUMNS = ["onpromotion", "is_outlier", "is_return", "holiday", "is_weekend"]
+CODE_COLUMNS = ["family_encoded", "city_encoded", "state_encoded", "type_encoded"]
+FLOAT_COLUMNS = ["store_nbr", "item_nbr", "unit_sales", "unit_sales_log",
+                 "week", "year", "month", "day", "day_of_week"]
+
+COLUMN_TYPES = {
+    "id": pa.int64(), "date": pa.date32(),
+    **{name: pa.float32() for name in FLOAT_COLUMNS},
+    **{name: pa.int16() for name in CODE_COLUMNS},
+    **{name: pa.int8() for name in FLAG_COLUMNS},
+}
+
+INT_RANGES = {"int8": (-2 ** 7, 2 ** 7 - 1), "int16": (-2 ** 15, 2 ** 15 - 1)}
+
+
+def cast_frame(df):
+    """Cast a processed-data frame to the columnar dtypes, adding the partition keys."""
+    df = df.copy()
+    if "date" in df.columns:
+        dates = pd.to_datetime(df["date"])
+        df["date"] = dates.dt.date
+        df["date_year"] = dates.dt.year.astype(np.int16)
+        df["date_month"] = dates.dt.month.astype(np.int8)
+    for name in FLAG_COLUMNS:
+        if name in df.columns:
+            # Flags may arrive as True/False or 1/0 depending on the pipeline step
+            df[name] = df[name].map({True: 1, False: 0, "True": 1, "False": 0}).fillna(df[name])
+    for name, arrow_type in COLUMN_TYPES.items():
+        if name not in df.columns or name == "date":
+            continue
+        dtype = arrow_type.to_pandas_dtype()
+        bounds = INT_RANGES.get(np.dtype(dtype).name)
+        if bounds is not None:
+            values = pd.to_numeric(df[name])
+            if len(values) and (values.min() < bounds[0] or values.max() > bounds[1]):
+                raise ValueError(f"Column '{name}' does not fit in {arrow_type}")
+        df[name] = df[name].astype(dtype)
+    return df
+
+
+def to_table(df):
+    """Arrow table in the column order of df (the processed_data.csv order), partition keys last."""
+    columns = [name for name in df.columns if name not in PARTITION_COLUMNS]
+    partitions = list(PARTITIONING.schema) if "date_year" in df.columns else []
+    table = pa.Table.from_pandas(df[columns + [p.name for p in partitions]], preserve_index=False)
+    fields = [pa.field(name, COLUMN_TYPES[name]) if name in COLUMN_TYPES else table.schema.field(name)
+              for name in columns]
+    return table.cast(pa.schema(fields + partitions))
+
+
+def write_processed(df, out_dir=DEFAULT_PATH, part=0):
+    """Append a processed-data frame to the partitioned dataset at out_dir."""
+    ds.write_dataset(
+        to_table(cast_frame(df)), out_dir, format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=f"part-{part:05d}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+
+def convert_csv(csv_path, out_dir=DEFAULT_PATH, chunksize=1_000_000):
+    """Convert processed_data.csv to the partitioned Parquet dataset, one chunk at a time."""
+    rows = 0
+    for part, chunk in enumerate(pd.read_csv(csv_path, chunksize=chunksize)):
+        write_processed(chunk, out_dir, part)
+        rows += len(chunk)
+        print(f"  {rows:,} rows converted")
+    return rows
+
+
+def open_dataset(path=DEFAULT_PATH):
+    """The partitioned dataset, with its files memory-mapped rather than read into buffers."""
+    return ds.dataset(path, format="parquet", partitioning=PARTITIONING,
+                      filesystem=fs.LocalFileSystem(use_mmap=True))
+
+
+def date_filter(start=None, end=None):
+    """Filter on `date` plus the matching partition keys, so other months are never opened."""
+    expression = None
+    year, month = ds.field("date_year"), ds.field("date_month")
+    if start is not None:
+        start = pd.Timestamp(start)
+        after = (year > start.year) | ((year == start.year) & (month >= start.month))
+        expression = after & (ds.field("date") >= pa.scalar(start.date(), pa.date32()))
+    if end is not None:
+        end = pd.Timestamp(end)
+        before = (year < end.year) | ((year == end.year) & (month <= end.month))
+        before = before & (ds.field("date") <= pa.scalar(end.date(), pa.date32()))
+        expression = before if expression is None else expression & before
+    return expression
+
+
+def load_processed(path=DEFAULT_PATH, columns=None, filter=None, start=None, end=None):
+    """Load processed data from the Parquet dataset at path as a DataFrame.
+
+    Only `columns` are read (default: all data columns, without the partition
+    keys); `start` / `end` restrict the date range and skip other partitions;
+    `filter` is an extra pyarrow dataset expression. Falls back to reading the
+    CSV when path is a .csv file.
+    """
+    if str(path).endswith(".csv"):
+        df = pd.read_csv(path, usecols=columns)
+        if "date" in df.columns:
+            df["date"] = pd.to_datetime(df["date"])
+            if start is not None:
+                df = df[df["date"] >= pd.Timestamp(start)]
+            if end is not None:
+                df = df[df["date"] <= pd.Timestamp(end)]
+        return df
+
+    dataset = open_dataset(path)
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name not in PARTITION_COLUMNS]
+    expression = date_filter(start, end)
+    if filter is not None:
+        expression = filter if expression is None else expression & filter
+    table = dataset.to_table(columns=columns, filter=expression)
+    # Let Arrow release each column as soon as pandas owns it
+    return table.to_pandas(date_as_object=False, split_blocks=True, self_destruct=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default="processed_data.csv", help="processed data written by preprocessing.ipynb")
+    parser.add_argument("--out", default=DEFAULT_PATH, help="output directory of the Parquet dataset")
+    parser.add_argument("--chunksize", type=int, default=1_000_000, help="CSV rows converted per chunk")
+    args = parser.parse_args()
+
+    if os.path.exists(args.out) and os.listdir(args.out):
+        parser.error(f"{args.out} is not empty; remove it first so old parts are not mixed in")
+    n_rows = convert_csv(args.csv, args.out, args.chunksize)
+    print(f"✅ {n_rows:,} rows written to {args.out}")
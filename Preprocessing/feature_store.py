@@ -0,0 +1,216 @@
+"""Incremental store of daily sales with lag and rolling-window features.
+
+Daily sales per (store_nbr, item_nbr, date) live in an embedded SQLite database
+next to a running cumulative sum per series, so:
+- lag_k is one primary-key lookup (the sales k days earlier),
+- a rolling sum over w days is the difference of two cumulative sums,
+- a new day of sales is appended without recomputing older history.
+The chain-wide daily total, the series preprocessing.ipynb computes lags for,
+is kept as series (-1, -1). Days without a row count as zero sales.
+
+    python -m Preprocessing.feature_store build --raw train_sample.csv
+    python -m Preprocessing.feature_store update --sales new_day.csv
+    python -m Preprocessing.feature_store lookup --store 21 --item 96995 --date 2017-08-15
+"""
+import argparse
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+
+DEFAULT_PATH = "feature_store.sqlite"
+LAGS = (7, 14, 30)
+WINDOWS = (7, 30)
+TOTAL_SERIES = (-1, -1)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_sales (
+    store_nbr INTEGER NOT NULL,
+    item_nbr INTEGER NOT NULL,
+    day INTEGER NOT NULL,          -- days since 1970-01-01
+    sales REAL NOT NULL,
+    cum_sales REAL NOT NULL,       -- sales of this series up to and including this day
+    PRIMARY KEY (store_nbr, item_nbr, day)
+) WITHOUT ROWID
+"""
+
+_SALES = "SELECT sales FROM daily_sales WHERE store_nbr = ? AND item_nbr = ? AND day = ?"
+_CUM_AT = ("SELECT cum_sales FROM daily_sales WHERE store_nbr = ? AND item_nbr = ? AND day <= ? "
+           "ORDER BY day DESC LIMIT 1")
+
+
+def to_day(dates):
+    """Days since 1970-01-01 for a date, a date string or an array of them."""
+    if np.isscalar(dates) or isinstance(dates, pd.Timestamp):
+        return int(pd.Timestamp(dates).value // 86_400_000_000_000)
+    return pd.to_datetime(dates).to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+def daily_totals(sales):
+    """Sum unit_sales per (store_nbr, item_nbr, day), plus the chain-wide total series."""
+    sales = sales.dropna(subset=["unit_sales"])
+    keyed = pd.DataFrame({
+        "store_nbr": sales["store_nbr"].to_numpy(dtype=np.int64),
+        "item_nbr": sales["item_nbr"].to_numpy(dtype=np.int64),
+        "day": to_day(sales["date"]),
+        "sales": sales["unit_sales"].to_numpy(dtype=np.float64),
+    })
+    per_series = keyed.groupby(["store_nbr", "item_nbr", "day"], as_index=False)["sales"].sum()
+    total = keyed.groupby("day", as_index=False)["sales"].sum()
+    total.insert(0, "item_nbr", TOTAL_SERIES[1])
+    total.insert(0, "store_nbr", TOTAL_SERIES[0])
+    return pd.concat([per_series, total], ignore_index=True)
+
+
+class LagFeatureStore:
+    def __init__(self, path=DEFAULT_PATH, lags=LAGS, windows=WINDOWS):
+        self.path = path
+        self.lags = tuple(lags)
+        self.windows = tuple(windows)
+        self.feature_names = [f"lag_{k}" for k in self.lags] + [f"rolling_mean_{w}" for w in self.windows]
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._conn.close()
+
+    # Writes
+
+    def build(self, raw_path, chunksize=1_000_000):
+        """Load the full sales history from a raw CSV, replacing the current contents."""
+        conn = self._conn
+        with self._lock, conn:
+            conn.execute("DELETE FROM daily_sales")
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS staging (store_nbr INTEGER, item_nbr INTEGER, day INTEGER,"
+                         " sales REAL, PRIMARY KEY (store_nbr, item_nbr, day)) WITHOUT ROWID")
+            conn.execute("DELETE FROM staging")
+            columns = ["date", "store_nbr", "item_nbr", "unit_sales"]
+            for chunk in pd.read_csv(raw_path, usecols=columns, chunksize=chunksize):
+                conn.executemany(
+                    "INSERT INTO staging VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT DO UPDATE SET sales = sales + excluded.sales",
+                    daily_totals(chunk).itertuples(index=False, name=None))
+            # Cumulative sums for the whole history in one pass
+            conn.execute(
+                "INSERT INTO daily_sales SELECT store_nbr, item_nbr, day, sales,"
+                " SUM(sales) OVER (PARTITION BY store_nbr, item_nbr ORDER BY day) FROM staging")
+            conn.execute("DROP TABLE staging")
+        return self.stats()
+
+    def add_sales(self, sales):
+        """Add new daily sales (columns date, store_nbr, item_nbr, unit_sales) in place.
+
+        A day already in the store is replaced. Appending days after the last
+        stored day touches only the new rows; back-filled days also shift the
+        cumulative sums of the later days of that series.
+        """
+        totals = daily_totals(sales)
+        series = totals[totals["store_nbr"] != TOTAL_SERIES[0]].sort_values("day")
+        total_delta = {}
+        with self._lock, self._conn:
+            for store, item, day, value in series.itertuples(index=False, name=None):
+                delta = self._upsert(store, item, day, value)
+                total_delta[day] = total_delta.get(day, 0.0) + delta
+            # The chain-wide total moves by the same amount as the series of that day
+            for day in sorted(total_delta):
+                row = self._conn.execute(_SALES, (*TOTAL_SERIES, int(day))).fetchone()
+                self._upsert(*TOTAL_SERIES, day, (row[0] if row else 0.0) + total_delta[day])
+        return len(series)
+
+    def _upsert(self, store, item, day, value):
+        conn = self._conn
+        store, item, day = int(store), int(item), int(day)
+        row = conn.execute(_SALES, (store, item, day)).fetchone()
+        delta = value - row[0] if row else value
+        previous = conn.execute(_CUM_AT, (store, item, day - 1)).fetchone()
+        conn.execute("INSERT OR REPLACE INTO daily_sales VALUES (?, ?, ?, ?, ?)",
+                     (store, item, day, value, (previous[0] if previous else 0.0) + value))
+        if delta:
+            conn.execute("UPDATE daily_sales SET cum_sales = cum_sales + ? "
+                         "WHERE store_nbr = ? AND item_nbr = ? AND day > ?", (delta, store, item, day))
+        return delta
+
+    # Reads
+
+    def features(self, store_nbr, item_nbr, date):
+        """Lag and rolling-mean features of one series on one date (only earlier days are used)."""
+        day = to_day(date)
+        store_nbr, item_nbr = int(store_nbr), int(item_nbr)
+        with self._lock:
+            conn = self._conn
+            result = {}
+            for k in self.lags:
+                row = conn.execute(_SALES, (store_nbr, item_nbr, day - k)).fetchone()
+                result[f"lag_{k}"] = row[0] if row else 0.0
+            row = conn.execute(_CUM_AT, (store_nbr, item_nbr, day - 1)).fetchone()
+            end = row[0] if row else 0.0
+            for w in self.windows:
+                row = conn.execute(_CUM_AT, (store_nbr, item_nbr, day - 1 - w)).fetchone()
+                result[f"rolling_mean_{w}"] = (end - (row[0] if row else 0.0)) / w
+        return result
+
+    def lookup_frame(self, keys):
+        """Features for every row of a frame with store_nbr, item_nbr and date, in row order (one SQL query)."""
+        frame = pd.DataFrame({
+            "store_nbr": keys["store_nbr"].to_numpy(dtype=np.int64),
+            "item_nbr": keys["item_nbr"].to_numpy(dtype=np.int64),
+            "day": to_day(keys["date"]),
+        })
+        lag_columns = [
+            f"COALESCE((SELECT sales FROM daily_sales s WHERE s.store_nbr = k.store_nbr AND s.item_nbr = k.item_nbr"
+            f" AND s.day = k.day - {k}), 0.0)" for k in self.lags]
+
+        def cum_at(offset):
+            return (f"COALESCE((SELECT cum_sales FROM daily_sales s WHERE s.store_nbr = k.store_nbr"
+                    f" AND s.item_nbr = k.item_nbr AND s.day <= k.day - {offset} ORDER BY s.day DESC LIMIT 1), 0.0)")
+
+        window_columns = [f"({cum_at(1)} - {cum_at(1 + w)}) / {w}.0" for w in self.windows]
+        query = f"SELECT {', '.join(lag_columns + window_columns)} FROM lookup_keys k ORDER BY k.i"
+        with self._lock:
+            conn = self._conn
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS lookup_keys "
+                         "(i INTEGER PRIMARY KEY, store_nbr INTEGER, item_nbr INTEGER, day INTEGER)")
+            conn.execute("DELETE FROM lookup_keys")
+            conn.executemany("INSERT INTO lookup_keys VALUES (?, ?, ?, ?)",
+                             ((i, int(s), int(t), int(d)) for i, (s, t, d) in enumerate(frame.itertuples(index=False))))
+            rows = conn.execute(query).fetchall()
+            conn.execute("DELETE FROM lookup_keys")
+        return pd.DataFrame(rows, columns=self.feature_names, index=keys.index)
+
+    def stats(self):
+        with self._lock:
+            rows, series, first, last = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT store_nbr || ':' || item_nbr), MIN(day), MAX(day) FROM daily_sales"
+            ).fetchone()
+        to_date = lambda day: str(np.datetime64(day, "D")) if day is not None else None
+        return {"rows": rows, "series": series, "first_date": to_date(first), "last_date": to_date(last)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build", "update", "lookup"])
+    parser.add_argument("--db", default=DEFAULT_PATH, help="SQLite database of the feature store")
+    parser.add_argument("--raw", default="train_sample.csv", help="build: raw sales CSV with the full history")
+    parser.add_argument("--sales", help="update: CSV with the new days (date, store_nbr, item_nbr, unit_sales)")
+    parser.add_argument("--store", type=int, default=TOTAL_SERIES[0], help="lookup: store_nbr (-1 = chain total)")
+    parser.add_argument("--item", type=int, default=TOTAL_SERIES[1], help="lookup: item_nbr (-1 = chain total)")
+    parser.add_argument("--date", help="lookup: date to compute the features for")
+    parser.add_argument("--chunksize", type=int, default=1_000_000, help="build: CSV rows read per chunk")
+    args = parser.parse_args()
+
+    store = LagFeatureStore(args.db)
+    if args.command == "build":
+        print(f"✅ Feature store built: {store.build(args.raw, args.chunksize)}")
+    elif args.command == "update":
+        if not args.sales:
+            parser.error("update needs --sales")
+        n_days = store.add_sales(pd.read_csv(args.sales, usecols=["date", "store_nbr", "item_nbr", "unit_sales"]))
+        print(f"✅ {n_days:,} series-days added: {store.stats()}")
+    else:
+        if not args.date:
+            parser.error("lookup needs --date")
+        print(store.features(args.store, args.item, args.date))
+    store.close()
@@ -0,0 +1,314 @@
+"""Chunked, parallel version of the feature engineering in preprocessing.ipynb.
+
+Streams the raw sales CSV in byte-range chunks, so memory stays bounded on the
+full multi-GB history:
+
+    python -m Preprocessing.pipeline --raw train_sample.csv --out-csv processed_data.csv \
+        --out-parquet processed_data_parquet --encodings label_encodings.csv
+
+Pass 1 gathers the statistics the notebook computes on the whole frame: IQR
+bounds of unit_sales_log, MinMax bounds, label-encoder classes and null counts.
+They make up the FeatureTransformer (Preprocessing/transformer.py), saved as
+feature_transformer.json for serving. Pass 2 transforms every chunk with them, drops duplicate rows across chunks and
+appends the result to the outputs. Both passes parse and transform chunks in
+parallel on a process pool; the output keeps the input row order.
+"""
+import argparse
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from Preprocessing.transformer import CATEGORICAL_COLUMNS, FeatureTransformer
+
+# Scaled after the row filters, like the notebook's second MinMaxScaler
+SCALED_FEATURES = ["store_nbr", "item_nbr", "day", "month", "week", "year", "day_of_week"]
+DROP_COLUMNS = ["family", "city", "state", "type", "dayofweek"]
+# Processed columns that are not model inputs (X in the model notebook)
+NON_FEATURE_COLUMNS = ["id", "unit_sales_log", "date"]
+
+
+def chunk_ranges(path, chunk_bytes):
+    """Header names and (start, end) byte offsets of newline-aligned chunks of the CSV."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.readline()
+        names = pd.read_csv(io.BytesIO(header), nrows=0).columns.tolist()
+        ranges = []
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return names, ranges
+
+
+def read_range(path, start, end, names):
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(data), header=None, names=names)
+
+
+def add_features(df):
+    """Row-local features, in the notebook's column order."""
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["unit_sales_log"] = np.log1p(df["unit_sales"])
+    df["week"] = df["date"].dt.isocalendar().week
+    return df
+
+
+def add_date_features(df):
+    df["is_return"] = (df["unit_sales"] < 0).astype(int)
+    df["holiday"] = df["date"].dt.dayofweek.isin([5, 6]).astype(int)
+    df["year"] = df["date"].dt.year
+    df["month"] = df["date"].dt.month
+    df["day"] = df["date"].dt.day
+    df["day_of_week"] = df["date"].dt.dayofweek
+    df["is_weekend"] = (df["day_of_week"] >= 5).astype(int)
+    df["onpromotion"] = df["onpromotion"].map({1: 1, 0: 0})
+    return df
+
+
+def surviving_rows(df):
+    """Rows kept by the notebook's dropna on unit_sales_log (after inf -> NaN) and type."""
+    keep = np.isfinite(df["unit_sales_log"].to_numpy(dtype=np.float64))
+    if "type" in df.columns:
+        keep &= df["type"].notna().to_numpy()
+    return keep
+
+
+def chunk_stats(path, start, end, names):
+    """Pass 1 worker: partial statistics of one chunk."""
+    df = add_date_features(add_features(read_range(path, start, end, names)))
+    log_sales = df["unit_sales_log"].to_numpy(dtype=np.float64)
+    survivors = df.loc[surviving_rows(df), [c for c in SCALED_FEATURES if c in df.columns]].astype(np.float64)
+    sales = df["unit_sales"].astype(np.float64)
+    return {
+        "rows": len(df),
+        "non_null": df.notna().sum(),
+        "log_sales_counts": pd.Series(log_sales[np.isfinite(log_sales)]).value_counts(),
+        "log_sales_neg_inf": int(np.isneginf(log_sales).sum()),
+        "sales_min": sales.min(),
+        "sales_max": sales.max(),
+        "feature_min": survivors.min(),
+        "feature_max": survivors.max(),
+        "classes": {c: set(df[c].dropna().unique()) for c in CATEGORICAL_COLUMNS if c in df.columns},
+    }
+
+
+def merge_stats(total, part):
+    if total is None:
+        return part
+    total["rows"] += part["rows"]
+    total["non_null"] = total["non_null"].add(part["non_null"], fill_value=0)
+    total["log_sales_counts"] = total["log_sales_counts"].add(part["log_sales_counts"], fill_value=0)
+    total["log_sales_neg_inf"] += part["log_sales_neg_inf"]
+    total["sales_min"] = np.fmin(total["sales_min"], part["sales_min"])
+    total["sales_max"] = np.fmax(total["sales_max"], part["sales_max"])
+    total["feature_min"] = np.fmin(total["feature_min"], part["feature_min"])
+    total["feature_max"] = np.fmax(total["feature_max"], part["feature_max"])
+    for column, values in part["classes"].items():
+        total["classes"].setdefault(column, set()).update(values)
+    return total
+
+
+def quantile_from_counts(values, counts, q, neg_inf=0):
+    """pandas' linear-interpolation quantile of a sample given as distinct values and counts."""
+    order = np.argsort(values)
+    values = np.concatenate([[-np.inf] if neg_inf else [], np.asarray(values, dtype=np.float64)[order]])
+    counts = np.concatenate([[neg_inf] if neg_inf else [], np.asarray(counts, dtype=np.int64)[order]])
+    cumulative = np.cumsum(counts)
+    position = q * (cumulative[-1] - 1)
+    lower, fraction = int(np.floor(position)), position - np.floor(position)
+    below = values[np.searchsorted(cumulative, lower, side="right")]
+    above = values[np.searchsorted(cumulative, min(lower + 1, cumulative[-1] - 1), side="right")]
+    return below + (above - below) * fraction if fraction else below
+
+
+def finalize_stats(stats):
+    """Turn the merged pass-1 statistics into the parameters pass 2 applies: the fitted transformer and sparse columns."""
+    counts = stats["log_sales_counts"]
+    q1 = quantile_from_counts(counts.index.to_numpy(), counts.to_numpy(), 0.25, stats["log_sales_neg_inf"])
+    q3 = quantile_from_counts(counts.index.to_numpy(), counts.to_numpy(), 0.75, stats["log_sales_neg_inf"])
+    iqr = q3 - q1
+    # dropna(thresh=50%, axis=1); unit_sales is mean-filled just before, so it is always kept
+    non_null = stats["non_null"]
+    sparse = [c for c in non_null.index if non_null[c] < 0.5 * stats["rows"] and c != "unit_sales"]
+    scalers = {"unit_sales": (stats["sales_min"], stats["sales_max"])}
+    scalers.update({c: (stats["feature_min"][c], stats["feature_max"][c]) for c in stats["feature_min"].index})
+    transformer = FeatureTransformer(
+        categories={c: sorted(values) for c, values in stats["classes"].items()},
+        scalers=scalers,
+        outlier_bounds=(q1 - 1.5 * iqr, q3 + 1.5 * iqr),
+    )
+    return {"transformer": transformer, "sparse_columns": sparse}
+
+
+def transform(df, params):
+    """Apply the notebook's feature engineering to one chunk with the global parameters."""
+    transformer = params["transformer"]
+    df = add_features(df)
+    transformer.encode_categories(df)
+    df["is_outlier"] = transformer.outlier_flag(df["unit_sales_log"])
+    df = add_date_features(df)
+    transformer.scale(df, ["unit_sales"])
+    df = df.drop(columns=[c for c in params["sparse_columns"] if c in df.columns])
+
+    # Row hashes for the cross-chunk drop_duplicates, taken before the row filters like the notebook
+    hashes = row_hashes(df)
+    keep = surviving_rows(df)
+    df, hashes = df[keep], hashes[keep]
+    df = df.drop(columns=[c for c in DROP_COLUMNS if c in df.columns])
+    transformer.scale(df, SCALED_FEATURES)
+    return df, hashes
+
+
+def row_hashes(df):
+    """64-bit hash per row; numbers are hashed as float64 so dtype differences between chunks don't matter."""
+    normalized = pd.DataFrame({
+        c: df[c].astype("float64") if pd.api.types.is_numeric_dtype(df[c]) else df[c] for c in df.columns
+    })
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+
+def transform_range(path, start, end, names, params, csv_lines=False):
+    """Pass 2 worker: read and transform one chunk.
+
+    With csv_lines the chunk is also formatted as CSV rows here, in parallel,
+    so the parent only has to join the rows that survive deduplication.
+    """
+    df, hashes = transform(read_range(path, start, end, names), params)
+    lines = df.to_csv(index=False, header=False).splitlines(keepends=True) if csv_lines else None
+    return df, hashes, lines
+
+
+class RowDeduplicator:
+    """drop_duplicates across chunks: remembers the 64-bit hash of every row kept so far.
+
+    Hashes are kept in sorted runs that are merged like a binary counter, so
+    adding a chunk never re-sorts everything seen so far (8 bytes per row).
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def keep_mask(self, hashes):
+        unique, first = np.unique(hashes, return_index=True)
+        new = np.ones(len(unique), dtype=bool)
+        for run in self.runs:
+            position = np.minimum(np.searchsorted(run, unique), len(run) - 1)
+            new &= run[position] != unique
+        keep = np.zeros(len(hashes), dtype=bool)
+        keep[first[new]] = True
+        self._add_run(unique[new])
+        return keep
+
+    def _add_run(self, run):
+        if not len(run):
+            return
+        self.runs.append(run)
+        while len(self.runs) > 1 and len(self.runs[-1]) >= len(self.runs[-2]):
+            newer, older = self.runs.pop(), self.runs.pop()
+            merged = np.concatenate([older, newer])
+            merged.sort(kind="stable")   # timsort: linear merge of the two sorted runs
+            self.runs.append(merged)
+
+
+def run_ordered(executor, fn, tasks, window):
+    """Submit tasks with at most `window` in flight and yield their results in task order."""
+    pending = deque()
+    tasks = iter(tasks)
+    for task in tasks:
+        pending.append(executor.submit(fn, *task))
+        if len(pending) >= window:
+            break
+    while pending:
+        yield pending.popleft().result()
+        for task in tasks:
+            pending.append(executor.submit(fn, *task))
+            break
+
+
+def save_label_encodings(transformer, path):
+    mappings = pd.concat([
+        pd.DataFrame({"original_value": values, "encoded_value": range(len(values)), "column": column})
+        for column, values in transformer.categories.items()
+    ], ignore_index=True)
+    mappings.to_csv(path, index=False)
+
+
+def run_pipeline(raw_path, out_csv=None, out_parquet=None, encodings_path=None, transformer_path=None,
+                 chunk_mb=64, workers=None):
+    """Run both passes over raw_path; returns (rows written, fitted FeatureTransformer)."""
+    workers = workers or os.cpu_count()
+    names, ranges = chunk_ranges(raw_path, chunk_mb * 1024 * 1024)
+    tasks = [(raw_path, start, end, names) for start, end in ranges]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        stats = None
+        for part in run_ordered(executor, chunk_stats, tasks, 2 * workers):
+            stats = merge_stats(stats, part)
+        if stats is None:
+            raise ValueError(f"{raw_path} has no rows")
+        params = finalize_stats(stats)
+        transformer = params["transformer"]
+        print(f"Pass 1: {stats['rows']:,} rows, outlier bounds {transformer.outlier_bounds}, "
+              f"sparse columns dropped {params['sparse_columns']}")
+
+        if encodings_path:
+            save_label_encodings(transformer, encodings_path)
+        if out_parquet:
+            from Preprocessing.columnar import write_processed
+
+        dedup = RowDeduplicator()
+        written = 0
+        tasks = [task + (params, bool(out_csv)) for task in tasks]
+        csv_file = None
+        try:
+            for part, (df, hashes, lines) in enumerate(run_ordered(executor, transform_range, tasks, 2 * workers)):
+                keep = dedup.keep_mask(hashes)
+                df = df[keep]
+                if transformer.feature_order is None:
+                    transformer.feature_order = [c for c in df.columns if c not in NON_FEATURE_COLUMNS]
+                if out_csv:
+                    if csv_file is None:
+                        csv_file = open(out_csv, "w", newline="")
+                        csv_file.write(",".join(df.columns) + "\n")
+                    csv_file.writelines(line for line, kept in zip(lines, keep) if kept)
+                if out_parquet and len(df):
+                    write_processed(df, out_parquet, part)
+                written += len(df)
+                print(f"  {written:,} rows written")
+        finally:
+            if csv_file is not None:
+                csv_file.close()
+
+    if transformer_path:
+        transformer.save(transformer_path)
+    return written, transformer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--raw", default="train_sample.csv", help="raw sales CSV")
+    parser.add_argument("--out-csv", help="processed CSV to write (processed_data.csv layout)")
+    parser.add_argument("--out-parquet", help="partitioned Parquet dataset to write (see Preprocessing/columnar.py)")
+    parser.add_argument("--encodings", default="label_encodings.csv", help="where to write the label mappings")
+    parser.add_argument("--transformer", default="feature_transformer.json",
+                        help="where to write the fitted feature transformer (encoders, scalers, feature order)")
+    parser.add_argument("--chunk-mb", type=int, default=64, help="MB of raw CSV per chunk")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    if not args.out_csv and not args.out_parquet:
+        parser.error("give --out-csv and/or --out-parquet")
+    if args.out_parquet and os.path.exists(args.out_parquet) and os.listdir(args.out_parquet):
+        parser.error(f"{args.out_parquet} is not empty; remove it first so old parts are not mixed in")
+    n_rows, _ = run_pipeline(args.raw, args.out_csv, args.out_parquet, args.encodings, args.transformer,
+                             args.chunk_mb, args.workers)
+    print(f"✅ {n_rows:,} processed rows written")
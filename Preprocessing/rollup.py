@@ -0,0 +1,206 @@
+"""Pre-aggregated rollup of the processed data for the EDA dashboard.
+
+Every dashboard chart is a sum, mean, count or min / max of `unit_sales` over
+some filter of date, category, city, state, store type and the flags. The
+rollup holds those aggregates once per cell of
+
+    date x store_nbr x family x city x state x type x onpromotion x is_return x holiday x is_weekend x is_outlier
+
+(count, sum, sum of squares, min, max of unit_sales), sorted by date. A filter
+is then a date slice (searchsorted) plus a few masks over the cells, and a chart
+is a groupby over the selected cells. The cost depends on the number of cells,
+not on the number of sales rows. The unit sales histogram, the data preview and
+the quantiles come from a uniform sample of rows stored next to the cube.
+
+    python -m Preprocessing.rollup --data processed_data_parquet --out dashboard_rollup
+"""
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from Preprocessing.columnar import FLAG_COLUMNS, CODE_COLUMNS, open_dataset
+
+DEFAULT_PATH = "dashboard_rollup"
+DEFAULT_SAMPLE_ROWS = 200_000
+# Cell dimensions of the cube; every dashboard filter is one of them
+KEY_COLUMNS = ["date", "store_nbr"] + CODE_COLUMNS + FLAG_COLUMNS
+MEASURE_COLUMNS = ["count", "sales_sum", "sales_sumsq", "sales_min", "sales_max"]
+# Columns kept for the sampled rows
+SAMPLE_COLUMNS = ["date", "store_nbr", "item_nbr", "unit_sales"] + CODE_COLUMNS + FLAG_COLUMNS
+# Partial cubes are merged once they hold this many cells
+MERGE_CELLS = 5_000_000
+
+
+def iter_frames(source, columns, chunksize=1_000_000):
+    """The processed data (Parquet dataset or CSV) as DataFrames of at most chunksize rows."""
+    if str(source).endswith(".csv"):
+        for chunk in pd.read_csv(source, usecols=columns, chunksize=chunksize):
+            chunk["date"] = pd.to_datetime(chunk["date"])
+            yield chunk
+    else:
+        for batch in open_dataset(source).to_batches(columns=columns, batch_size=chunksize):
+            if batch.num_rows:
+                yield batch.to_pandas(date_as_object=False)
+
+
+def cell_aggregates(frame):
+    """Cube cells (KEY_COLUMNS + MEASURE_COLUMNS) of raw rows."""
+    frame = frame.assign(sales_sq=frame["unit_sales"].astype(np.float64) ** 2)
+    return frame.groupby(KEY_COLUMNS, sort=False).agg(
+        count=("unit_sales", "size"), sales_sum=("unit_sales", "sum"), sales_sumsq=("sales_sq", "sum"),
+        sales_min=("unit_sales", "min"), sales_max=("unit_sales", "max"),
+    ).reset_index()
+
+
+def merge_cells(parts):
+    """Combine partial cubes whose cells may overlap."""
+    cells = pd.concat(parts, ignore_index=True)
+    return cells.groupby(KEY_COLUMNS, sort=False).agg(
+        count=("count", "sum"), sales_sum=("sales_sum", "sum"), sales_sumsq=("sales_sumsq", "sum"),
+        sales_min=("sales_min", "min"), sales_max=("sales_max", "max"),
+    ).reset_index()
+
+
+def compact(cells):
+    """Smallest dtypes for the cube columns, sorted by date so date ranges are slices."""
+    cells = cells.sort_values(KEY_COLUMNS, kind="stable").reset_index(drop=True)
+    cells["date"] = cells["date"].astype("datetime64[s]")
+    cells["store_nbr"] = cells["store_nbr"].astype(np.float32)
+    for name in CODE_COLUMNS:
+        cells[name] = cells[name].astype(np.int16)
+    for name in FLAG_COLUMNS:
+        cells[name] = cells[name].astype(np.int8)
+    cells["count"] = cells["count"].astype(np.int64)
+    for name in ("sales_min", "sales_max"):
+        cells[name] = cells[name].astype(np.float32)
+    return cells
+
+
+class SalesRollup:
+    """The rollup cube and the row sample; see the module docstring."""
+
+    def __init__(self, cube, sample):
+        self.cube = cube
+        self.sample = sample.sort_values("date", kind="stable").reset_index(drop=True)
+        self._cube_days = cube["date"].to_numpy(dtype="datetime64[D]")
+        self._sample_days = self.sample["date"].to_numpy(dtype="datetime64[D]")
+
+    @classmethod
+    def build(cls, source, sample_rows=DEFAULT_SAMPLE_ROWS, chunksize=1_000_000, seed=42):
+        """Aggregate the processed data in one pass, keeping a uniform sample of sample_rows rows."""
+        rng = np.random.default_rng(seed)
+        parts, n_cells = [], 0
+        sample, sample_keys = None, None
+        for frame in iter_frames(source, SAMPLE_COLUMNS, chunksize):
+            part = cell_aggregates(frame)
+            parts.append(part)
+            n_cells += len(part)
+            if n_cells > MERGE_CELLS and len(parts) > 1:
+                parts = [merge_cells(parts)]
+                n_cells = len(parts[0])
+
+            # Keep the rows with the smallest random keys: a uniform sample of everything seen so far
+            keys = rng.random(len(frame))
+            if sample is not None:
+                frame = pd.concat([sample, frame], ignore_index=True)
+                keys = np.concatenate([sample_keys, keys])
+            if len(frame) > sample_rows:
+                keep = np.argpartition(keys, sample_rows)[:sample_rows]
+                frame, keys = frame.iloc[keep].reset_index(drop=True), keys[keep]
+            sample, sample_keys = frame, keys
+
+        if not parts:
+            raise ValueError(f"No rows in {source}")
+        cube = compact(merge_cells(parts) if len(parts) > 1 else parts[0])
+        return cls(cube, sample)
+
+    def save(self, path=DEFAULT_PATH):
+        os.makedirs(path, exist_ok=True)
+        self.cube.to_parquet(os.path.join(path, "cube.parquet"), index=False)
+        self.sample.to_parquet(os.path.join(path, "sample.parquet"), index=False)
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        return cls(pd.read_parquet(os.path.join(path, "cube.parquet")),
+                   pd.read_parquet(os.path.join(path, "sample.parquet")))
+
+    @property
+    def n_rows(self):
+        return int(self.cube["count"].sum())
+
+    def date_range(self):
+        return self._cube_days[0], self._cube_days[-1]
+
+    @staticmethod
+    def _filter(frame, days, start, end, values):
+        """Rows of frame (sorted by date, day values `days`) in [start, end] matching every {column: values}."""
+        lo = 0 if start is None else np.searchsorted(days, np.datetime64(pd.Timestamp(start).date(), "D"), "left")
+        hi = len(days) if end is None else np.searchsorted(days, np.datetime64(pd.Timestamp(end).date(), "D"), "right")
+        frame = frame.iloc[lo:hi]
+        mask = None
+        for column, selected in values.items():
+            if selected is None or len(selected) == 0:
+                continue
+            column_mask = frame[column].isin(selected).to_numpy()
+            mask = column_mask if mask is None else mask & column_mask
+        return frame if mask is None else frame[mask]
+
+    def select(self, start=None, end=None, **values):
+        """Cube cells between start and end (inclusive) whose columns take one of the given values."""
+        return self._filter(self.cube, self._cube_days, start, end, values)
+
+    def select_sample(self, start=None, end=None, **values):
+        """Sampled rows under the same filter as select."""
+        return self._filter(self.sample, self._sample_days, start, end, values)
+
+
+def totals(cells, by):
+    """count, sum, mean, std, min and max of unit_sales per value of `by` over the given cube cells."""
+    grouped = cells.groupby(by, observed=True, sort=False).agg(
+        count=("count", "sum"), sales_sum=("sales_sum", "sum"), sales_sumsq=("sales_sumsq", "sum"),
+        sales_min=("sales_min", "min"), sales_max=("sales_max", "max"),
+    )
+    return pd.DataFrame({
+        "count": grouped["count"],
+        "unit_sales": grouped["sales_sum"],
+        "mean": grouped["sales_sum"] / grouped["count"],
+        "std": sample_std(grouped["count"], grouped["sales_sum"], grouped["sales_sumsq"]),
+        "min": grouped["sales_min"],
+        "max": grouped["sales_max"],
+    }).reset_index()
+
+
+def sample_std(count, total, sumsq):
+    """Standard deviation (ddof=1, like pandas) from count, sum and sum of squares."""
+    count = np.asarray(count, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = (np.asarray(sumsq, dtype=np.float64) - total * total / count) / (count - 1)
+    return np.sqrt(np.clip(variance, 0, None))
+
+
+def summary(cells):
+    """Overall count, mean, std, min and max of unit_sales over the given cube cells."""
+    count = int(cells["count"].sum())
+    total = float(cells["sales_sum"].sum())
+    return {
+        "count": count,
+        "mean": total / count if count else np.nan,
+        "std": float(sample_std(count, total, cells["sales_sumsq"].sum())) if count > 1 else np.nan,
+        "min": float(cells["sales_min"].min()) if count else np.nan,
+        "max": float(cells["sales_max"].max()) if count else np.nan,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="processed_data_parquet", help="processed Parquet dataset or CSV")
+    parser.add_argument("--out", default=DEFAULT_PATH, help="output directory of the rollup")
+    parser.add_argument("--sample-rows", type=int, default=DEFAULT_SAMPLE_ROWS, help="rows kept for the histogram")
+    parser.add_argument("--chunksize", type=int, default=1_000_000, help="rows aggregated per chunk")
+    args = parser.parse_args()
+
+    rollup = SalesRollup.build(args.data, args.sample_rows, args.chunksize)
+    rollup.save(args.out)
+    print(f"✅ {rollup.n_rows:,} rows rolled up into {len(rollup.cube):,} cells "
+          f"(+ {len(rollup.sample):,} sampled rows) in {args.out}")
@@ -0,0 +1,149 @@
+"""Fitted feature transformer shared by the preprocessing pipeline and the API.
+
+Holds everything preprocessing fits on the training data: label-encoder classes,
+MinMax bounds, the IQR outlier bounds of unit_sales_log and the model's feature
+order. It is saved as `feature_transformer.json` next to the exported model, so
+the API can turn raw rows (dates, category names, unscaled numbers) into the
+exact features the model was trained on.
+
+Lookups and scale factors are precomputed once: `transform_row` is plain Python
+(a few microseconds per row) and `transform_frame` is vectorized for batches.
+"""
+import json
+import math
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ["family", "city", "state", "type"]
+# Raw input fields a client sends to /predict/raw
+RAW_COLUMNS = ["date", "store_nbr", "item_nbr", "unit_sales", "onpromotion"] + CATEGORICAL_COLUMNS
+
+
+class FeatureTransformer:
+    def __init__(self, categories, scalers, outlier_bounds, feature_order=None):
+        self.categories = {column: list(values) for column, values in categories.items()}
+        self.scalers = {column: (float(lo), float(hi)) for column, (lo, hi) in scalers.items()}
+        self.outlier_bounds = (float(outlier_bounds[0]), float(outlier_bounds[1]))
+        self.feature_order = list(feature_order) if feature_order else None
+
+        # Precomputed once: category -> code lookups and (offset, scale) per scaled column
+        self._codes = {column: {value: code for code, value in enumerate(values)}
+                       for column, values in self.categories.items()}
+        self._index = {column: pd.Index(values) for column, values in self.categories.items()}
+        self._affine = {column: (lo, hi - lo if hi > lo else 1.0) for column, (lo, hi) in self.scalers.items()}
+
+    @classmethod
+    def from_fitted(cls, encoders, scalers, outlier_bounds, feature_order=None):
+        """Build from fitted sklearn objects: {column: LabelEncoder} and {column: (MinMaxScaler, column index)}."""
+        categories = {column: encoder.classes_.tolist() for column, encoder in encoders.items()}
+        bounds = {column: (scaler.data_min_[i], scaler.data_max_[i]) for column, (scaler, i) in scalers.items()}
+        return cls(categories, bounds, outlier_bounds, feature_order)
+
+    def to_dict(self):
+        return {
+            "version": 1,
+            "categories": self.categories,
+            "scalers": {column: list(bounds) for column, bounds in self.scalers.items()},
+            "outlier_bounds": list(self.outlier_bounds),
+            "feature_order": self.feature_order,
+        }
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=1, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            spec = json.load(f)
+        return cls(spec["categories"], spec["scalers"], spec["outlier_bounds"], spec.get("feature_order"))
+
+    # Vectorized steps, shared by the preprocessing pipeline and transform_frame
+
+    def encode_categories(self, df, strict=False):
+        """Add the <column>_encoded codes; unknown values get -1, or raise with strict=True."""
+        for column, index in self._index.items():
+            codes = index.get_indexer(df[column])
+            if strict and (codes < 0).any():
+                unknown = sorted(set(pd.Series(df[column])[codes < 0].astype(str)))
+                raise ValueError(f"Unknown {column} values: {unknown[:10]}")
+            df[f"{column}_encoded"] = codes.astype(np.int64)
+        return df
+
+    def outlier_flag(self, log_sales):
+        lo, hi = self.outlier_bounds
+        return ((log_sales < lo) | (log_sales > hi)).astype(int)
+
+    def scale(self, df, columns):
+        """MinMax-scale columns of df in place with the fitted bounds."""
+        for column in columns:
+            if column in df.columns:
+                offset, scale = self._affine[column]
+                df[column] = (df[column].astype(np.float64) - offset) / scale
+        return df
+
+    # Serving: raw rows -> model features, in feature_order
+
+    def transform_frame(self, raw):
+        """Model features for a DataFrame of raw rows (RAW_COLUMNS)."""
+        dates = pd.DatetimeIndex(pd.to_datetime(raw["date"]))
+        sales = raw["unit_sales"].to_numpy(dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_sales = np.log1p(sales)
+        day_of_week = dates.dayofweek.to_numpy()
+        features = pd.DataFrame({
+            "store_nbr": raw["store_nbr"].to_numpy(dtype=np.float64),
+            "item_nbr": raw["item_nbr"].to_numpy(dtype=np.float64),
+            "unit_sales": sales,
+            "onpromotion": raw["onpromotion"].astype(int).to_numpy(),
+            "day": dates.day.to_numpy(),
+            "month": dates.month.to_numpy(),
+            "week": dates.isocalendar().week.to_numpy(dtype=np.int64),
+            "is_outlier": self.outlier_flag(log_sales),
+            "is_return": (sales < 0).astype(int),
+            "holiday": (day_of_week >= 5).astype(int),
+            "year": dates.year.to_numpy(),
+            "day_of_week": day_of_week,
+            "is_weekend": (day_of_week >= 5).astype(int),
+        })
+        for column in CATEGORICAL_COLUMNS:
+            features[column] = raw[column].to_numpy()
+        self.encode_categories(features, strict=True)
+        self.scale(features, self.scalers)
+        return features[self.feature_order]
+
+    def transform_row(self, row):
+        """Model features for one raw row (dict), without pandas."""
+        day = row["date"]
+        if isinstance(day, datetime):
+            day = day.date()
+        elif isinstance(day, str):
+            day = date.fromisoformat(day[:10])
+        sales = float(row["unit_sales"])
+        log_sales = math.log1p(sales) if sales > -1 else (-math.inf if sales == -1 else math.nan)
+        lo, hi = self.outlier_bounds
+        weekday = day.weekday()
+        features = {
+            "store_nbr": float(row["store_nbr"]),
+            "item_nbr": float(row["item_nbr"]),
+            "unit_sales": sales,
+            "onpromotion": int(row["onpromotion"]),
+            "day": day.day,
+            "month": day.month,
+            "week": day.isocalendar()[1],
+            "is_outlier": int(log_sales < lo or log_sales > hi),
+            "is_return": int(sales < 0),
+            "holiday": int(weekday >= 5),
+            "year": day.year,
+            "day_of_week": weekday,
+            "is_weekend": int(weekday >= 5),
+        }
+        for column, codes in self._codes.items():
+            try:
+                features[f"{column}_encoded"] = codes[row[column]]
+            except KeyError:
+                raise ValueError(f"Unknown {column} values: {[row[column]]}") from None
+        for column, (offset, scale) in self._affine.items():
+            features[column] = (features[column] - offset) / scale
+        return {name: features[name] for name in self.feature_order}
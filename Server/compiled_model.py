@@ -0,0 +1,122 @@
+"""Export the forecasting model to ONNX and serve it with onnxruntime.
+
+The tree ensemble is converted once, at registration time, and checked against
+the pyfunc model on a held-out sample before it is written:
+
+    python -m Server.compiled_model --model exported_model/model --out exported_model/model.onnx \
+        --sample holdout.csv
+
+Serve it with INFERENCE_ENGINE=onnx and COMPILED_MODEL_PATH=exported_model/model.onnx.
+Needs the optional `onnxmltools` (export) and `onnxruntime` (serving) packages.
+"""
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+import mlflow.pyfunc
+from mlflow.models import Model
+from Server.inference_engine import NativeEngine, TRAINING_ALIASES, load_booster, resolve_feature_order
+from Server.schemas import FEATURE_COLUMNS
+
+DEFAULT_RTOL = 1e-4
+DEFAULT_ATOL = 1e-4
+
+NON_FEATURE_COLUMNS = ["id", "unit_sales_log", "date"]
+
+
+class OnnxEngine(NativeEngine):
+    """Score an exported ONNX tree ensemble with onnxruntime."""
+    name = "onnx"
+
+    def __init__(self, onnx_path, feature_columns, intra_op_threads=0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads   # 0 = one thread per physical core
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_name = self.session.get_inputs()[0].name
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        order = json.loads(metadata["feature_order"]) if "feature_order" in metadata else None
+        super().__init__(self._run, "onnx", feature_columns, order)
+
+    def _run(self, matrix):
+        return self.session.run(None, {self._input_name: matrix})[0].ravel()
+
+
+def convert_to_onnx(model_path, feature_columns=FEATURE_COLUMNS):
+    """Convert the LightGBM / XGBoost model at model_path to an ONNX ModelProto."""
+    import onnxmltools
+    from onnxmltools.convert.common.data_types import FloatTensorType
+
+    loaded = load_booster(model_path, Model.load(model_path).flavors)
+    if loaded is None:
+        raise ValueError("Only LightGBM and XGBoost models can be exported to ONNX.")
+    flavor, booster, names = loaded
+    order = resolve_feature_order(feature_columns, names)
+    initial_types = [("input", FloatTensorType([None, len(order)]))]
+
+    if flavor == "lightgbm":
+        onnx_model = onnxmltools.convert_lightgbm(booster, initial_types=initial_types)
+    else:
+        # The XGBoost converter only understands the default f0..fN feature names
+        booster = booster.copy()
+        booster.feature_names = None
+        onnx_model = onnxmltools.convert_xgboost(booster, initial_types=initial_types)
+
+    # Record the column order so the serving side feeds features in the same positions
+    entry = onnx_model.metadata_props.add()
+    entry.key, entry.value = "feature_order", json.dumps(order)
+    return onnx_model
+
+
+def check_parity(model_path, onnx_path, sample_df, rtol=DEFAULT_RTOL, atol=DEFAULT_ATOL):
+    """Compare ONNX predictions with the pyfunc model on sample_df; raise if they differ.
+
+    sample_df is passed to the pyfunc model as-is, so it uses the training column names.
+    """
+    reference = np.asarray(mlflow.pyfunc.load_model(model_path).predict(sample_df), dtype=np.float64)
+    candidate = OnnxEngine(onnx_path, FEATURE_COLUMNS).predict(sample_df.rename(columns=TRAINING_ALIASES))
+    max_abs_diff = float(np.abs(reference - candidate).max()) if len(reference) else 0.0
+    if not np.allclose(candidate, reference, rtol=rtol, atol=atol):
+        n_bad = int((~np.isclose(candidate, reference, rtol=rtol, atol=atol)).sum())
+        raise AssertionError(
+            f"ONNX predictions differ from pyfunc on {n_bad}/{len(reference)} rows (max abs diff {max_abs_diff:.3e})")
+    return max_abs_diff
+
+
+def export_onnx(model_path, onnx_path, sample_df=None, rtol=DEFAULT_RTOL, atol=DEFAULT_ATOL):
+    """Convert the model to ONNX, write it to onnx_path and check parity on sample_df."""
+    onnx_model = convert_to_onnx(model_path)
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+    with open(onnx_path, "wb") as f:
+        f.write(onnx_model.SerializeToString())
+
+    if sample_df is not None:
+        try:
+            max_abs_diff = check_parity(model_path, onnx_path, sample_df, rtol=rtol, atol=atol)
+        except AssertionError:
+            os.remove(onnx_path)
+            raise
+        print(f"✅ ONNX parity check passed on {len(sample_df):,} rows (max abs diff {max_abs_diff:.3e})")
+    print(f"✅ ONNX model written to {onnx_path}")
+    return onnx_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.getenv("MODEL_PATH", "exported_model/model"), help="exported MLflow model")
+    parser.add_argument("--out", default="exported_model/model.onnx", help="where to write the ONNX model")
+    parser.add_argument("--sample", help="held-out rows in the processed_data.csv layout, for the parity check")
+    parser.add_argument("--sample-rows", type=int, default=10000, help="rows of --sample to compare")
+    parser.add_argument("--rtol", type=float, default=DEFAULT_RTOL)
+    parser.add_argument("--atol", type=float, default=DEFAULT_ATOL)
+    args = parser.parse_args()
+
+    sample_df = None
+    if args.sample:
+        # Same feature columns as X in the model notebook
+        sample_df = pd.read_csv(args.sample, nrows=args.sample_rows).drop(columns=NON_FEATURE_COLUMNS, errors="ignore")
+    else:
+        print("⚠️ No --sample given, skipping the parity check")
+    export_onnx(args.model, args.out, sample_df, rtol=args.rtol, atol=args.atol)
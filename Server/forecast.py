@@ -0,0 +1,141 @@
+"""Forecast grids for /forecast: every selected (store, item) series over the next `horizon` days.
+
+The series catalog lists each (store_nbr, item_nbr) with its family, city, state
+and type plus the mean of its recorded daily sales, which stands in for the
+unknown future `unit_sales` feature. It is built once from the raw sales data:
+
+    python -m Server.forecast --raw train_sample.csv --out series_catalog.csv
+
+The grid is series-major (one row per series and day). Its features are not
+transformed row by row: date features (day, month, week, day_of_week, is_weekend,
+holiday, year) depend only on the date and everything else only on the series, so
+the feature transformer runs once per series and once per date and the results
+are broadcast with np.repeat / np.tile. Thousands of rows cost one request and
+one batch prediction.
+"""
+import argparse
+import numpy as np
+import pandas as pd
+
+DEFAULT_CATALOG_PATH = "series_catalog.csv"
+ATTRIBUTE_COLUMNS = ["family", "city", "state", "type"]
+CATALOG_COLUMNS = ["store_nbr", "item_nbr"] + ATTRIBUTE_COLUMNS + ["mean_sales", "last_date"]
+# Features that depend only on the date (training names); all others depend only on the series
+DATE_FEATURES = ["day", "month", "week", "day_of_week", "is_weekend", "holiday", "year"]
+# Levels /forecast aggregates the predictions over
+TOTAL_LEVELS = ["date", "store_nbr", "family", "state"]
+
+
+def build_catalog(raw_path, chunksize=1_000_000):
+    """One row per (store_nbr, item_nbr) of the raw sales CSV, with its attributes and mean daily sales."""
+    keys = ["store_nbr", "item_nbr"]
+    parts = []
+    for chunk in pd.read_csv(raw_path, usecols=keys + ATTRIBUTE_COLUMNS + ["date", "unit_sales"],
+                             chunksize=chunksize):
+        chunk = chunk.dropna(subset=ATTRIBUTE_COLUMNS)
+        parts.append(chunk.groupby(keys).agg(
+            **{column: (column, "first") for column in ATTRIBUTE_COLUMNS},
+            sales_sum=("unit_sales", "sum"), sales_count=("unit_sales", "count"), last_date=("date", "max"),
+        ))
+    merged = pd.concat(parts).groupby(level=keys).agg(
+        **{column: (column, "first") for column in ATTRIBUTE_COLUMNS},
+        sales_sum=("sales_sum", "sum"), sales_count=("sales_count", "sum"), last_date=("last_date", "max"),
+    )
+    merged["mean_sales"] = (merged["sales_sum"] / merged["sales_count"].where(merged["sales_count"] > 0)).fillna(0.0)
+    return merged.reset_index()[CATALOG_COLUMNS]
+
+
+class SeriesCatalog:
+    def __init__(self, frame):
+        self.frame = frame.sort_values(["store_nbr", "item_nbr"]).reset_index(drop=True)
+        self._store = self.frame["store_nbr"].to_numpy()
+        self._item = self.frame["item_nbr"].to_numpy()
+        self._family = self.frame["family"].to_numpy()
+
+    @classmethod
+    def load(cls, path=DEFAULT_CATALOG_PATH):
+        return cls(pd.read_csv(path))
+
+    def __len__(self):
+        return len(self.frame)
+
+    def select(self, store_nbr=None, item_nbr=None, family=None):
+        """Series matching every given selector (a list of values each; None = any)."""
+        mask = np.ones(len(self.frame), dtype=bool)
+        for values, column in ((store_nbr, self._store), (item_nbr, self._item), (family, self._family)):
+            if values:
+                mask &= np.isin(column, values)
+        return self.frame[mask]
+
+
+def forecast_grid(series, start_date, horizon, onpromotion=False):
+    """Raw rows (transformer RAW_COLUMNS) for every series and each of the horizon days from start_date."""
+    dates = pd.date_range(start_date, periods=horizon, freq="D").to_numpy()
+    n_series = len(series)
+    grid = {"date": np.tile(dates, n_series)}
+    for column in ["store_nbr", "item_nbr"] + ATTRIBUTE_COLUMNS:
+        grid[column] = np.repeat(series[column].to_numpy(), horizon)
+    grid["unit_sales"] = np.repeat(series["mean_sales"].to_numpy(dtype=np.float64), horizon)
+    grid["onpromotion"] = np.full(n_series * horizon, bool(onpromotion))
+    return pd.DataFrame(grid)
+
+
+def grid_features(transformer, series, start_date, horizon, onpromotion=False):
+    """Model features (transformer feature order) of forecast_grid(series, start_date, horizon, onpromotion)."""
+    per_series = transformer.transform_frame(forecast_grid(series, start_date, 1, onpromotion))
+    per_date = transformer.transform_frame(forecast_grid(series.iloc[:1], start_date, horizon, onpromotion))
+    columns = {}
+    for name in per_series.columns:
+        if name in DATE_FEATURES:
+            columns[name] = np.tile(per_date[name].to_numpy(), len(series))
+        else:
+            columns[name] = np.repeat(per_series[name].to_numpy(), horizon)
+    return pd.DataFrame(columns, columns=per_series.columns)
+
+
+def forecast_totals(grid, predictions):
+    """Summed predictions per date, store, family and state, plus the grand total."""
+    scored = pd.DataFrame({level: grid[level].to_numpy() for level in TOTAL_LEVELS})
+    scored["predicted_sales"] = predictions
+    totals = {"total": float(predictions.sum())}
+    for level in TOTAL_LEVELS:
+        summed = scored.groupby(level, sort=True)["predicted_sales"].sum()
+        keys = summed.index.strftime("%Y-%m-%d") if level == "date" else summed.index
+        totals[level] = [{level: key.item() if hasattr(key, "item") else key, "predicted_sales": float(value)}
+                         for key, value in zip(keys, summed.to_numpy())]
+    return totals
+
+
+def forecast_keys(grid):
+    """date (YYYY-MM-DD), store_nbr, item_nbr and family of every grid row."""
+    # Each distinct date is formatted once
+    codes, days = pd.factorize(grid["date"])
+    return pd.DataFrame({
+        "date": np.asarray(days.strftime("%Y-%m-%d"))[codes],
+        "store_nbr": grid["store_nbr"].to_numpy(),
+        "item_nbr": grid["item_nbr"].to_numpy(),
+        "family": grid["family"].to_numpy(),
+    })
+
+
+def forecast_rows(grid, predictions):
+    """Per-row forecasts as JSON records."""
+    keys = forecast_keys(grid)
+    return [
+        {"date": day, "store_nbr": store, "item_nbr": item, "family": family, "predicted_sales": value}
+        for day, store, item, family, value in zip(
+            keys["date"].tolist(), keys["store_nbr"].tolist(), keys["item_nbr"].tolist(), keys["family"].tolist(),
+            predictions.tolist())
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--raw", default="train_sample.csv", help="raw sales CSV")
+    parser.add_argument("--out", default=DEFAULT_CATALOG_PATH, help="series catalog CSV to write")
+    parser.add_argument("--chunksize", type=int, default=1_000_000, help="CSV rows read per chunk")
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.raw, args.chunksize)
+    catalog.to_csv(args.out, index=False)
+    print(f"✅ {len(catalog):,} series written to {args.out}")
@@ -0,0 +1,175 @@
+"""Inference engines wrapping the exported MLflow model.
+
+`pyfunc` scores through `mlflow.pyfunc` and a pandas DataFrame (works for any
+flavor). `native` loads the underlying LightGBM / XGBoost booster and scores
+float32 NumPy buffers directly, skipping the pyfunc and pandas overhead; models
+of any other flavor fall back to `pyfunc`. `onnx` serves the compiled model
+written by Server/compiled_model.py with onnxruntime.
+
+Every engine returns predictions on the model's (log) scale and exposes:
+    predict(df)              -> predictions for a DataFrame with the API feature columns
+    row_input(row)           -> engine-specific input for one feature dict
+    predict_input(x)         -> predictions for an input built by row_input
+"""
+import os
+import threading
+import numpy as np
+import pandas as pd
+import mlflow.pyfunc
+from mlflow.models import Model
+
+INFERENCE_ENGINES = ("pyfunc", "native", "onnx")
+
+# Training column name -> API feature name when they differ
+TRAINING_ALIASES = {"day_of_week": "dayofweek"}
+
+
+class PyfuncEngine:
+    name = "pyfunc"
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, input_df):
+        return np.asarray(self.model.predict(input_df), dtype=np.float64)
+
+    def row_input(self, row):
+        return pd.DataFrame([row])
+
+    def predict_input(self, input_df):
+        return self.predict(input_df)
+
+
+class NativeEngine:
+    """Score a LightGBM / XGBoost booster straight from float32 buffers."""
+    name = "native"
+
+    def __init__(self, predict_fn, flavor, feature_columns, model_feature_names=None):
+        self.flavor = flavor
+        self._predict_fn = predict_fn
+        self.input_order = resolve_feature_order(feature_columns, model_feature_names)
+        self.n_features = len(self.input_order)
+        self._local = threading.local()
+
+    def _matrix(self, n_rows):
+        """Per-thread float32 buffer with room for at least n_rows rows."""
+        buffer = getattr(self._local, "matrix", None)
+        if buffer is None or buffer.shape[0] < n_rows:
+            buffer = np.empty((max(n_rows, 1), self.n_features), dtype=np.float32)
+            self._local.matrix = buffer
+        return buffer[:n_rows]
+
+    def row_input(self, row):
+        buffer = getattr(self._local, "row", None)
+        if buffer is None:
+            buffer = self._local.row = np.empty((1, self.n_features), dtype=np.float32)
+        for i, name in enumerate(self.input_order):
+            buffer[0, i] = row[name]
+        return buffer
+
+    def predict_input(self, matrix):
+        return np.asarray(self._predict_fn(matrix), dtype=np.float64)
+
+    def predict(self, input_df):
+        matrix = self._matrix(len(input_df))
+        for i, name in enumerate(self.input_order):
+            matrix[:, i] = input_df[name].to_numpy()
+        return self.predict_input(matrix)
+
+
+def resolve_feature_order(feature_columns, model_feature_names):
+    """Column order to feed the booster, derived from the API feature columns.
+
+    If the booster was trained with named features that match the API features
+    (up to TRAINING_ALIASES) it is fed in its own order; unnamed boosters are fed
+    positionally in PredictionInput order, like the pyfunc path.
+    """
+    feature_columns = list(feature_columns)
+    if not model_feature_names:
+        return feature_columns
+    if len(model_feature_names) != len(feature_columns):
+        raise ValueError(f"Model expects {len(model_feature_names)} features, API provides {len(feature_columns)}.")
+    mapped = [TRAINING_ALIASES.get(name, name) for name in model_feature_names]
+    if sorted(mapped) == sorted(feature_columns):
+        return mapped
+    return feature_columns
+
+
+def load_booster(model_path, flavors):
+    """Load the raw booster of a LightGBM / XGBoost model as (flavor, booster, model_feature_names).
+
+    Returns None for any other flavor.
+    """
+    if "lightgbm" in flavors:
+        import mlflow.lightgbm
+        model = mlflow.lightgbm.load_model(model_path)
+        booster = getattr(model, "booster_", model)
+        names = booster.feature_name()
+        if all(name.startswith("Column_") for name in names):
+            names = None
+        return "lightgbm", booster, names
+
+    if "xgboost" in flavors:
+        import mlflow.xgboost
+        model = mlflow.xgboost.load_model(model_path)
+        booster = model.get_booster() if hasattr(model, "get_booster") else model
+        best_iteration = getattr(model, "best_iteration", None)
+        if best_iteration is not None:
+            booster = booster[:best_iteration + 1]
+        return "xgboost", booster, booster.feature_names
+
+    return None
+
+
+def load_native_engine(model_path, feature_columns, flavors):
+    loaded = load_booster(model_path, flavors)
+    if loaded is None:
+        return None
+    flavor, booster, names = loaded
+    if flavor == "lightgbm":
+        predict_fn = booster.predict
+    else:
+        predict_fn = lambda X: booster.inplace_predict(X, validate_features=False)
+    return NativeEngine(predict_fn, flavor, feature_columns, names)
+
+
+def model_token(model_path, engine_name=""):
+    """Identifier of the model at model_path: its MLflow model_uuid, else the MLmodel file's mtime."""
+    try:
+        meta = Model.load(model_path)
+        identity = meta.model_uuid or meta.run_id or meta.utc_time_created
+    except Exception:
+        identity = None
+    if not identity:
+        mlmodel = os.path.join(model_path, "MLmodel")
+        identity = f"mtime-{os.path.getmtime(mlmodel):.0f}" if os.path.exists(mlmodel) else "unknown"
+    return f"{engine_name}:{identity}" if engine_name else str(identity)
+
+
+def load_inference_engine(model_path, feature_columns, engine="pyfunc", compiled_path=None, threads=0):
+    """Load the model at model_path behind the requested engine.
+
+    compiled_path is the ONNX file used by the onnx engine; threads caps its intra-op threads (0 = all cores).
+    """
+    if engine not in INFERENCE_ENGINES:
+        raise ValueError(f"Unknown inference engine '{engine}', expected one of {INFERENCE_ENGINES}")
+
+    if engine == "onnx":
+        try:
+            from Server.compiled_model import OnnxEngine
+            return OnnxEngine(compiled_path, feature_columns, intra_op_threads=threads)
+        except Exception as e:
+            print(f"⚠️ ONNX engine unavailable ({e}), falling back to pyfunc")
+
+    if engine == "native":
+        flavors = Model.load(model_path).flavors
+        try:
+            native = load_native_engine(model_path, feature_columns, flavors)
+        except Exception as e:
+            print(f"⚠️ Native engine unavailable ({e}), falling back to pyfunc")
+            native = None
+        if native is not None:
+            return native
+        print(f"⚠️ No native engine for flavors {sorted(flavors)}, falling back to pyfunc")
+
+    return PyfuncEngine(mlflow.pyfunc.load_model(model_path))
@@ -1,66 +1,654 @@
-import mlflow.pyfunc 
-from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi import FastAPI, Body, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from typing import Dict, List, Union
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import json
 import os
-from Model_Monitoring.monitor import detect_data_drift, monitor_prediction_error, check_api_health
+import queue
+import time
+import uuid
+from Model_Monitoring.monitor import detect_data_drift, shutdown_logging, LOG_SINK, SHADOW_LOG, PREDICTION_STORE
+from Model_Monitoring.prediction_store import feature_keys
+from Server.schemas import PredictionInput, RawPredictionInput, ForecastRequest, FEATURE_COLUMNS, FEATURE_DTYPES
+from Server.micro_batcher import MicroBatcher
+from Server.inference_engine import load_inference_engine, TRAINING_ALIASES
+from Server.model_manager import ModelManager, ModelSource
+from Preprocessing.transformer import FeatureTransformer
+from Preprocessing.feature_store import LagFeatureStore
+from Server.forecast import (SeriesCatalog, TOTAL_LEVELS, forecast_grid, forecast_keys, forecast_rows, forecast_totals,
+                             grid_features)
+from Server.streaming import MEDIA_TYPES, negotiate, read_upload, stream_body
+from Server.prediction_cache import PredictionCache, LocalBackend, RedisBackend
+from Server.metrics import REGISTRY, REQUESTS, ERRORS, ROWS_SCORED, REQUEST_SECONDS, STAGE_SECONDS, CONTENT_TYPE, Gauge
 
 MODEL_PATH = os.getenv("MODEL_PATH", "exported_model/model") 
+# "pyfunc" (any MLflow flavor), "native" (LightGBM / XGBoost booster on float32 buffers)
+# or "onnx" (compiled model at COMPILED_MODEL_PATH, served with onnxruntime)
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "pyfunc")
+COMPILED_MODEL_PATH = os.getenv("COMPILED_MODEL_PATH", "exported_model/model.onnx")
+# Fitted encoders / scalers packaged with the model, used by /predict/raw
+FEATURE_TRANSFORMER_PATH = os.getenv("FEATURE_TRANSFORMER_PATH", os.path.join(MODEL_PATH, "feature_transformer.json"))
+# Lag / rolling-window features of each (store, item) series, built by Preprocessing/feature_store.py
+FEATURE_STORE_PATH = os.getenv("FEATURE_STORE_PATH", "feature_store.sqlite")
+# (store, item) series with their family / city / state / type, built by Server/forecast.py for /forecast
+SERIES_CATALOG_PATH = os.getenv("SERIES_CATALOG_PATH", "series_catalog.csv")
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))
 
-app = FastAPI()
+# Model to serve: MODEL_PATH, or a registry alias such as models:/SalesForecastingModel@champion.
+# It is polled every MODEL_RELOAD_SECONDS (0 disables hot reload) and new models are swapped in live.
+MODEL_SOURCE = os.getenv("MODEL_SOURCE", MODEL_PATH)
+MODEL_RELOAD_SECONDS = float(os.getenv("MODEL_RELOAD_SECONDS", "30"))
+# Where registry model versions are downloaded
+MODEL_DOWNLOAD_DIR = os.getenv("MODEL_DOWNLOAD_DIR", "model_cache")
+# Optional shadow model (path or registry alias) scored on SHADOW_FRACTION of the traffic, differences logged
+SHADOW_MODEL_SOURCE = os.getenv("SHADOW_MODEL_SOURCE", "")
+SHADOW_FRACTION = float(os.getenv("SHADOW_FRACTION", "0"))
+
+# Batch scoring limits: max rows per request, rows per model.predict call
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", "100000"))
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "10000"))
+# Max rows of a streamed job (/predict/stream, /forecast with an NDJSON / Arrow Accept header)
+MAX_STREAM_ROWS = int(os.getenv("MAX_STREAM_ROWS", "10000000"))
+
+# Opt-in server-side micro-batching of concurrent /predict calls
+MICRO_BATCHING = os.getenv("MICRO_BATCHING", "0") == "1"
+MICRO_BATCH_MAX_ROWS = int(os.getenv("MICRO_BATCH_MAX_ROWS", "64"))
+MICRO_BATCH_MAX_WAIT_MS = float(os.getenv("MICRO_BATCH_MAX_WAIT_MS", "5"))
+MICRO_BATCH_TIMEOUT_SECONDS = float(os.getenv("MICRO_BATCH_TIMEOUT_SECONDS", "30"))
+
+# Cache of /predict results: max entries (0 disables), TTL (0 = no expiry) and
+# optional shared backend for multi-worker deployments ("none", "local" or "redis")
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "100000"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "0"))
+PREDICTION_CACHE_BACKEND = os.getenv("PREDICTION_CACHE_BACKEND", "none")
+PREDICTION_CACHE_REDIS_URL = os.getenv("PREDICTION_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+# Request-ID prefix of synthetic traffic (requests with an "X-Probe: 1" header, sent by
+# Model_Monitoring/prober.py); their rows are kept out of the prediction store and the drift detector
+PROBE_REQUEST_PREFIX = "probe-"
+
+@asynccontextmanager
+async def lifespan(app):
+    model_manager.start()
+    if micro_batcher is not None:
+        micro_batcher.start()
+    yield
+    if micro_batcher is not None:
+        micro_batcher.stop()
+    model_manager.stop()
+    if feature_store is not None:
+        feature_store.close()
+    shutdown_logging()
+
+app = FastAPI(lifespan=lifespan)
+
+def route_path(request):
+    """Route template of the request (bounded label values for metrics)."""
+    route = request.scope.get("route")
+    return route.path if route is not None else "unmatched"
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    request.state.received_at = time.perf_counter()
+    # Recorded with every prediction of the request and echoed back, so actual sales can be traced to it
+    request.state.request_id = request.headers.get("x-request-id", "")[:64] or uuid.uuid4().hex
+    if request.headers.get("x-probe") == "1" and not request.state.request_id.startswith(PROBE_REQUEST_PREFIX):
+        request.state.request_id = PROBE_REQUEST_PREFIX + request.state.request_id
+    try:
+        response = await call_next(request)
+    except Exception:
+        ERRORS.inc(endpoint=route_path(request), reason="exception")
+        REQUESTS.inc(endpoint=route_path(request), status="500")
+        raise
+    endpoint = route_path(request)
+    REQUESTS.inc(endpoint=endpoint, status=str(response.status_code))
+    REQUEST_SECONDS.observe(time.perf_counter() - request.state.received_at, endpoint=endpoint)
+    response.headers["X-Request-ID"] = request.state.request_id
+    return response
 
 @app.get("/")
 def read_root():
     return {"message": "Sales Forecasting API", "status": "running", "docs": "/docs"}
-
-class PredictionInput(BaseModel):
-    store_nbr: float
-    item_nbr: float
-    unit_sales: float
-    onpromotion: float
-    day: int
-    month: int
-    dayofweek: int
-    week: int
-    family_encoded: int
-    city_encoded: int
-    state_encoded: int
-    type_encoded: int
-    is_outlier: int
-    is_return: int
-    holiday: int
-    year: int
-    is_weekend: int
     
+def load_model(path):
+    return load_inference_engine(path, FEATURE_COLUMNS, engine=INFERENCE_ENGINE,
+                                 compiled_path=COMPILED_MODEL_PATH, threads=INFERENCE_THREADS)
+
+
+def build_prediction_cache():
+    if PREDICTION_CACHE_SIZE <= 0:
+        return None
+    shared = None
+    if PREDICTION_CACHE_BACKEND == "local":
+        shared = LocalBackend()
+    elif PREDICTION_CACHE_BACKEND == "redis":
+        try:
+            shared = RedisBackend(PREDICTION_CACHE_REDIS_URL)
+        except Exception as e:
+            print(f"⚠️ Redis prediction cache unavailable ({e}), using the in-process cache only")
+    return PredictionCache(FEATURE_COLUMNS, max_entries=PREDICTION_CACHE_SIZE,
+                           ttl_seconds=PREDICTION_CACHE_TTL_SECONDS or None, shared=shared)
+
+
+try:
+    feature_transformer = FeatureTransformer.load(FEATURE_TRANSFORMER_PATH)
+    if sorted(TRAINING_ALIASES.get(name, name) for name in feature_transformer.feature_order) != sorted(FEATURE_COLUMNS):
+        raise ValueError(f"transformer features {feature_transformer.feature_order} do not match the API features")
+    print("✅ Feature transformer loaded successfully!")
+except Exception as e:
+    print(f"⚠️ Feature transformer not loaded, /predict/raw is disabled: {e}")
+    feature_transformer = None
+
+
+if os.path.exists(FEATURE_STORE_PATH):
+    feature_store = LagFeatureStore(FEATURE_STORE_PATH)
+    print(f"✅ Feature store loaded: {feature_store.stats()}")
+else:
+    print(f"⚠️ Feature store not found at {FEATURE_STORE_PATH}, /features/lags is disabled")
+    feature_store = None
+
+
+try:
+    series_catalog = SeriesCatalog.load(SERIES_CATALOG_PATH)
+    print(f"✅ Series catalog loaded: {len(series_catalog):,} series")
+except Exception as e:
+    print(f"⚠️ Series catalog not loaded, /forecast is disabled: {e}")
+    series_catalog = None
+
+
+prediction_cache = build_prediction_cache()
+
+
+def on_model_swap(token, engine):
+    # Cached predictions of the previous model must not be served for the new one
+    if prediction_cache is not None:
+        prediction_cache.bind_model(token)
+
+
+model_manager = ModelManager(
+    ModelSource(MODEL_SOURCE, INFERENCE_ENGINE, COMPILED_MODEL_PATH, MODEL_DOWNLOAD_DIR),
+    load_model,
+    warmup_frame=pd.DataFrame({name: np.zeros(8, dtype=FEATURE_DTYPES[name]) for name in FEATURE_COLUMNS}),
+    poll_seconds=MODEL_RELOAD_SECONDS,
+    on_swap=on_model_swap,
+    shadow_source=(ModelSource(SHADOW_MODEL_SOURCE, INFERENCE_ENGINE, COMPILED_MODEL_PATH, MODEL_DOWNLOAD_DIR)
+                   if SHADOW_MODEL_SOURCE else None),
+    shadow_fraction=SHADOW_FRACTION,
+    log_sink=LOG_SINK,
+    shadow_log=SHADOW_LOG,
+)
 try:
-    forecasting_model = mlflow.pyfunc.load_model(MODEL_PATH)
-    print("✅ Model loaded successfully!")
+    model_manager.load()
+    print(f"✅ Model loaded successfully! ({model_manager.engine.name} engine)")
 except Exception as e:
     print(f"❌ Error loading model: {e}")
-    forecasting_model = None
+try:
+    model_manager.load_shadow()
+    if model_manager.shadow is not None:
+        print(f"✅ Shadow model loaded: {model_manager.shadow_token} on {SHADOW_FRACTION:.0%} of the traffic")
+except Exception as e:
+    print(f"⚠️ Shadow model not loaded: {e}")
+
+
+def rows_to_frame(rows):
+    """Build the model input frame from a list of PredictionInput rows."""
+    columns = {name: [getattr(row, name) for row in rows] for name in FEATURE_COLUMNS}
+    return columns_to_frame(columns)
+
+
+def columns_to_frame(columns):
+    """Build the model input frame from columnar JSON ({feature: [values, ...]})."""
+    missing = [name for name in FEATURE_COLUMNS if name not in columns]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Missing feature columns: {missing}")
+
+    data = {}
+    for name in FEATURE_COLUMNS:
+        try:
+            values = np.asarray(columns[name], dtype=np.float64)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=422, detail=f"Column '{name}' must be a list of numbers.")
+        if values.ndim != 1:
+            raise HTTPException(status_code=422, detail=f"Column '{name}' must be a flat list of numbers.")
+        data[name] = values
+    if len({len(values) for values in data.values()}) != 1:
+        raise HTTPException(status_code=422, detail="All feature columns must have the same length.")
+
+    for name, values in data.items():
+        if FEATURE_DTYPES[name] is np.int64:
+            if not np.all(np.isfinite(values)) or not np.array_equal(values, np.round(values)):
+                raise HTTPException(status_code=422, detail=f"Column '{name}' must contain integers.")
+            values = values.astype(np.int64)
+        data[name] = values
+    return pd.DataFrame(data, columns=FEATURE_COLUMNS)
+
+
+def predict_frame(input_df, endpoint="/predict"):
+    """Score a frame chunk by chunk, returning sales on the original scale."""
+    # One model for the whole frame, even if a reload swaps it meanwhile
+    model = model_manager.engine
+    predictions = np.empty(len(input_df), dtype=np.float64)
+    for start in range(0, len(input_df), BATCH_CHUNK_SIZE):
+        chunk = input_df.iloc[start:start + BATCH_CHUNK_SIZE]
+        log_sales_pred = model.predict(chunk)
+        predictions[start:start + len(chunk)] = np.expm1(log_sales_pred)
+    model_manager.remember(input_df)
+    model_manager.mirror(input_df, predictions, endpoint)
+    return predictions
+
+
+def record_predictions(request_id, endpoint, keys, predictions, first_row=0):
+    """Append served predictions with their request ID and keys (see prediction_store.feature_keys) to the store.
+
+    Probe requests are skipped, so synthetic traffic never counts in the ground-truth error.
+    """
+    if PREDICTION_STORE is not None and not request_id.startswith(PROBE_REQUEST_PREFIX):
+        PREDICTION_STORE.record(request_id, endpoint, keys, predictions, model_manager.token, first_row)
+
+
+def check_drift(request_id, features):
+    """Feed served rows to the drift detector; probe requests are skipped, as in record_predictions."""
+    if not request_id.startswith(PROBE_REQUEST_PREFIX):
+        detect_data_drift(features)
+
+
+def scored_chunks(input_df, keys, endpoint, request_id, store_keys):
+    """Score input_df BATCH_CHUNK_SIZE rows at a time, yielding each chunk's keys with its predictions.
+
+    store_keys are the prediction store key columns of input_df (numpy arrays).
+    """
+    for start in range(0, len(input_df), BATCH_CHUNK_SIZE):
+        chunk = input_df.iloc[start:start + BATCH_CHUNK_SIZE]
+        with STAGE_SECONDS.time(endpoint=endpoint, stage="predict"):
+            predictions = predict_frame(chunk, endpoint)
+        ROWS_SCORED.inc(len(predictions), endpoint=endpoint)
+        record_predictions(request_id, endpoint,
+                           {name: values[start:start + len(chunk)] for name, values in store_keys.items()},
+                           predictions, first_row=start)
+        scored = keys.iloc[start:start + len(chunk)].reset_index(drop=True)
+        scored["predicted_sales"] = predictions
+        yield scored
+
+
+# Arrow schemas of the streamed responses
+STREAM_SCHEMA = pa.schema([("row", pa.int64()), ("predicted_sales", pa.float64())])
+FORECAST_SCHEMA = pa.schema([("date", pa.string()), ("store_nbr", pa.int64()), ("item_nbr", pa.int64()),
+                             ("family", pa.string()), ("predicted_sales", pa.float64())])
+
+
+if MICRO_BATCHING:
+    micro_batcher = MicroBatcher(
+        lambda rows: predict_frame(pd.DataFrame(rows, columns=FEATURE_COLUMNS)),
+        max_batch_rows=MICRO_BATCH_MAX_ROWS,
+        max_wait_ms=MICRO_BATCH_MAX_WAIT_MS,
+        timeout=MICRO_BATCH_TIMEOUT_SECONDS,
+    )
+else:
+    micro_batcher = None
+
+REGISTRY.register(Gauge("sales_api_log_queue_rows", "Monitoring log rows waiting to be written.",
+                        callback=lambda: LOG_SINK.stats()["queued"]))
+REGISTRY.register(Gauge("sales_api_log_dropped_rows", "Monitoring log rows dropped because the queue was full.",
+                        callback=lambda: LOG_SINK.dropped))
+if PREDICTION_STORE is not None:
+    REGISTRY.register(Gauge("sales_api_prediction_store_recorded_rows", "Predictions written to the prediction store.",
+                            callback=lambda: PREDICTION_STORE.recorded))
+    REGISTRY.register(Gauge("sales_api_prediction_store_dropped_rows",
+                            "Predictions not recorded because the store queue was full.",
+                            callback=lambda: PREDICTION_STORE.dropped))
+if micro_batcher is not None:
+    REGISTRY.register(micro_batcher.batch_rows)
+    REGISTRY.register(micro_batcher.queue_wait)
+    REGISTRY.register(Gauge("sales_api_batcher_queue_depth", "Rows waiting in the micro-batch queue.",
+                            callback=micro_batcher.queue_depth))
+if prediction_cache is not None:
+    for stat in ("size", "hits", "shared_hits", "misses", "evictions", "expirations"):
+        REGISTRY.register(Gauge(f"sales_api_prediction_cache_{stat}", f"Prediction cache {stat.replace('_', ' ')}.",
+                                callback=lambda stat=stat: prediction_cache.stats()[stat]))
+
+
+def score_row(input_row, endpoint):
+    """Sales prediction for one feature row, through the prediction cache and the micro-batcher when enabled."""
+    original_sales_pred = None
+    # The model scoring this request; its token tags the cache write
+    model, token = model_manager.current()
+    if prediction_cache is not None:
+        with STAGE_SECONDS.time(endpoint=endpoint, stage="cache"):
+            cache_key = prediction_cache.key(input_row)
+            original_sales_pred = prediction_cache.get(cache_key)
+
+    if original_sales_pred is None:
+        if micro_batcher is not None:
+            try:
+                with STAGE_SECONDS.time(endpoint=endpoint, stage="predict"):
+                    original_sales_pred = micro_batcher.predict(input_row)
+            except (queue.Full, RuntimeError, TimeoutError) as e:
+                # Full queue, stopped worker or a batch that did not finish in time: fail fast, never hang
+                ERRORS.inc(endpoint=endpoint, reason="batcher_unavailable")
+                raise HTTPException(status_code=503, detail=f"Micro-batcher unavailable: {e or type(e).__name__}")
+        else:
+            with STAGE_SECONDS.time(endpoint=endpoint, stage="frame"):
+                model_input = model.row_input(input_row)
+
+            with STAGE_SECONDS.time(endpoint=endpoint, stage="predict"):
+                log_sales_pred = model.predict_input(model_input)
+
+                original_sales_pred = float(np.expm1(log_sales_pred)[0])
+            model_manager.mirror(input_row, [original_sales_pred], endpoint)
+        ROWS_SCORED.inc(endpoint=endpoint)
+        if prediction_cache is not None:
+            prediction_cache.set(cache_key, original_sales_pred, model_token=token)
+    return original_sales_pred
+
 
 @app.post("/predict")
-def predict_sales(data: PredictionInput):
-    if forecasting_model is None:
+def predict_sales(data: PredictionInput, request: Request):
+    endpoint = "/predict"
+    # Body read + JSON parsing + pydantic validation, up to the start of the handler
+    STAGE_SECONDS.observe(time.perf_counter() - request.state.received_at, endpoint=endpoint, stage="validation")
+
+    if model_manager.engine is None:
+        ERRORS.inc(endpoint=endpoint, reason="model_not_loaded")
         return {"predicted_sales": None, "status": "error", "message": "Model is not loaded."}
     
-    input_df = pd.DataFrame([data.model_dump()])
+    input_row = data.model_dump()
+    original_sales_pred = score_row(input_row, endpoint)
+    record_predictions(request.state.request_id, endpoint, feature_keys(input_row), [original_sales_pred])
+
+    with STAGE_SECONDS.time(endpoint=endpoint, stage="drift"):
+        check_drift(request.state.request_id, input_row)
+
+    with STAGE_SECONDS.time(endpoint=endpoint, stage="serialize"):
+        response = JSONResponse({
+            "predicted_sales": float(original_sales_pred),
+            "status": "success"
+        })
+    return response
+
+
+@app.post("/predict/batch")
+def predict_sales_batch(request: Request, payload: Union[List[PredictionInput], Dict[str, List[float]]] = Body(...)):
+    """Score many rows at once, sent as a JSON array of rows or as columnar JSON."""
+    endpoint = "/predict/batch"
+    STAGE_SECONDS.observe(time.perf_counter() - request.state.received_at, endpoint=endpoint, stage="validation")
+
+    if model_manager.engine is None:
+        ERRORS.inc(endpoint=endpoint, reason="model_not_loaded")
+        return {"predicted_sales": None, "status": "error", "message": "Model is not loaded."}
+
+    n_rows = len(payload) if isinstance(payload, list) else max((len(v) for v in payload.values()), default=0)
+    if n_rows > MAX_BATCH_ROWS:
+        ERRORS.inc(endpoint=endpoint, reason="batch_too_large")
+        raise HTTPException(status_code=413, detail=f"Batch too large: {n_rows} rows (max {MAX_BATCH_ROWS}).")
+
+    with STAGE_SECONDS.time(endpoint=endpoint, stage="frame"):
+        if isinstance(payload, dict):
+            input_df = columns_to_frame(payload)
+        else:
+            input_df = rows_to_frame(payload)
+
+    if input_df.empty:
+        return {"predicted_sales": [], "count": 0, "status": "success"}
+
+    with STAGE_SECONDS.time(endpoint=endpoint, stage="predict"):
+        predictions = predict_frame(input_df, endpoint)
+    ROWS_SCORED.inc(len(predictions), endpoint=endpoint)
+    record_predictions(request.state.request_id, endpoint, feature_keys(input_df), predictions)
+
+    with STAGE_SECONDS.time(endpoint=endpoint, stage="drift"):
+        check_drift(request.state.request_id, input_df)
+
+    with STAGE_SECONDS.time(endpoint=endpoint, stage="serialize"):
+        response = JSONResponse({
+            "predicted_sales": predictions.tolist(),
+            "count": len(predictions),
+            "status": "success"
+        })
+    return response
+
+
+@app.post("/predict/raw")
+def predict_sales_raw(request: Request, payload: Union[RawPredictionInput, List[RawPredictionInput]] = Body(...)):
+    """Score raw rows (dates, category names, unscaled ids) sent as one object or a JSON array.
+
+    Rows are encoded and scaled with the feature transformer packaged with the model.
+    """
+    endpoint = "/predict/raw"
+    STAGE_SECONDS.observe(time.perf_counter() - request.state.received_at, endpoint=endpoint, stage="validation")
+
+    if model_manager.engine is None or feature_transformer is None:
+        ERRORS.inc(endpoint=endpoint, reason="model_not_loaded")
+        missing = "Model" if model_manager.engine is None else "Feature transformer"
+        return {"predicted_sales": None, "status": "error", "message": f"{missing} is not loaded."}
+
+    if isinstance(payload, list) and not payload:
+        return {"predicted_sales": [], "count": 0, "status": "success"}
+    if isinstance(payload, list) and len(payload) > MAX_BATCH_ROWS:
+        ERRORS.inc(endpoint=endpoint, reason="batch_too_large")
+        raise HTTPException(status_code=413, detail=f"Batch too large: {len(payload)} rows (max {MAX_BATCH_ROWS}).")
+
+    try:
+        with STAGE_SECONDS.time(endpoint=endpoint, stage="transform"):
+            if isinstance(payload, list):
+                raw_df = pd.DataFrame([row.model_dump() for row in payload])
+                features = feature_transformer.transform_frame(raw_df).rename(columns=TRAINING_ALIASES)
+                input_df = features[FEATURE_COLUMNS]
+            else:
+                features = feature_transformer.transform_row(payload.model_dump())
+                features = {TRAINING_ALIASES.get(name, name): value for name, value in features.items()}
+                input_row = {name: features[name] for name in FEATURE_COLUMNS}
+    except ValueError as e:
+        ERRORS.inc(endpoint=endpoint, reason="unknown_category")
+        raise HTTPException(status_code=422, detail=str(e))
+
+    if not isinstance(payload, list):
+        original_sales_pred = score_row(input_row, endpoint)
+        record_predictions(request.state.request_id, endpoint,
+                           {"date": [payload.date], "store_nbr": [payload.store_nbr], "item_nbr": [payload.item_nbr],
+                            "family": [input_row["family_encoded"]]}, [original_sales_pred])
+        with STAGE_SECONDS.time(endpoint=endpoint, stage="drift"):
+            check_drift(request.state.request_id, input_row)
+        with STAGE_SECONDS.time(endpoint=endpoint, stage="serialize"):
+            response = JSONResponse({"predicted_sales": float(original_sales_pred), "status": "success"})
+        return response
+
+    with STAGE_SECONDS.time(endpoint=endpoint, stage="predict"):
+        predictions = predict_frame(input_df, endpoint)
+    ROWS_SCORED.inc(len(predictions), endpoint=endpoint)
+    record_predictions(request.state.request_id, endpoint,
+                       {"date": raw_df["date"].to_numpy(), "store_nbr": raw_df["store_nbr"].to_numpy(),
+                        "item_nbr": raw_df["item_nbr"].to_numpy(), "family": input_df["family_encoded"].to_numpy()},
+                       predictions)
+
+    with STAGE_SECONDS.time(endpoint=endpoint, stage="drift"):
+        check_drift(request.state.request_id, input_df)
+
+    with STAGE_SECONDS.time(endpoint=endpoint, stage="serialize"):
+        response = JSONResponse({
+            "predicted_sales": predictions.tolist(),
+            "count": len(predictions),
+            "status": "success"
+        })
+    return response
+
+
+def upload_to_frame(body, content_type):
+    """Model input frame from a /predict/stream body: Arrow IPC, Parquet, or JSON rows / columns."""
+    try:
+        upload = read_upload(body, content_type)
+    except (pa.ArrowInvalid, OSError) as e:
+        raise HTTPException(status_code=422, detail=f"Unreadable upload: {e}")
+    if upload is None:
+        try:
+            payload = json.loads(body)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid JSON: {e}")
+        if isinstance(payload, list):
+            upload = pd.DataFrame(payload)
+        elif isinstance(payload, dict):
+            upload = payload
+        else:
+            raise HTTPException(status_code=422, detail="Expected a JSON array of rows or columnar JSON.")
+    if isinstance(upload, pd.DataFrame):
+        # Uploads may use the training column names
+        upload = upload.rename(columns=TRAINING_ALIASES)
+    return columns_to_frame(upload)
+
+
+@app.post("/predict/stream")
+async def predict_sales_stream(request: Request):
+    """Score many rows and stream the predictions back chunk by chunk as they are scored.
+
+    The body has the PredictionInput columns as JSON (like /predict/batch), Arrow IPC
+    or Parquet, by Content-Type. The response is NDJSON, or an Arrow IPC stream with
+    `Accept: application/vnd.apache.arrow.stream`; each row carries its input position `row`.
+    """
+    endpoint = "/predict/stream"
+    STAGE_SECONDS.observe(time.perf_counter() - request.state.received_at, endpoint=endpoint, stage="validation")
+
+    if model_manager.engine is None:
+        ERRORS.inc(endpoint=endpoint, reason="model_not_loaded")
+        return {"predicted_sales": None, "status": "error", "message": "Model is not loaded."}
+
+    body = await request.body()
+    try:
+        with STAGE_SECONDS.time(endpoint=endpoint, stage="frame"):
+            input_df = await run_in_threadpool(upload_to_frame, body, request.headers.get("content-type"))
+    except HTTPException:
+        ERRORS.inc(endpoint=endpoint, reason="invalid_upload")
+        raise
+    del body
+    if len(input_df) > MAX_STREAM_ROWS:
+        ERRORS.inc(endpoint=endpoint, reason="batch_too_large")
+        raise HTTPException(status_code=413, detail=f"Too many rows: {len(input_df)} (max {MAX_STREAM_ROWS}).")
+
+    fmt = negotiate(request.headers.get("accept"), default="ndjson")
+    keys = pd.DataFrame({"row": np.arange(len(input_df), dtype=np.int64)})
+    chunks = scored_chunks(input_df, keys, endpoint, request.state.request_id, feature_keys(input_df))
+
+    def stream():
+        yield from stream_body(chunks, fmt, STREAM_SCHEMA)
+        with STAGE_SECONDS.time(endpoint=endpoint, stage="drift"):
+            check_drift(request.state.request_id, input_df)
+
+    return StreamingResponse(stream(), media_type=MEDIA_TYPES[fmt])
+
+
+@app.post("/forecast")
+def forecast_sales(query: ForecastRequest, request: Request):
+    """Forecast every selected (store, item) series for `horizon` days from `start_date`.
+
+    The feature grid is generated and scored server-side in one batch; the response has
+    per-row forecasts and totals per date, store, family and state.
+    """
+    endpoint = "/forecast"
+    STAGE_SECONDS.observe(time.perf_counter() - request.state.received_at, endpoint=endpoint, stage="validation")
+
+    if model_manager.engine is None or feature_transformer is None or series_catalog is None:
+        ERRORS.inc(endpoint=endpoint, reason="model_not_loaded")
+        missing = ("Model" if model_manager.engine is None
+                   else "Feature transformer" if feature_transformer is None else "Series catalog")
+        return {"forecasts": None, "status": "error", "message": f"{missing} is not loaded."}
+
+    # Rows are streamed as NDJSON / Arrow IPC when the Accept header asks for it
+    fmt = negotiate(request.headers.get("accept"))
+    max_rows = MAX_BATCH_ROWS if fmt == "json" else MAX_STREAM_ROWS
+
+    series = series_catalog.select(query.store_nbr, query.item_nbr, query.family)
+    n_rows = len(series) * query.horizon
+    if n_rows > max_rows:
+        ERRORS.inc(endpoint=endpoint, reason="batch_too_large")
+        raise HTTPException(status_code=413, detail=f"Forecast too large: {len(series)} series x {query.horizon} days "
+                                                    f"= {n_rows} rows (max {max_rows}).")
+    if series.empty and fmt != "json":
+        return StreamingResponse(stream_body(iter(()), fmt, FORECAST_SCHEMA), media_type=MEDIA_TYPES[fmt])
+    if series.empty:
+        return {"start_date": query.start_date.isoformat(), "horizon": query.horizon, "series": 0, "count": 0,
+                "totals": {"total": 0.0, **{level: [] for level in TOTAL_LEVELS}}, "forecasts": [], "status": "success"}
+
+    with STAGE_SECONDS.time(endpoint=endpoint, stage="frame"):
+        grid = forecast_grid(series, query.start_date, query.horizon, query.onpromotion)
+    try:
+        with STAGE_SECONDS.time(endpoint=endpoint, stage="transform"):
+            features = grid_features(feature_transformer, series, query.start_date, query.horizon,
+                                     query.onpromotion).rename(columns=TRAINING_ALIASES)
+            input_df = features[FEATURE_COLUMNS]
+    except ValueError as e:
+        ERRORS.inc(endpoint=endpoint, reason="unknown_category")
+        raise HTTPException(status_code=422, detail=str(e))
+
+    store_keys = {"date": grid["date"].to_numpy(), "store_nbr": grid["store_nbr"].to_numpy(),
+                  "item_nbr": grid["item_nbr"].to_numpy(), "family": input_df["family_encoded"].to_numpy()}
+    if fmt != "json":
+        chunks = scored_chunks(input_df, forecast_keys(grid), endpoint, request.state.request_id, store_keys)
+        return StreamingResponse(stream_body(chunks, fmt, FORECAST_SCHEMA), media_type=MEDIA_TYPES[fmt])
+
+    with STAGE_SECONDS.time(endpoint=endpoint, stage="predict"):
+        predictions = predict_frame(input_df, endpoint)
+    ROWS_SCORED.inc(len(predictions), endpoint=endpoint)
+    record_predictions(request.state.request_id, endpoint, store_keys, predictions)
+
+    with STAGE_SECONDS.time(endpoint=endpoint, stage="serialize"):
+        body = {
+            "start_date": query.start_date.isoformat(),
+            "horizon": query.horizon,
+            "series": len(series),
+            "count": len(predictions),
+            "totals": forecast_totals(grid, predictions),
+            "status": "success",
+        }
+        if query.include_rows:
+            body["forecasts"] = forecast_rows(grid, predictions)
+        response = JSONResponse(body)
+    return response
+
+
+@app.get("/batcher/stats")
+def batcher_stats():
+    """Queue depth and batch-size / queue-wait histograms of the micro-batcher."""
+    if micro_batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **micro_batcher.stats()}
+
+
+@app.get("/model/stats")
+def model_stats():
+    """Serving model, hot reload counters and shadow traffic statistics."""
+    return model_manager.stats()
+
+
+@app.post("/model/reload")
+def reload_model():
+    """Check the model source now instead of waiting for the next poll."""
+    swapped = model_manager.check()
+    return {"reloaded": swapped, **model_manager.stats()}
 
-    log_sales_pred = forecasting_model.predict(input_df)
 
-    original_sales_pred = np.expm1(log_sales_pred)[0]
+@app.get("/cache/stats")
+def cache_stats():
+    """Size and hit / miss / eviction counters of the prediction cache."""
+    if prediction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_cache.stats()}
 
-   
-    drift_alerts = detect_data_drift(input_df.iloc[0].to_dict())
 
-    actual_value = None   # replace when true data available
-    if actual_value is not None:
-        monitor_prediction_error(actual_value, original_sales_pred)
+@app.get("/features/lags")
+def lag_features(store_nbr: int, item_nbr: int, date: str):
+    """Lag and rolling-mean sales of one (store, item) series before a date; -1 / -1 is the chain total."""
+    if feature_store is None:
+        return {"features": None, "status": "error", "message": "Feature store is not loaded."}
+    try:
+        features = feature_store.features(store_nbr, item_nbr, date)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"store_nbr": store_nbr, "item_nbr": item_nbr, "date": date, "features": features, "status": "success"}
 
-    return {
-        "predicted_sales": float(original_sales_pred),
-        "status": "success"
-    }
 
-    
\ No newline at end of file
+@app.get("/metrics")
+def metrics():
+    """Request counters and per-stage latency histograms in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,160 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from Server.metrics import Histogram
+
+_STOP = object()
+
+# Upper bounds (seconds) of the queue-wait histogram buckets
+WAIT_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+
+class MicroBatcher:
+    """Gather concurrent single-row requests and score them with one predict call.
+
+    Requests are queued and a worker thread collects them until `max_batch_rows`
+    rows are waiting or `max_wait_ms` has passed since the first one arrived.
+    Under light load (recent batches of ~1 row) the worker stops waiting as soon
+    as the queue is empty, so a lone request does not pay the full wait.
+
+    Requests never hang: submitting raises queue.Full when the queue is full and
+    RuntimeError when the worker is not running, and predict() gives up after
+    `timeout` seconds (TimeoutError).
+    """
+
+    def __init__(self, predict_fn, max_batch_rows=64, max_wait_ms=5.0, max_queue=10000, timeout=30.0):
+        self.predict_fn = predict_fn
+        self.max_batch_rows = max_batch_rows
+        self.max_wait_s = max_wait_ms / 1000
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._avg_batch_rows = 1.0
+
+        size_buckets = [2 ** i for i in range(max_batch_rows.bit_length()) if 2 ** i < max_batch_rows] + [max_batch_rows]
+        self.batch_rows = Histogram(
+            "sales_api_batcher_batch_rows", "Rows per micro-batch sent to the model.", buckets=size_buckets)
+        self.queue_wait = Histogram(
+            "sales_api_batcher_queue_wait_seconds", "Time a row waited in the micro-batch queue.", buckets=WAIT_BUCKETS)
+        self._errors = 0
+        self._max_queue_depth = 0
+
+    def start(self):
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Score whatever is still queued, then stop the worker; waits at most `timeout` seconds."""
+        if self._thread is not None:
+            self._stopping.set()
+            try:
+                # Wakes a worker blocked on an empty queue; a full queue never blocks it
+                self._queue.put_nowait(_STOP)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, row):
+        """Queue one feature row, returning a Future for its prediction."""
+        if self._thread is None or not self._thread.is_alive():
+            raise RuntimeError("micro-batcher worker is not running")
+        future = Future()
+        self._queue.put_nowait((row, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            self._max_queue_depth = depth
+        return future
+
+    def predict(self, row, timeout=None):
+        return self.submit(row).result(self.timeout if timeout is None else timeout)
+
+    def _run(self):
+        stopping = False
+        while not (stopping or self._stopping.is_set()):
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait_s
+            while len(batch) < self.max_batch_rows:
+                if self._queue.empty() and self._avg_batch_rows < 1.5:
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._run_batch(batch)
+
+        # Drain requests that raced with stop() so no caller waits forever
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        for start in range(0, len(leftovers), self.max_batch_rows):
+            self._run_batch(leftovers[start:start + self.max_batch_rows])
+
+    def _run_batch(self, batch):
+        started = time.perf_counter()
+        rows = [row for row, _, _ in batch]
+        try:
+            predictions = self.predict_fn(rows)
+            # A short result would leave the unmatched callers waiting for their timeout
+            if len(predictions) != len(rows):
+                raise ValueError(f"predict_fn returned {len(predictions)} predictions for {len(rows)} rows")
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            failed = True
+        else:
+            for (_, future, _), prediction in zip(batch, predictions):
+                future.set_result(float(prediction))
+            failed = False
+        self._record(batch, started, failed)
+
+    def _record(self, batch, started, failed):
+        size = len(batch)
+        with self._lock:
+            self._avg_batch_rows = 0.8 * self._avg_batch_rows + 0.2 * size
+            self._errors += failed
+        self.batch_rows.observe(size)
+        for _, _, enqueued in batch:
+            self.queue_wait.observe(started - enqueued)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        size_counts, rows, batches = self.batch_rows.snapshot()
+        wait_counts, _, _ = self.queue_wait.snapshot()
+        return {
+            "max_batch_rows": self.max_batch_rows,
+            "max_wait_ms": self.max_wait_s * 1000,
+            "queue_depth": self.queue_depth(),
+            "max_queue_depth": self._max_queue_depth,
+            "batches": batches,
+            "rows": int(rows),
+            "failed_batches": self._errors,
+            "avg_batch_rows": rows / batches if batches else 0.0,
+            "batch_size_histogram": {f"<={bound:g}": count for bound, count in zip(self.batch_rows.buckets[:-1], size_counts)},
+            "queue_wait_ms_histogram": {
+                **{f"<={bound * 1000:g}": count for bound, count in zip(WAIT_BUCKETS, wait_counts)},
+                f">{WAIT_BUCKETS[-1] * 1000:g}": wait_counts[-1],
+            },
+        }
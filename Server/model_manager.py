@@ -0,0 +1,265 @@
+"""Hot model reload and shadow traffic for the API, without restarting uvicorn.
+
+The model source is a model directory (MODEL_PATH) or an MLflow registry alias
+(`models:/SalesForecastingModel@champion`). A watcher thread polls the source;
+when its identity changes (a new MLmodel in the directory, or the alias moved to
+another version) the new model is loaded in the background, warmed up on recent
+request rows, checked for finite predictions and only then swapped in with a
+single reference assignment. Requests take `manager.engine` once, so every
+request is scored by exactly one model. A model that fails to load or warm up is
+not swapped in; the old one keeps serving and the next poll retries.
+
+A shadow model can be scored on a fraction of the traffic. Sampled inputs are
+queued with the primary predictions and a background thread scores them with
+the shadow and logs the differences through the monitoring log sink, so the
+response never waits on the shadow.
+"""
+import os
+import queue
+import random
+import shutil
+import threading
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+_STOP = object()
+
+
+def parse_registry_uri(source):
+    """(name, alias) of a `models:/<name>@<alias>` URI, else None."""
+    if not source.startswith("models:/") or "@" not in source:
+        return None
+    name, alias = source[len("models:/"):].split("@", 1)
+    return name, alias
+
+
+class ModelSource:
+    """Where the serving model comes from: a local model directory or a registry alias."""
+
+    def __init__(self, source, engine_name="", compiled_path=None, download_dir="model_cache"):
+        self.source = source
+        self.engine_name = engine_name
+        self.compiled_path = compiled_path
+        self.download_dir = download_dir
+        self.registry = parse_registry_uri(source)
+
+    def token(self):
+        """Identity of the model the source currently points to; changes when a new model is deployed."""
+        from Server.inference_engine import model_token
+
+        if self.registry is not None:
+            from mlflow import MlflowClient
+            name, alias = self.registry
+            version = MlflowClient().get_model_version_by_alias(name, alias).version
+            return f"models:/{name}/{version}"
+        token = model_token(self.source, self.engine_name)
+        if self.engine_name == "onnx" and self.compiled_path and os.path.exists(self.compiled_path):
+            token += f":onnx-{os.path.getmtime(self.compiled_path):.0f}"
+        return token
+
+    def local_path(self, token):
+        """Local directory of the model identified by token (registry versions are downloaded once)."""
+        if self.registry is None:
+            return self.source
+        import mlflow.artifacts
+        name, version = token[len("models:/"):].rsplit("/", 1)
+        target = os.path.join(self.download_dir, name, version)
+        if not os.path.exists(target):
+            # Downloaded next to the final name and renamed, so an interrupted download is never loaded
+            partial = f"{target}.{os.getpid()}.partial"
+            shutil.rmtree(partial, ignore_errors=True)
+            os.makedirs(partial)
+            mlflow.artifacts.download_artifacts(artifact_uri=f"models:/{name}/{version}", dst_path=partial)
+            os.replace(partial, target)
+        return target
+
+
+class ModelManager:
+    """Current inference engine, a watcher that hot-swaps it and an optional shadow model.
+
+    load_fn(path) returns an inference engine for a local model directory.
+    warmup_frame is the fallback warm-up input used until real requests have been seen;
+    on_swap(token, engine) runs after every swap (e.g. to rebind the prediction cache).
+    """
+
+    def __init__(self, source, load_fn, warmup_frame, poll_seconds=30.0, on_swap=None,
+                 shadow_source=None, shadow_fraction=0.0, log_sink=None, shadow_log=None,
+                 max_shadow_queue=1000, warmup_rows=256, warmup_refresh_seconds=10.0):
+        self.source = source
+        self.load_fn = load_fn
+        self.poll_seconds = poll_seconds
+        self.on_swap = on_swap
+        self.engine = None
+        self.token = None
+        self.loaded_at = None
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_error = None
+        self._swap_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+        # Recent request rows used to warm up the next model
+        self._warmup = warmup_frame
+        self._warmup_rows = warmup_rows
+        self._warmup_refresh = warmup_refresh_seconds
+        self._warmup_at = float("-inf")
+
+        self.shadow_source = shadow_source
+        self.shadow_fraction = shadow_fraction
+        self.shadow = None
+        self.shadow_token = None
+        self.log_sink = log_sink
+        self.shadow_log = shadow_log
+        self._shadow_queue = queue.Queue(maxsize=max_shadow_queue)
+        self._shadow_thread = None
+        self.shadow_rows = 0
+        self.shadow_dropped = 0
+        self.shadow_errors = 0
+
+    # Loading and swapping
+
+    def load(self):
+        """Load the source's current model synchronously (at start-up); raises if it fails."""
+        token = self.source.token()
+        self._swap(token, self._load_warm(self.source, token))
+
+    def load_shadow(self):
+        """Load the shadow model, if one is configured with a non-zero fraction."""
+        if self.shadow_source is not None and self.shadow_fraction > 0:
+            token = self.shadow_source.token()
+            self.shadow = self._load_warm(self.shadow_source, token)
+            self.shadow_token = token
+
+    def check(self):
+        """Reload if the source points to another model; returns True when a new model was swapped in."""
+        try:
+            token = self.source.token()
+            if token == self.token:
+                return False
+            engine = self._load_warm(self.source, token)
+        except Exception as e:
+            self.failed_reloads += 1
+            error = f"{type(e).__name__}: {e}"
+            # Retried on every poll (the model may still be being copied), reported once per distinct error
+            if error != self.last_error:
+                print(f"⚠️ Model reload failed, still serving {self.token}: {e}")
+            self.last_error = error
+            return False
+        self._swap(token, engine)
+        self.reloads += 1
+        print(f"✅ Model reloaded: {token} ({engine.name} engine)")
+        return True
+
+    def _load_warm(self, source, token):
+        """Load a model and score the warm-up rows (batch and single-row paths); rejects non-finite output."""
+        engine = self.load_fn(source.local_path(token))
+        frame = self._warmup
+        batch = np.asarray(engine.predict(frame), dtype=np.float64)
+        # Column by column, so integer features keep their dtype
+        first_row = {name: frame[name].iloc[0] for name in frame.columns}
+        row = np.asarray(engine.predict_input(engine.row_input(first_row)), dtype=np.float64)
+        if not (np.all(np.isfinite(batch)) and np.all(np.isfinite(row))):
+            raise ValueError(f"model {token} produced non-finite predictions on the warm-up rows")
+        return engine
+
+    def _swap(self, token, engine):
+        with self._swap_lock:
+            self.engine = engine
+            self.token = token
+            self.loaded_at = datetime.now().isoformat(timespec="seconds")
+        if self.on_swap is not None:
+            self.on_swap(token, engine)
+
+    def current(self):
+        """(engine, token) of the serving model, read together so they always belong to the same model."""
+        with self._swap_lock:
+            return self.engine, self.token
+
+    def remember(self, input_df):
+        """Keep recent request rows as warm-up input for the next model, refreshed at most every few seconds."""
+        now = time.monotonic()
+        if len(input_df) and now - self._warmup_at >= self._warmup_refresh:
+            self._warmup_at = now
+            # A copy, so the warm-up rows do not keep the whole request frame alive
+            self._warmup = input_df.iloc[-self._warmup_rows:].copy()
+
+    # Watcher and shadow threads
+
+    def start(self):
+        if self.poll_seconds > 0 and self._watcher is None:
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+            self._watcher.start()
+        if self.shadow is not None and self._shadow_thread is None:
+            self._shadow_thread = threading.Thread(target=self._run_shadow, name="shadow-scorer", daemon=True)
+            self._shadow_thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout)
+            self._watcher = None
+        if self._shadow_thread is not None:
+            self._shadow_queue.put(_STOP)
+            self._shadow_thread.join(timeout)
+            self._shadow_thread = None
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.check()
+
+    def mirror(self, input_df, predictions, endpoint):
+        """Queue a sampled share of scored inputs for the shadow model; never blocks the request."""
+        if self.shadow is None or self._shadow_thread is None or random.random() >= self.shadow_fraction:
+            return
+        try:
+            self._shadow_queue.put_nowait((input_df, np.asarray(predictions, dtype=np.float64), endpoint,
+                                           self.token))
+        except queue.Full:
+            self.shadow_dropped += 1
+
+    def _run_shadow(self):
+        while True:
+            item = self._shadow_queue.get()
+            if item is _STOP:
+                return
+            input_df, primary, endpoint, primary_token = item
+            if isinstance(input_df, dict):
+                input_df = pd.DataFrame([input_df])
+            try:
+                shadow = np.expm1(np.asarray(self.shadow.predict(input_df), dtype=np.float64))
+            except Exception as e:
+                self.shadow_errors += 1
+                print(f"⚠️ Shadow model failed: {e}")
+                continue
+            diff = np.abs(shadow - primary)
+            relative = diff / np.maximum(np.abs(primary), 1e-9)
+            self.shadow_rows += len(primary)
+            if self.log_sink is not None:
+                self.log_sink.write(self.shadow_log, [
+                    datetime.now(), endpoint, len(primary), primary_token, self.shadow_token,
+                    float(diff.mean()), float(diff.max()), float(relative.mean()),
+                    float(primary.mean()), float(shadow.mean()),
+                ])
+
+    def stats(self):
+        return {
+            "model": self.token,
+            "engine": self.engine.name if self.engine is not None else None,
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads,
+            "last_error": self.last_error,
+            "poll_seconds": self.poll_seconds,
+            "shadow": {
+                "model": self.shadow_token,
+                "fraction": self.shadow_fraction if self.shadow is not None else 0.0,
+                "rows": self.shadow_rows,
+                "queued": self._shadow_queue.qsize(),
+                "dropped": self.shadow_dropped,
+                "errors": self.shadow_errors,
+            },
+        }
@@ -0,0 +1,161 @@
+"""Bounded cache of predictions keyed on the canonicalized PredictionInput fields.
+
+Two tiers: an in-process LRU (optional TTL) in front of an optional shared
+backend, so several uvicorn workers can reuse each other's predictions. Keys
+include a token of the loaded model, and `bind_model()` clears the local tier
+when the model changes, so a new model never serves stale predictions.
+"""
+import hashlib
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalBackend:
+    """In-process implementation of the shared-backend interface (get / set with TTL), for single-worker runs."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl_seconds=None):
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+
+
+class RedisBackend:
+    """Shared cache in Redis for multi-worker deployments (needs the `redis` package)."""
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self.client.get(key)
+        return float(value) if value is not None else None
+
+    def set(self, key, value, ttl_seconds=None):
+        # Milliseconds, so sub-second TTLs do not become ex=0, which Redis rejects
+        self.client.set(key, repr(float(value)), px=max(int(ttl_seconds * 1000), 1) if ttl_seconds else None)
+
+
+class PredictionCache:
+    def __init__(self, feature_columns, max_entries=100_000, ttl_seconds=None, shared=None, namespace="sales-forecast"):
+        self.feature_columns = list(feature_columns)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self.namespace = namespace
+        self.model_token = None
+        self._pack = struct.Struct(f"<{len(self.feature_columns)}d").pack
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def key(self, row):
+        """Canonical hash of a feature row: every field as float64, in PredictionInput order."""
+        values = [float(row[name]) + 0.0 for name in self.feature_columns]   # + 0.0 folds -0.0 into 0.0
+        return hashlib.blake2b(self._pack(*values), digest_size=16).hexdigest()
+
+    def bind_model(self, token):
+        """Tie cached predictions to a model; clears the local tier when the model changed."""
+        with self._lock:
+            if token != self.model_token:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.model_token = token
+
+    def _shared_key(self, key):
+        return f"{self.namespace}:{self.model_token}:{key}"
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+
+        if self.shared is not None:
+            try:
+                value = self.shared.get(self._shared_key(key))
+            except Exception as e:
+                print(f"Shared prediction cache unavailable: {e}")
+                value = None
+            if value is not None:
+                self._store(key, value)
+                with self._lock:
+                    self.shared_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value, model_token=None):
+        """Cache a prediction; with model_token, only if that model is still the bound one.
+
+        A request that was scored by the old model can finish after bind_model() switched
+        to the new one; its prediction is then dropped instead of outliving the swap.
+        """
+        if not self._store(key, value, model_token):
+            return
+        if self.shared is not None:
+            try:
+                self.shared.set(f"{self.namespace}:{model_token or self.model_token}:{key}", value, self.ttl_seconds)
+            except Exception as e:
+                print(f"Shared prediction cache unavailable: {e}")
+
+    def _store(self, key, value, model_token=None):
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            if model_token is not None and model_token != self.model_token:
+                return False
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "shared_backend": type(self.shared).__name__ if self.shared is not None else None,
+                "model_token": self.model_token,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
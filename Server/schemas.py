@@ -0,0 +1,56 @@
+from datetime import date
+from typing import List, Optional
+from pydantic import BaseModel, Field
+import numpy as np
+
+
+class PredictionInput(BaseModel):
+    store_nbr: float
+    item_nbr: float
+    unit_sales: float
+    onpromotion: float
+    day: int
+    month: int
+    dayofweek: int
+    week: int
+    family_encoded: int
+    city_encoded: int
+    state_encoded: int
+    type_encoded: int
+    is_outlier: int
+    is_return: int
+    holiday: int
+    year: int
+    is_weekend: int
+
+
+class RawPredictionInput(BaseModel):
+    """One row before preprocessing; /predict/raw encodes and scales it with the model's feature transformer."""
+    date: date
+    store_nbr: int
+    item_nbr: int
+    unit_sales: float
+    onpromotion: bool
+    family: str
+    city: str
+    state: str
+    type: str
+
+
+class ForecastRequest(BaseModel):
+    """Series to forecast (every selector is a list; omitted = any) and the days to forecast."""
+    store_nbr: Optional[List[int]] = None
+    item_nbr: Optional[List[int]] = None
+    family: Optional[List[str]] = None
+    start_date: date
+    horizon: int = Field(28, ge=1, le=366)
+    onpromotion: bool = False
+    include_rows: bool = True
+
+
+# Column order and dtypes the model is fed with, derived from PredictionInput
+FEATURE_COLUMNS = list(PredictionInput.model_fields)
+FEATURE_DTYPES = {
+    name: (np.float64 if field.annotation is float else np.int64)
+    for name, field in PredictionInput.model_fields.items()
+}
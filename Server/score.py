@@ -0,0 +1,205 @@
+"""Offline bulk scoring of a Parquet / CSV file with the API's model, on every core.
+
+    python -m Server.score --input processed_data_parquet --out predictions --keep date store_nbr item_nbr
+
+The input is read `--chunk-rows` rows at a time and each chunk is scored in a
+process pool; every worker loads the model (MODEL_PATH / INFERENCE_ENGINE, as
+Server/main_api.py) once. Predictions are written with np.expm1 applied as one
+part file per chunk, `<out>/part-000042.parquet` (or .csv), together with the
+global `row` number and the `--keep` columns. Read them back with
+`pd.read_parquet(out)`.
+
+A finished part file is the chunk's checkpoint: parts are written under a
+temporary name and renamed, so after a crash rerunning the same command skips
+every chunk already on disk. `<out>/_manifest.json` records the input and the
+chunk size, and a resume with different settings is refused.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+import pandas as pd
+from Server.schemas import FEATURE_COLUMNS, FEATURE_DTYPES
+
+MODEL_PATH = os.getenv("MODEL_PATH", "exported_model/model")
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "pyfunc")
+COMPILED_MODEL_PATH = os.getenv("COMPILED_MODEL_PATH", "exported_model/model.onnx")
+DEFAULT_CHUNK_ROWS = 500_000
+MANIFEST_NAME = "_manifest.json"
+
+# Per-worker model, loaded once by init_worker
+_engine = None
+
+
+def input_format(path):
+    """"parquet" for .parquet files and Parquet dataset directories, else "csv"."""
+    return "parquet" if os.path.isdir(path) or path.endswith(".parquet") else "csv"
+
+
+def read_chunks(path, columns, chunk_rows):
+    """DataFrames of at most chunk_rows rows with the given input columns, in file order."""
+    if input_format(path) == "parquet":
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        dataset = ds.dataset(path, format="parquet", partitioning="hive")
+        # Record batches stop at row group / file boundaries: regroup them into chunk_rows rows,
+        # so the chunks (and checkpoints) are the same on every run
+        batches, buffered = [], 0
+        for batch in dataset.to_batches(columns=columns, batch_size=chunk_rows):
+            batches.append(batch)
+            buffered += batch.num_rows
+            while buffered >= chunk_rows:
+                table = pa.Table.from_batches(batches)
+                yield table.slice(0, chunk_rows).to_pandas()
+                rest = table.slice(chunk_rows)
+                batches, buffered = rest.to_batches(), rest.num_rows
+        if buffered:
+            yield pa.Table.from_batches(batches).to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+
+
+def input_columns(path):
+    """Column names of the input file."""
+    if input_format(path) == "parquet":
+        import pyarrow.dataset as ds
+        return ds.dataset(path, format="parquet", partitioning="hive").schema.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def resolve_columns(available, keep):
+    """Input column of every feature (API name or its training name) plus the kept columns."""
+    from Server.inference_engine import TRAINING_ALIASES
+
+    training_names = {api: training for training, api in TRAINING_ALIASES.items()}
+    sources = {}
+    for name in FEATURE_COLUMNS:
+        if name in available:
+            sources[name] = name
+        elif training_names.get(name) in available:
+            sources[name] = training_names[name]
+        else:
+            raise ValueError(f"Input has no column for feature '{name}'")
+    missing = [name for name in keep if name not in available]
+    if missing:
+        raise ValueError(f"Input has no --keep columns {missing}")
+    return sources
+
+
+def feature_frame(chunk, sources):
+    """Model input frame (API feature names and dtypes) of one input chunk."""
+    data = {}
+    for name in FEATURE_COLUMNS:
+        values = chunk[sources[name]].to_numpy(dtype=np.float64)
+        if FEATURE_DTYPES[name] is np.int64:
+            if not np.all(np.isfinite(values)):
+                raise ValueError(f"Column '{sources[name]}' has missing values")
+            values = values.astype(np.int64)
+        data[name] = values
+    return pd.DataFrame(data, columns=FEATURE_COLUMNS)
+
+
+def init_worker(model_path, engine, compiled_path, threads):
+    """Pool initializer: cap the native thread pools and load the model once for this process."""
+    global _engine
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    from Server.inference_engine import load_inference_engine
+    _engine = load_inference_engine(model_path, FEATURE_COLUMNS, engine=engine, compiled_path=compiled_path,
+                                    threads=threads)
+
+
+def part_path(out_dir, index, fmt):
+    return os.path.join(out_dir, f"part-{index:06d}.{fmt}")
+
+
+def score_chunk(index, first_row, chunk, sources, keep, out_dir, fmt):
+    """Score one chunk in a worker and write its part file; returns (index, rows)."""
+    predictions = np.expm1(np.asarray(_engine.predict(feature_frame(chunk, sources)), dtype=np.float64))
+    scored = pd.DataFrame({"row": np.arange(first_row, first_row + len(chunk), dtype=np.int64)})
+    for name in keep:
+        scored[name] = chunk[name].to_numpy()
+    scored["predicted_sales"] = predictions
+
+    path = part_path(out_dir, index, fmt)
+    # Written next to the final name and renamed, so a part on disk is always complete
+    partial = f"{path}.{os.getpid()}.partial"
+    if fmt == "parquet":
+        scored.to_parquet(partial, index=False)
+    else:
+        scored.to_csv(partial, index=False)
+    os.replace(partial, path)
+    return index, len(scored)
+
+
+def check_manifest(out_dir, settings):
+    """Write the run settings, or check that a resumed run uses the same ones."""
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path) as f:
+            previous = json.load(f)
+        if previous != settings:
+            raise ValueError(f"{out_dir} holds a run with different settings {previous}; use a new --out")
+    else:
+        with open(path, "w") as f:
+            json.dump(settings, f, indent=2)
+
+
+def run_scoring(input_path, out_dir, keep=(), fmt="parquet", chunk_rows=DEFAULT_CHUNK_ROWS, workers=None,
+                threads=1, model_path=MODEL_PATH, engine=INFERENCE_ENGINE, compiled_path=COMPILED_MODEL_PATH):
+    """Score input_path into part files under out_dir, skipping chunks already written; returns a summary."""
+    keep = list(keep)
+    workers = workers or os.cpu_count() or 1
+    sources = resolve_columns(input_columns(input_path), keep)
+    os.makedirs(out_dir, exist_ok=True)
+    check_manifest(out_dir, {"input": os.path.abspath(input_path), "chunk_rows": chunk_rows, "keep": keep,
+                             "format": fmt, "model_path": os.path.abspath(model_path)})
+    for name in os.listdir(out_dir):
+        if name.endswith(".partial"):
+            os.remove(os.path.join(out_dir, name))
+
+    columns = list(dict.fromkeys(list(sources.values()) + keep))
+    start = time.perf_counter()
+    scored_rows = skipped = 0
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker,
+                             initargs=(model_path, engine, compiled_path, threads)) as pool:
+        pending = set()
+        first_row = 0
+        for index, chunk in enumerate(read_chunks(input_path, columns, chunk_rows)):
+            if os.path.exists(part_path(out_dir, index, fmt)):
+                skipped += 1
+            else:
+                # At most two chunks per worker in flight keeps the reader's memory bounded
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    scored_rows += sum(future.result()[1] for future in done)
+                    elapsed = time.perf_counter() - start
+                    print(f"  {scored_rows:,} rows scored, {scored_rows / elapsed:,.0f} rows/s")
+                pending.add(pool.submit(score_chunk, index, first_row, chunk, sources, keep, out_dir, fmt))
+            first_row += len(chunk)
+        for future in pending:
+            scored_rows += future.result()[1]
+
+    elapsed = time.perf_counter() - start
+    return {"rows": first_row, "scored_rows": scored_rows, "skipped_chunks": skipped, "seconds": elapsed,
+            "rows_per_second": scored_rows / elapsed if elapsed > 0 else 0.0}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", required=True, help="Parquet file / dataset directory or CSV with the features")
+    parser.add_argument("--out", default="predictions", help="output directory of part files")
+    parser.add_argument("--keep", nargs="*", default=[], help="input columns copied next to the predictions")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet", help="part file format")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="rows per chunk / checkpoint")
+    parser.add_argument("--workers", type=int, default=None, help="scoring processes (default: all cores)")
+    parser.add_argument("--threads", type=int, default=1, help="native threads per worker")
+    args = parser.parse_args()
+
+    summary = run_scoring(args.input, args.out, args.keep, args.format, args.chunk_rows, args.workers, args.threads)
+    print(f"✅ {summary['scored_rows']:,} of {summary['rows']:,} rows scored in {summary['seconds']:.1f}s "
+          f"({summary['rows_per_second']:,.0f} rows/s), {summary['skipped_chunks']} chunks resumed from {args.out}")
@@ -0,0 +1,91 @@
+"""Streamed responses and columnar uploads for large scoring jobs.
+
+The response format is chosen by the request's Accept header:
+    application/x-ndjson                  one JSON object per line
+    application/vnd.apache.arrow.stream   Arrow IPC stream, one record batch per chunk
+anything else keeps the endpoint's plain JSON body. Chunks are written as soon as
+they are scored, so neither side holds one giant body in memory.
+
+Request bodies may be Arrow IPC (stream or file format) or Parquet, chosen by the
+Content-Type header, instead of JSON.
+"""
+import io
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+NDJSON_TYPE = "application/x-ndjson"
+ARROW_STREAM_TYPE = "application/vnd.apache.arrow.stream"
+ARROW_FILE_TYPE = "application/vnd.apache.arrow.file"
+PARQUET_TYPES = ("application/vnd.apache.parquet", "application/x-parquet")
+
+MEDIA_TYPES = {"ndjson": NDJSON_TYPE, "arrow": ARROW_STREAM_TYPE, "json": "application/json"}
+
+
+def negotiate(accept, default="json"):
+    """Response format for an Accept header: "arrow", "ndjson" or default."""
+    accept = (accept or "").lower()
+    if ARROW_STREAM_TYPE in accept:
+        return "arrow"
+    if NDJSON_TYPE in accept or "application/jsonl" in accept:
+        return "ndjson"
+    return default
+
+
+def upload_format(content_type):
+    """"arrow", "arrow_file", "parquet" or "json" for a request Content-Type."""
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type == ARROW_STREAM_TYPE:
+        return "arrow"
+    if content_type == ARROW_FILE_TYPE:
+        return "arrow_file"
+    if content_type in PARQUET_TYPES:
+        return "parquet"
+    return "json"
+
+
+def read_upload(body, content_type):
+    """DataFrame from an Arrow IPC or Parquet request body; None for JSON bodies."""
+    kind = upload_format(content_type)
+    if kind == "json":
+        return None
+    source = pa.BufferReader(body)
+    if kind == "arrow":
+        table = pa.ipc.open_stream(source).read_all()
+    elif kind == "arrow_file":
+        table = pa.ipc.open_file(source).read_all()
+    else:
+        table = pq.read_table(source)
+    return table.to_pandas()
+
+
+def ndjson_chunks(frames):
+    """Bytes of each frame as newline-delimited JSON records."""
+    for frame in frames:
+        if len(frame):
+            yield frame.to_json(orient="records", lines=True, double_precision=15).rstrip("\n").encode() + b"\n"
+
+
+def arrow_chunks(frames, schema):
+    """Arrow IPC stream: the schema, then one record batch per frame, then the end-of-stream marker."""
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def flush():
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    yield flush()
+    for frame in frames:
+        writer.write_batch(pa.RecordBatch.from_pandas(frame, schema=schema, preserve_index=False))
+        yield flush()
+    writer.close()
+    yield flush()
+
+
+def stream_body(frames, fmt, schema):
+    """Bytes iterator of frames in the negotiated format ("ndjson" or "arrow")."""
+    if fmt == "arrow":
+        return arrow_chunks(frames, schema)
+    return ndjson_chunks(frames)
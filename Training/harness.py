@@ -0,0 +1,289 @@
+"""Parallel training and hyperparameter search for the tree models, logged to MLflow.
+
+Every (model, hyperparameters) trial runs in its own worker process with a bounded
+number of threads, so `--workers x --threads` fills the machine and wall-clock time
+drops with the number of cores. The processed data is loaded once and shared with
+the workers as memory-mapped .npy files. Each trial is logged as a child run of
+one harness run in the local MLflow file store, and the best trial is registered
+in the model registry.
+
+Trials are scored with rolling-origin folds on `date` (Training/time_cv.py). They
+stop early on the last --stopping-days before each fold's origin, held out of
+training, and are scored on the validation days after it, which played no part in
+fitting. The lgb.Dataset / xgb.DMatrix of every fold is built once, cached on disk
+and loaded by every trial, and by later runs on the same data.
+
+    python -m Training.harness --data processed_data_parquet --models lightgbm xgboost --trials 8
+    python -m Training.harness --workers 4 --threads 2 --register-name SalesForecastingModel
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import pathlib
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from Preprocessing.columnar import DEFAULT_PATH, load_processed
+from Training.time_cv import DEFAULT_CACHE_DIR, DatasetCache, load_fold, rolling_origin_folds
+
+TRACKING_DIR = os.path.join("mlflow_experiments", "mlruns")
+EXPERIMENT_NAME = "Sales_Forecasting_Models"
+REGISTERED_MODEL_NAME = "SalesForecastingModel"
+
+TARGET_COLUMN = "unit_sales_log"
+# Dropped from the model inputs, like in Model.ipynb
+NON_FEATURE_COLUMNS = ["id", TARGET_COLUMN, "date"]
+
+# Grids sampled by the search; trial 0 of every model uses the library defaults (the notebook baseline)
+SEARCH_SPACES = {
+    "lightgbm": {
+        "n_estimators": [2000],
+        "learning_rate": [0.03, 0.05, 0.1],
+        "num_leaves": [31, 63, 127, 255],
+        "min_child_samples": [20, 50, 100],
+        "colsample_bytree": [0.8, 1.0],
+        "reg_lambda": [0.0, 1.0],
+    },
+    "xgboost": {
+        "n_estimators": [2000],
+        "learning_rate": [0.03, 0.05, 0.1],
+        "max_depth": [6, 8, 10],
+        "min_child_weight": [1, 5],
+        "subsample": [0.8, 1.0],
+        "colsample_bytree": [0.8, 1.0],
+    },
+}
+
+
+def tracking_uri(path=TRACKING_DIR):
+    """file:// URI of a local MLflow file store."""
+    return pathlib.Path(path).resolve().as_uri()
+
+
+def sample_trials(models, n_trials, seed=42):
+    """n_trials (model, params) pairs per model: the defaults first, then distinct random grid points."""
+    rng = random.Random(seed)
+    trials = []
+    for model in models:
+        space = SEARCH_SPACES[model]
+        grid = [dict(zip(space, values)) for values in itertools.product(*space.values())]
+        picked = rng.sample(grid, min(n_trials - 1, len(grid))) if n_trials > 1 else []
+        trials += [(model, params) for params in [{}] + picked]
+    return trials
+
+
+def share_data(df, work_dir, folds):
+    """Write features, target and fold indices as .npy files that workers memory-map."""
+    feature_names = [c for c in df.columns if c not in NON_FEATURE_COLUMNS]
+    X = np.lib.format.open_memmap(os.path.join(work_dir, "X.npy"), mode="w+", dtype=np.float32,
+                                  shape=(len(df), len(feature_names)))
+    for j, name in enumerate(feature_names):
+        X[:, j] = df[name].to_numpy()
+    X.flush()
+    del X
+    np.save(os.path.join(work_dir, "y.npy"), df[TARGET_COLUMN].to_numpy(dtype=np.float32))
+    fold_paths = []
+    for i, indices in enumerate(folds):
+        paths = tuple(os.path.join(work_dir, f"fold{i}_{part}.npy") for part in ("train", "stop", "valid"))
+        for path, idx in zip(paths, indices):
+            np.save(path, idx)
+        fold_paths.append(paths)
+    return {"X": os.path.join(work_dir, "X.npy"), "y": os.path.join(work_dir, "y.npy"),
+            "folds": fold_paths, "feature_names": feature_names}
+
+
+def limit_threads(threads):
+    """Worker initializer: cap OpenMP / BLAS pools before any model library is imported."""
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+
+def fit_model(kind, params, train_set, stop_set, threads, early_stopping):
+    """Train a booster on cached datasets with early stopping on stop_set; returns (booster, best_iteration).
+
+    params use the scikit-learn names of SEARCH_SPACES, which both libraries accept as aliases.
+    """
+    params = dict(params)
+    rounds = params.pop("n_estimators", 100)
+    if kind == "lightgbm":
+        import lightgbm as lgb
+        booster = lgb.train({"objective": "regression", "metric": "rmse", "seed": 42, "num_threads": threads,
+                             "verbose": -1, **params},
+                            train_set, num_boost_round=rounds, valid_sets=[stop_set],
+                            callbacks=[lgb.early_stopping(early_stopping, verbose=False)])
+        return booster, booster.best_iteration
+    if kind == "xgboost":
+        import xgboost as xgb
+        booster = xgb.train({"objective": "reg:squarederror", "eval_metric": "rmse", "seed": 42, "nthread": threads,
+                             **params},
+                            train_set, num_boost_round=rounds, evals=[(stop_set, "stop")],
+                            early_stopping_rounds=early_stopping, verbose_eval=False)
+        # Keep the trees up to the best round only, so every way of loading the model predicts the same
+        return booster[:booster.best_iteration + 1], booster.best_iteration
+    raise ValueError(f"Unknown model '{kind}', expected one of {sorted(SEARCH_SPACES)}")
+
+
+def log_model(kind, model):
+    if kind == "lightgbm":
+        import mlflow.lightgbm
+        return mlflow.lightgbm.log_model(model, "model")
+    import mlflow.xgboost
+    return mlflow.xgboost.log_model(model, "model")
+
+
+def run_trial(trial_id, kind, params, shared, settings):
+    """Train and evaluate one configuration on every fold, logging it as an MLflow child run.
+
+    Early stopping uses each fold's stopping days; the metrics come from its validation days only.
+    """
+    import mlflow
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    started = time.perf_counter()
+    X = np.load(shared["X"], mmap_mode="r")
+    y = np.load(shared["y"], mmap_mode="r")
+    names = shared["feature_names"]
+
+    scores = []
+    for fold, (_, _, valid_path) in enumerate(shared["folds"]):
+        valid_idx = np.load(valid_path)
+        train_set, stop_set, valid_set = load_fold(kind, *shared["cache"][kind][fold])
+        model, best_iteration = fit_model(kind, params, train_set, stop_set,
+                                          settings["threads"], settings["early_stopping"])
+        y_pred = model.predict(valid_set if kind == "xgboost" else pd.DataFrame(X[valid_idx], columns=names))
+        scores.append({
+            "rmse": float(np.sqrt(mean_squared_error(y[valid_idx], y_pred))),
+            "mae": float(mean_absolute_error(y[valid_idx], y_pred)),
+            "r2": float(r2_score(y[valid_idx], y_pred)),
+            "best_iteration": int(best_iteration or 0),
+        })
+    metrics = pd.DataFrame(scores).mean().to_dict()
+    metrics["fit_seconds"] = time.perf_counter() - started
+
+    mlflow.set_tracking_uri(settings["tracking_uri"])
+    with mlflow.start_run(experiment_id=settings["experiment_id"], run_name=f"{kind}_trial_{trial_id}",
+                          tags={"mlflow.parentRunId": settings["parent_run_id"]}) as run:
+        mlflow.log_params({"model_type": kind, "threads": settings["threads"], "folds": len(scores), **params})
+        mlflow.log_metrics(metrics)
+        # The model of the last fold: trained on the most (or, for a single split, all) training rows
+        model_info = log_model(kind, model)
+    return {"trial": trial_id, "model": kind, "params": params, "run_id": run.info.run_id,
+            "model_uri": model_info.model_uri, "trial_seconds": time.perf_counter() - started, **metrics}
+
+
+def cache_datasets(shared, models, cache_dir):
+    """Build (or reuse) the cached datasets of every fold; adds their paths to shared."""
+    X = np.load(shared["X"], mmap_mode="r")
+    y = np.load(shared["y"], mmap_mode="r")
+    folds = [tuple(np.load(path) for path in paths) for paths in shared["folds"]]
+    cache = DatasetCache(cache_dir, X, y, folds, shared["feature_names"])
+    shared["cache"] = {}
+    for kind in models:
+        started = time.perf_counter()
+        built = cache.build(kind)
+        shared["cache"][kind] = [cache.paths(kind, fold) for fold in range(len(folds))]
+        state = f"built in {time.perf_counter() - started:.1f}s" if built else "reused"
+        print(f"  {kind} datasets for {len(folds)} folds {state} ({cache.directory})")
+    return cache
+
+
+def run_search(df, models=tuple(SEARCH_SPACES), n_trials=8, workers=None, threads=1, folds=None,
+               n_folds=3, horizon_days=28, stopping_days=14, cache_dir=DEFAULT_CACHE_DIR, early_stopping=50,
+               tracking=TRACKING_DIR, experiment=EXPERIMENT_NAME, register_name=REGISTERED_MODEL_NAME, seed=42):
+    """Run the search on processed data df; returns the leaderboard (best first) and the registered version.
+
+    folds defaults to n_folds rolling-origin folds of horizon_days on df["date"], each with
+    stopping_days of early-stopping rows; given folds are (train_idx, stop_idx, valid_idx) triples.
+    """
+    import mlflow
+
+    workers = workers or max(1, (os.cpu_count() or 1) // threads)
+    folds = folds if folds is not None else rolling_origin_folds(df["date"], n_folds, horizon_days,
+                                                                 stopping_days=stopping_days)
+    trials = sample_trials(models, n_trials, seed)
+
+    uri = tracking_uri(tracking)
+    mlflow.set_tracking_uri(uri)
+    experiment_id = mlflow.set_experiment(experiment).experiment_id
+
+    work_dir = tempfile.mkdtemp(prefix="harness-")
+    try:
+        shared = share_data(df, work_dir, folds)
+        cache_datasets(shared, models, cache_dir)
+        with mlflow.start_run(run_name="harness") as parent:
+            mlflow.log_params({"models": ",".join(models), "trials": len(trials), "workers": workers,
+                               "threads_per_job": threads, "folds": len(folds), "horizon_days": horizon_days,
+                               "stopping_days": stopping_days, "early_stopping": early_stopping})
+            settings = {"tracking_uri": uri, "experiment_id": experiment_id, "parent_run_id": parent.info.run_id,
+                        "threads": threads, "early_stopping": early_stopping}
+
+            started = time.perf_counter()
+            results = []
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=limit_threads,
+                                     initargs=(threads,)) as pool:
+                futures = [pool.submit(run_trial, i, kind, params, shared, settings)
+                           for i, (kind, params) in enumerate(trials)]
+                for future in as_completed(futures):
+                    result = future.result()
+                    results.append(result)
+                    print(f"  {result['model']} trial {result['trial']}: rmse={result['rmse']:.6f} "
+                          f"({result['fit_seconds']:.1f}s)")
+            wall = time.perf_counter() - started
+
+            leaderboard = pd.DataFrame(results).sort_values("rmse").reset_index(drop=True)
+            best = leaderboard.iloc[0]
+            mlflow.log_metrics({"best_rmse": best["rmse"], "wall_seconds": wall,
+                                "speedup": leaderboard["trial_seconds"].sum() / wall})
+            mlflow.set_tag("best_run_id", best["run_id"])
+            mlflow.log_text(leaderboard.drop(columns=["model_uri"]).to_csv(index=False), "leaderboard.csv")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    version = None
+    if register_name:
+        version = mlflow.register_model(best["model_uri"], register_name)
+    return leaderboard, version, wall
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DEFAULT_PATH, help="processed Parquet dataset (or processed_data.csv)")
+    parser.add_argument("--models", nargs="+", default=list(SEARCH_SPACES), choices=list(SEARCH_SPACES))
+    parser.add_argument("--trials", type=int, default=8, help="configurations per model (the first is the defaults)")
+    parser.add_argument("--workers", type=int, default=0, help="parallel trials (0 = cores / threads)")
+    parser.add_argument("--threads", type=int, default=1, help="threads per trial")
+    parser.add_argument("--folds", type=int, default=3, help="rolling-origin folds on date")
+    parser.add_argument("--horizon-days", type=int, default=28, help="validation days per fold")
+    parser.add_argument("--stopping-days", type=int, default=14,
+                        help="days before each fold's origin held out of training for early stopping")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="cached lgb.Dataset / xgb.DMatrix binaries")
+    parser.add_argument("--early-stopping", type=int, default=50, help="rounds without validation improvement")
+    parser.add_argument("--sample", type=int, default=0, help="train on a random sample of rows (0 = all)")
+    parser.add_argument("--tracking", default=TRACKING_DIR, help="local MLflow file store")
+    parser.add_argument("--experiment", default=EXPERIMENT_NAME)
+    parser.add_argument("--register-name", default=REGISTERED_MODEL_NAME, help="registered model name ('' = skip)")
+    args = parser.parse_args()
+
+    data = load_processed(args.data)
+    if args.sample:
+        data = data.sample(n=min(args.sample, len(data)), random_state=42).reset_index(drop=True)
+    print(f"✅ {len(data):,} rows loaded from {args.data}")
+
+    leaderboard, version, wall = run_search(
+        data, args.models, args.trials, args.workers or None, args.threads,
+        n_folds=args.folds, horizon_days=args.horizon_days, stopping_days=args.stopping_days,
+        cache_dir=args.cache_dir,
+        early_stopping=args.early_stopping, tracking=args.tracking, experiment=args.experiment,
+        register_name=args.register_name)
+    columns = ["model", "trial", "rmse", "mae", "r2", "best_iteration", "fit_seconds", "run_id"]
+    print(leaderboard[columns].to_string(index=False))
+    print(f"✅ {len(leaderboard)} trials in {wall:.1f}s "
+          f"({leaderboard['trial_seconds'].sum() / wall:.1f}x the serial time)")
+    if version is not None:
+        print(f"✅ Best run {leaderboard.iloc[0]['run_id']} registered as {version.name} v{version.version}")
@@ -0,0 +1,159 @@
+"""Rolling-origin cross-validation on `date`, with the native training datasets cached on disk.
+
+A random train_test_split mixes future days into the training rows. Here every fold
+trains on the days before its origin and validates on the `horizon_days` after it;
+the origins step back from the last date, so the last fold trains on the most data.
+The last `stopping_days` before the origin are held out of training for early
+stopping, so the validation days that score a trial never choose its number of trees:
+
+    fold 0: train [first .. o0 - s)   stop [o0 - s .. o0)   valid [o0 .. o0 + h)
+    fold 1: train [first .. o1 - s)   stop [o1 - s .. o1)   valid [o1 .. o1 + h)      o1 = o0 + h
+    ...
+
+Building an `lgb.Dataset` (feature binning) or an `xgb.DMatrix` from a float matrix
+is the slow part of a small trial. `DatasetCache` builds them once per fold, saves
+them in the libraries' binary formats under a key of the data and the folds, and
+every later trial (or run of the harness on the same data) loads the binaries.
+
+    folds = rolling_origin_folds(df["date"], n_folds=3, horizon_days=28)
+    cache = DatasetCache("cv_cache", X, y, folds, feature_names)
+    cache.build("lightgbm")
+    train_set, stop_set, valid_set = cache.load("lightgbm", fold=0)
+"""
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = "cv_cache"
+# Binning parameters frozen into the cached lgb.Dataset files. feature_pre_filter=False lets
+# trials with different min_child_samples reuse one Dataset.
+LGB_DATASET_PARAMS = {"max_bin": 255, "feature_pre_filter": False, "verbose": -1}
+LIBRARIES = ("lightgbm", "xgboost")
+_EXTENSIONS = {"lightgbm": "bin", "xgboost": "buffer"}
+
+
+def to_days(dates):
+    return pd.to_datetime(np.asarray(dates)).to_numpy().astype("datetime64[D]")
+
+
+def rolling_origin_folds(dates, n_folds=3, horizon_days=28, gap_days=0, stopping_days=14):
+    """(train_idx, stop_idx, valid_idx) per fold, oldest origin first.
+
+    stop_idx are the last stopping_days before the origin (early stopping only).
+    gap_days leaves days out between them and the validation rows (e.g. the lag
+    horizon of the features). Folds without training or stopping rows are skipped.
+    """
+    if stopping_days < 1:
+        raise ValueError(f"stopping_days must be at least 1, got {stopping_days}")
+    days = to_days(dates)
+    end = days.max() + np.timedelta64(1, "D")
+    horizon = np.timedelta64(horizon_days, "D")
+    folds = []
+    for k in range(n_folds, 0, -1):
+        origin = end - k * horizon
+        stop_end = origin - np.timedelta64(gap_days, "D")
+        stop_start = stop_end - np.timedelta64(stopping_days, "D")
+        train_idx = np.flatnonzero(days < stop_start)
+        stop_idx = np.flatnonzero((days >= stop_start) & (days < stop_end))
+        valid_idx = np.flatnonzero((days >= origin) & (days < origin + horizon))
+        if len(train_idx) and len(stop_idx) and len(valid_idx):
+            folds.append((train_idx, stop_idx, valid_idx))
+    if not folds:
+        raise ValueError(f"No fold has training, stopping and validation rows "
+                         f"({n_folds} x {horizon_days} days, {stopping_days} stopping days)")
+    return folds
+
+
+def time_holdout(dates, test_fraction=0.2):
+    """(train_idx, test_idx): test is the latest days, about test_fraction of the rows, never before a train row."""
+    days = to_days(dates)
+    cutoff = np.sort(days)[min(int(len(days) * (1 - test_fraction)), len(days) - 1)]
+    return np.flatnonzero(days < cutoff), np.flatnonzero(days >= cutoff)
+
+
+def data_key(X, y, folds, feature_names):
+    """Fingerprint of the data, the folds and the dataset settings: the cache directory name."""
+    import lightgbm
+    import xgboost
+
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(json.dumps([list(X.shape), list(feature_names), LGB_DATASET_PARAMS,
+                              lightgbm.__version__, xgboost.__version__]).encode())
+    # Row blocks keep the hashing memory bounded for memory-mapped matrices
+    for start in range(0, len(X), 1_000_000):
+        digest.update(np.ascontiguousarray(X[start:start + 1_000_000]).tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    for fold in folds:
+        for indices in fold:
+            digest.update(np.asarray(indices).tobytes())
+    return digest.hexdigest()
+
+
+class DatasetCache:
+    """lgb.Dataset / xgb.DMatrix binaries of every fold, built once and shared by all trials.
+
+    Build in one process (the harness does it before starting the workers); any
+    number of processes can then `load` the same files.
+    """
+
+    def __init__(self, root, X, y, folds, feature_names, key=None):
+        self.X, self.y, self.folds = X, y, folds
+        self.feature_names = list(feature_names)
+        self.key = key or data_key(X, y, folds, feature_names)
+        self.directory = os.path.join(root, self.key)
+
+    def paths(self, library, fold):
+        ext = _EXTENSIONS[library]
+        return tuple(os.path.join(self.directory, f"fold{fold}_{part}.{ext}") for part in ("train", "stop", "valid"))
+
+    def is_built(self, library):
+        return all(os.path.exists(p) for fold in range(len(self.folds)) for p in self.paths(library, fold))
+
+    def build(self, library):
+        """Write the binaries of every fold that is not cached yet; returns the number of folds built."""
+        os.makedirs(self.directory, exist_ok=True)
+        built = 0
+        for fold, indices in enumerate(self.folds):
+            paths = self.paths(library, fold)
+            if all(os.path.exists(path) for path in paths):
+                continue
+            if library == "lightgbm":
+                import lightgbm as lgb
+                train_idx = indices[0]
+                train = lgb.Dataset(self.X[train_idx], self.y[train_idx], feature_name=self.feature_names,
+                                    params=LGB_DATASET_PARAMS, free_raw_data=False)
+                others = [lgb.Dataset(self.X[idx], self.y[idx], reference=train, params=LGB_DATASET_PARAMS)
+                          for idx in indices[1:]]
+                for dataset in others:
+                    dataset.construct()
+                datasets = list(zip([train] + others, paths))
+            elif library == "xgboost":
+                import xgboost as xgb
+                datasets = [(xgb.DMatrix(self.X[idx], self.y[idx], feature_names=self.feature_names), path)
+                            for idx, path in zip(indices, paths)]
+            else:
+                raise ValueError(f"Unknown library '{library}', expected one of {LIBRARIES}")
+            for dataset, path in datasets:
+                # Written next to the final name and renamed, so readers never see a partial file
+                partial = f"{path}.{os.getpid()}.partial"
+                dataset.save_binary(partial)
+                os.replace(partial, path)
+            built += 1
+        return built
+
+    def load(self, library, fold):
+        """(train, stop, valid) of one fold from the cached binaries."""
+        return load_fold(library, *self.paths(library, fold))
+
+
+def load_fold(library, train_path, stop_path, valid_path):
+    """Load a cached (train, stop, valid) fold; needs only the file paths, not the data."""
+    if library == "lightgbm":
+        import lightgbm as lgb
+        train = lgb.Dataset(train_path, params=LGB_DATASET_PARAMS)
+        return (train, lgb.Dataset(stop_path, reference=train, params=LGB_DATASET_PARAMS),
+                lgb.Dataset(valid_path, reference=train, params=LGB_DATASET_PARAMS))
+    import xgboost as xgb
+    return xgb.DMatrix(train_path), xgb.DMatrix(stop_path), xgb.DMatrix(valid_path)
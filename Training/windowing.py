@@ -0,0 +1,141 @@
+"""Sliding windows over per-series time-ordered rows for the LSTM, without copying the data.
+
+`create_sequences` in Model.ipynb stacked a copy of every window, so the sequence
+array was `look_back` times the feature matrix. Here the rows are ordered once by
+(store_nbr, item_nbr, date) into a single float32 matrix, every window is a
+strided view into it (`sliding_window_view`), and only the batch being fed to
+the model is materialized. A window and the row it predicts always belong to
+the same series.
+
+    windows = SeriesWindows.from_frame(data, feature_cols, "unit_sales_log", look_back=7)
+    train_idx, test_idx = windows.split_by_time(0.8)
+    train = to_tf_dataset(WindowBatchFeeder(windows, train_idx, batch_size=32, shuffle=True))
+    model.fit(train, epochs=50)
+"""
+import math
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+SERIES_COLUMNS = ("store_nbr", "item_nbr")
+TIME_COLUMN = "date"
+
+
+class SeriesWindows:
+    """All windows of `look_back` consecutive rows whose next row is in the same series.
+
+    features: (n_rows, n_features) rows grouped by series and time-ordered within each
+    target: (n_rows,) or (n_rows, 1) value predicted from the window before it
+    series_ids: (n_rows,) series label per row (None = one series)
+    times: (n_rows,) timestamps, used by split_by_time
+    """
+
+    def __init__(self, features, target, look_back, series_ids=None, times=None):
+        self.features = np.ascontiguousarray(features, dtype=np.float32)
+        target = np.ascontiguousarray(target, dtype=np.float32)
+        self.target = target.reshape(-1, 1) if target.ndim == 1 else target
+        self.look_back = int(look_back)
+        n_rows = len(self.features)
+        if n_rows <= self.look_back:
+            raise ValueError(f"Need more than look_back={self.look_back} rows, got {n_rows}")
+
+        # (n_rows - look_back + 1, look_back, n_features), a view: no data is copied
+        self.view = sliding_window_view(self.features, self.look_back, axis=0).transpose(0, 2, 1)
+
+        # Window i covers rows i .. i+look_back-1 and predicts row i+look_back. Series are
+        # contiguous, so the window is valid when its first and target rows share a series.
+        n_windows = n_rows - self.look_back
+        starts = np.arange(n_windows)
+        if series_ids is not None:
+            series_ids = np.asarray(series_ids)
+            starts = starts[series_ids[:n_windows] == series_ids[self.look_back:]]
+        self.starts = starts
+        self.target_times = np.asarray(times)[starts + self.look_back] if times is not None else None
+
+    @classmethod
+    def from_frame(cls, df, feature_columns, target_column, look_back,
+                   series_columns=SERIES_COLUMNS, time_column=TIME_COLUMN):
+        """Order df by series and time and build the windows (peak memory ~1x the feature matrix)."""
+        series_columns = [c for c in series_columns if c in df.columns]
+        keys = [df[c].to_numpy() for c in series_columns]
+        times = df[time_column].to_numpy() if time_column in df.columns else np.arange(len(df))
+        # lexsort sorts by its last key first: series columns, then time
+        order = np.lexsort([times] + keys[::-1])
+
+        # Filled one column at a time, so the reordering never holds a second full matrix
+        features = np.empty((len(df), len(feature_columns)), dtype=np.float32)
+        for j, column in enumerate(feature_columns):
+            features[:, j] = df[column].to_numpy()[order]
+        target = df[target_column].to_numpy(dtype=np.float32)[order]
+
+        changed = np.zeros(max(len(df) - 1, 0), dtype=bool)
+        for key in keys:
+            sorted_key = key[order]
+            changed |= sorted_key[1:] != sorted_key[:-1]
+        series_ids = np.concatenate([[0], np.cumsum(changed)])
+        return cls(features, target, look_back, series_ids, times[order])
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def n_features(self):
+        return self.features.shape[1]
+
+    def batch(self, indices):
+        """Materialize windows `indices` as (len(indices), look_back, n_features) and their targets."""
+        starts = self.starts[indices]
+        return self.view[starts], self.target[starts + self.look_back]
+
+    def targets(self, indices=None):
+        starts = self.starts if indices is None else self.starts[indices]
+        return self.target[starts + self.look_back]
+
+    def split_by_time(self, train_fraction=0.8):
+        """Window indices whose target falls before / from the date at train_fraction of the windows.
+
+        Cutting on a date keeps every test target later than every training target,
+        in every series. Without times the split is positional.
+        """
+        n_train = int(len(self) * train_fraction)
+        if self.target_times is None:
+            return np.arange(n_train), np.arange(n_train, len(self))
+        if n_train >= len(self):
+            return np.arange(len(self)), np.arange(0)
+        cutoff = np.sort(self.target_times)[n_train]
+        before = self.target_times < cutoff
+        return np.flatnonzero(before), np.flatnonzero(~before)
+
+
+class WindowBatchFeeder:
+    """Iterable of (X_batch, y_batch) over some windows, one batch materialized at a time.
+
+    With shuffle=True every pass (epoch) uses a new permutation.
+    """
+
+    def __init__(self, windows, indices=None, batch_size=32, shuffle=False, seed=42):
+        self.windows = windows
+        self.indices = np.arange(len(windows)) if indices is None else np.asarray(indices)
+        self.batch_size = int(batch_size)
+        self.shuffle = shuffle
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return math.ceil(len(self.indices) / self.batch_size)
+
+    def __iter__(self):
+        indices = self._rng.permutation(self.indices) if self.shuffle else self.indices
+        for start in range(0, len(indices), self.batch_size):
+            yield self.windows.batch(indices[start:start + self.batch_size])
+
+
+def to_tf_dataset(feeder, prefetch=2):
+    """Wrap a WindowBatchFeeder as a tf.data.Dataset that Keras fit / predict consume directly."""
+    import tensorflow as tf
+
+    windows = feeder.windows
+    signature = (
+        tf.TensorSpec((None, windows.look_back, windows.n_features), tf.float32),
+        tf.TensorSpec((None, windows.target.shape[1]), tf.float32),
+    )
+    dataset = tf.data.Dataset.from_generator(lambda: iter(feeder), output_signature=signature)
+    return dataset.apply(tf.data.experimental.assert_cardinality(len(feeder))).prefetch(prefetch)